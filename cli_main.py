@@ -13,7 +13,7 @@ from utils.base_social_media import get_supported_social_media, get_cli_action,
     SOCIAL_MEDIA_TENCENT, SOCIAL_MEDIA_TIKTOK, SOCIAL_MEDIA_KUAISHOU
 from utils.constant import TencentZoneTypes
 from utils.files_times import get_title_and_hashtags
-import sqlite3
+from utils import database
 
 def parse_schedule(schedule_raw):
     if schedule_raw:
@@ -31,18 +31,11 @@ def get_account_file_from_db(args):
         "tiktok":5
     }
     
-    with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT filePath FROM user_info 
-            WHERE type = ? AND userName = ? AND status = 1
-        ''', (platform_map[args.platform], args.account_name))
-        
-        result = cursor.fetchone()
-        if result:
-            return Path(BASE_DIR / "cookiesFile" / result[0])
-        else:
-            raise FileNotFoundError(f"未找到平台 {args.platform} 账号 {args.account_name} 的有效cookie文件")
+    file_path = database.find_valid_account_file(platform_map[args.platform], args.account_name)
+    if file_path:
+        return Path(BASE_DIR / "cookiesFile" / file_path)
+    else:
+        raise FileNotFoundError(f"未找到平台 {args.platform} 账号 {args.account_name} 的有效cookie文件")
 async def main():
     # 主解析器
     parser = argparse.ArgumentParser(description="Upload video to multiple social-media.")
@@ -3,3 +3,18 @@ from pathlib import Path
 BASE_DIR = Path(__file__).parent.resolve()
 XHS_SERVER = "http://127.0.0.1:11901"
 LOCAL_CHROME_PATH = ""   # change me necessary！ for example C:/Program Files/Google/Chrome/Application/chrome.exe
+FFPROBE_PATH = "ffprobe"   # 视频探测使用的 ffprobe，不在 PATH 中时填写完整路径
+FFMPEG_PATH = "ffmpeg"   # 发布前转码使用的 ffmpeg
+ENABLE_TRANSCODE = False   # 开启后不符合平台规格（体积、码率、分辨率、编码）的视频先转码再上传
+AUTO_COVER = True   # 调用方未指定封面时，抖音 / TikTok 上传器自动用 ffmpeg 从视频中抽取封面
+FILE_HANDOFF_BASE_URL = "http://127.0.0.1:5409"   # multi-account-browser 按 Range 拉取视频分段时访问的 sau_backend 地址
+ACCOUNT_SESSIONS = True   # 发布引擎 / sau_worker 中同一账号的连续上传复用常驻浏览器上下文（空闲 10 分钟后关闭）
+ACCOUNT_SESSION_MAX_CONTEXTS = 4   # 同时常驻的账号浏览器数量上限
+LEAN_PAGES = True   # 上传页面拦截统计上报请求和第三方图片 / 字体 / 音视频，减少页面加载时间和内存
+LAUNCH_MODE = "headed"   # 上传浏览器启动模式：headless（新版无头）/ xvfb（虚拟显示中有头运行）/ headed（桌面有头）
+PLATFORM_LAUNCH_MODES = {}   # 按平台覆盖启动模式，如 {"tencent": "xvfb"}；可用 examples/benchmark_launch_modes.py 测试各平台能接受的模式
+XHS_SIGN_PAGES = 2   # 小红书常驻签名服务预热的签名页面数（同时进行的签名数）
+DEFAULT_UPLOADERS = {}   # 各平台默认上传器实现，如 {"xiaohongshu": "api"} 使用 XhsClient 接口发布（不启动浏览器）；请求中的 uploader 字段优先
+XHS_SIGN_BACKEND = "local"   # 小红书接口发布的签名后端：local 进程内常驻签名服务 / remote 使用 XHS_SERVER
+BILIBILI_UPLOAD_BANDWIDTH = None   # 所有 B站上传共享的上行带宽预算（字节/秒），如 10 * 1024 * 1024；None 时只按连接数上限分配
+BILIBILI_MAX_UPLOAD_THREADS = 12   # 所有 B站上传合计的分片线程数上限
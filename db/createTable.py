@@ -57,16 +57,70 @@ CREATE TABLE IF NOT EXISTS file_records (
     filename TEXT NOT NULL,
     filesize REAL,
     upload_time DATETIME DEFAULT CURRENT_TIMESTAMP,
-    file_path TEXT
+    file_path TEXT,
+    digest TEXT,
+    probe_status TEXT,
+    probe_error TEXT,
+    container TEXT,
+    video_codec TEXT,
+    audio_codec TEXT,
+    duration REAL,
+    width INTEGER,
+    height INTEGER,
+    bitrate INTEGER,
+    fps REAL,
+    rotation INTEGER
 )
 ''')
 print("✅ file_records 表创建成功")
 
+# 创建内容寻址存储表（相同内容的视频只保存一份，file_records.digest 引用）
+cursor.execute('''
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+)
+''')
+print("✅ blobs 表创建成功")
+
+# 创建持久化任务表（批量发布 / 上传任务队列）
+cursor.execute('''
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    progress REAL DEFAULT 0,
+    message TEXT DEFAULT '',
+    result TEXT,
+    error TEXT,
+    worker_id TEXT,
+    lease_expires_at REAL,
+    attempts INTEGER DEFAULT 0,
+    max_attempts INTEGER DEFAULT 3,
+    available_at REAL DEFAULT 0,
+    created_at TEXT,
+    started_at TEXT,
+    completed_at TEXT,
+    updated_at TEXT
+)
+''')
+print("✅ tasks 表创建成功")
+
 # 创建索引以提高查询性能
 cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_info_type ON user_info(type)')
 cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_info_filepath ON user_info(filePath)')
 cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_info_group ON user_info(group_id)')
 cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_records_filename ON file_records(filename)')
+cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_records_digest ON file_records(digest)')
+cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_records_file_path ON file_records(file_path)')
+cursor.execute('CREATE INDEX IF NOT EXISTS idx_file_records_upload_time ON file_records(upload_time)')
+cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks(status, kind, available_at)')
+cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_lease ON tasks(status, lease_expires_at)')
+cursor.execute('CREATE INDEX IF NOT EXISTS idx_tasks_kind_created ON tasks(kind, created_at)')
 print("✅ 数据库索引创建成功")
 
 # 插入默认分组数据
@@ -90,7 +144,7 @@ conn.commit()
 
 # 显示表结构信息
 print("\n📋 数据库表结构信息:")
-tables = ['account_groups', 'user_info', 'file_records']
+tables = ['account_groups', 'user_info', 'file_records', 'blobs', 'tasks']
 
 for table in tables:
     print(f"\n📊 {table} 表结构:")
@@ -0,0 +1,46 @@
+import argparse
+import asyncio
+from pathlib import Path
+
+from playwright.async_api import async_playwright
+
+from conf import BASE_DIR, LOCAL_CHROME_PATH
+from utils.launch_profile import LAUNCH_MODES, BENCHMARK_TARGETS, benchmark_launch_mode
+
+# 逐个启动模式打开平台发布页，比较启动耗时、内存和平台是否接受该模式
+# python examples/benchmark_launch_modes.py douyin cookies/douyin_uploader/account.json --rounds 3
+# 结果中 accepted 全部为 True 的模式可以写入 conf.py 的 PLATFORM_LAUNCH_MODES
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark browser launch modes for an upload platform.")
+    parser.add_argument("platform", choices=list(BENCHMARK_TARGETS))
+    parser.add_argument("account_file", help="cookie 文件（相对路径按项目目录解析）")
+    parser.add_argument("--modes", nargs="+", choices=LAUNCH_MODES, default=LAUNCH_MODES)
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--browser", choices=["chromium", "firefox"], default="chromium")
+    args = parser.parse_args()
+
+    account_file = Path(args.account_file)
+    if not account_file.is_absolute():
+        account_file = Path(BASE_DIR) / account_file
+    executable_path = LOCAL_CHROME_PATH if args.browser == "chromium" else None
+
+    results = []
+    async with async_playwright() as playwright:
+        for mode in args.modes:
+            for _ in range(args.rounds):
+                result = await benchmark_launch_mode(playwright, args.platform, account_file, mode,
+                                                     executable_path, args.browser)
+                result["requested_mode"] = mode
+                results.append(result)
+                print(result)
+
+    print(f"\n{'模式':<10}{'实际':<10}{'接受':<6}{'启动(s)':<10}{'发布页(s)':<12}{'内存(MB)':<10}")
+    for result in results:
+        print(f"{result['requested_mode']:<10}{result['mode']:<10}{str(result['accepted']):<6}"
+              f"{result['launch_seconds']:<10}{result.get('ready_seconds', '-'):<12}{str(result.get('rss_mb', '-')):<10}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,171 @@
+# myUtils/account_scheduler.py
+"""
+账号健康检查调度器 - 运行在 sau_backend 进程内的后台事件循环中
+按 user_info.last_check_time + check_interval 维护一个到期时间最小堆，
+只在最早的账号到期时唤醒，在全局并发预算内调用 check_cookie，并对检查时间加随机抖动避免扎堆
+"""
+import asyncio
+import heapq
+import random
+import time
+from datetime import datetime
+
+from myUtils.account_sweep import save_check_results, is_account_stale
+from myUtils.auth import check_cookie
+from utils import database
+from utils.background_loop import get_background_loop, submit
+
+# 调度器所在的后台事件循环名称
+SCHEDULER_LOOP = "account_scheduler"
+# 全局同时检查的账号数上限
+SCHEDULER_CONCURRENCY = 4
+# 检查时间的随机抖动比例（在到期后 0~10% 间隔内随机分散）
+SCHEDULER_JITTER_RATIO = 0.1
+# 启动时已过期的账号在这个时间窗口（秒）内随机分散检查
+SCHEDULER_STARTUP_SPREAD = 120
+# 定期从数据库重新加载账号列表的间隔（秒），用于发现新增/删除的账号
+SCHEDULER_RELOAD_INTERVAL = 300
+DEFAULT_CHECK_INTERVAL = 3600
+
+
+class AccountHealthScheduler:
+    def __init__(self, concurrency: int = SCHEDULER_CONCURRENCY, jitter_ratio: float = SCHEDULER_JITTER_RATIO):
+        self.concurrency = concurrency
+        self.jitter_ratio = jitter_ratio
+        self._heap = []
+        self._accounts = {}
+        self._in_flight = set()
+        self._generation = 0
+        self._wakeup = None
+        self._reload_requested = False
+        self._semaphore = None
+        self._started = False
+
+    @property
+    def running(self) -> bool:
+        return self._started
+
+    def start(self):
+        """在后台事件循环中启动调度器（重复调用无副作用）"""
+        if self._started:
+            return
+        self._started = True
+        submit(self._run(), SCHEDULER_LOOP)
+        print("⏰ 账号健康检查调度器已启动")
+
+    def notify_changed(self):
+        """账号增删改后调用，调度器会立即重新加载账号列表（线程安全）"""
+        if self._started and self._wakeup is not None:
+            get_background_loop(SCHEDULER_LOOP).call_soon_threadsafe(self._request_reload)
+
+    def _request_reload(self):
+        self._reload_requested = True
+        self._wakeup.set()
+
+    async def _run(self):
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._reload()
+        next_reload = time.time() + SCHEDULER_RELOAD_INTERVAL
+
+        while True:
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, account_id, generation = heapq.heappop(self._heap)
+                if generation != self._generation or account_id not in self._accounts:
+                    continue
+                self._in_flight.add(account_id)
+                asyncio.create_task(self._check(account_id))
+
+            # 只睡到最早的账号到期（或到下次重新加载）
+            wake_at = min(self._heap[0][0], next_reload) if self._heap else next_reload
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, wake_at - time.time()))
+            except asyncio.TimeoutError:
+                pass
+
+            self._wakeup.clear()
+            if self._reload_requested or time.time() >= next_reload:
+                self._reload_requested = False
+                self._reload()
+                next_reload = time.time() + SCHEDULER_RELOAD_INTERVAL
+
+    def _reload(self):
+        """重建到期堆；正在检查中的账号在检查结束后自行重新入堆"""
+        try:
+            rows = database.list_accounts()
+        except Exception as e:
+            print(f"⚠️ 调度器加载账号失败: {e}")
+            return
+
+        now = time.time()
+        self._generation += 1
+        self._accounts = {}
+        self._heap = []
+        for account_id, type_val, file_path, user_name, _, last_check_time, check_interval in rows:
+            self._accounts[account_id] = {
+                'id': account_id,
+                'type': type_val,
+                'filePath': file_path,
+                'userName': user_name,
+                'check_interval': check_interval or DEFAULT_CHECK_INTERVAL,
+            }
+            if account_id not in self._in_flight:
+                self._push(account_id, self._due_time(last_check_time, self._accounts[account_id]['check_interval'], now))
+        heapq.heapify(self._heap)
+
+    def _due_time(self, last_check_time, check_interval, now: float) -> float:
+        try:
+            last_check = datetime.fromisoformat(last_check_time).timestamp()
+        except (ValueError, TypeError):
+            last_check = None
+        if last_check is None or last_check + check_interval <= now:
+            # 已过期的账号分散在启动窗口内检查，避免同时涌入
+            return now + random.uniform(0, SCHEDULER_STARTUP_SPREAD)
+        return self._jittered(last_check + check_interval, check_interval)
+
+    def _jittered(self, due: float, check_interval: int) -> float:
+        return due + random.uniform(0, check_interval * self.jitter_ratio)
+
+    def _push(self, account_id, due: float):
+        heapq.heappush(self._heap, (due, account_id, self._generation))
+
+    async def _check(self, account_id):
+        account = self._accounts.get(account_id)
+        if account is None:
+            # 账号在两次加载之间被删除，不再检查也不再排期
+            self._in_flight.discard(account_id)
+            return
+        next_due = None
+        try:
+            # 账号可能刚被列表接口的 sweep 校验过，未过期就顺延而不重复检查
+            last_check_time = database.get_account_check_time(account_id)
+            if not is_account_stale(last_check_time, account['check_interval']):
+                next_due = self._due_time(last_check_time, account['check_interval'], time.time())
+                return
+            async with self._semaphore:
+                flag = await check_cookie(account['type'], account['filePath'])
+            new_status = 1 if flag else 0
+            save_check_results([(new_status, datetime.now().isoformat(), account_id)])
+            print(f"⏰ 定时检查账号 {account['userName']}: {'正常' if new_status else '异常'}")
+        except Exception as e:
+            print(f"❌ 定时检查账号 {account_id} ({account['userName']}) 失败: {e}")
+        finally:
+            self._in_flight.discard(account_id)
+            # 账号可能在检查期间被删除或更新，以最新的加载结果为准
+            account = self._accounts.get(account_id)
+            if account:
+                if next_due is None:
+                    next_due = self._jittered(time.time() + account['check_interval'], account['check_interval'])
+                self._push(account_id, next_due)
+                self._wakeup.set()
+
+
+_scheduler = None
+
+
+def get_account_scheduler() -> AccountHealthScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = AccountHealthScheduler()
+    return _scheduler
@@ -0,0 +1,144 @@
+# myUtils/account_sweep.py
+"""
+账号有效性批量校验（sweep）
+在后台事件循环中并发校验过期账号，按平台限流，结果在一个事务中写回数据库；
+接口立即返回缓存状态和 sweep_id，前端通过 sweep_id 轮询或订阅完成事件
+"""
+import asyncio
+import threading
+import uuid
+from datetime import datetime
+
+from myUtils.auth import check_cookie
+from utils import database
+from utils.background_loop import submit
+
+# sweep 运行所在的后台事件循环名称
+SWEEP_LOOP = "account_sweep"
+# 每个平台同时校验的账号数上限（1 小红书 2 视频号 3 抖音 4 快手）
+PLATFORM_CHECK_CONCURRENCY = {1: 3, 2: 3, 3: 3, 4: 3}
+DEFAULT_CHECK_CONCURRENCY = 2
+# 保留的历史 sweep 记录数量
+SWEEP_HISTORY_LIMIT = 50
+
+_sweeps = {}
+_sweeps_lock = threading.Lock()
+_running_sweep_id = None
+
+
+def is_account_stale(last_check_time, check_interval, now: datetime = None) -> bool:
+    """根据 last_check_time / check_interval 判断账号是否需要重新校验"""
+    if not last_check_time:
+        return True
+    now = now or datetime.now()
+    try:
+        last_check = datetime.fromisoformat(last_check_time)
+    except (ValueError, TypeError):
+        return True
+    return (now - last_check).total_seconds() > (check_interval or 3600)
+
+
+def start_account_sweep(accounts: list) -> str:
+    """
+    启动一次后台校验，accounts 为包含 id/type/filePath/userName 的字典列表
+    已有 sweep 在运行时直接复用它的 id，避免同一批账号被重复校验
+    """
+    global _running_sweep_id
+    if not accounts:
+        return None
+
+    with _sweeps_lock:
+        running = _sweeps.get(_running_sweep_id)
+        if running and running["status"] == "running":
+            return _running_sweep_id
+
+        sweep_id = uuid.uuid4().hex[:12]
+        _sweeps[sweep_id] = {
+            "sweep_id": sweep_id,
+            "status": "running",
+            "total": len(accounts),
+            "checked": 0,
+            "valid": 0,
+            "invalid": 0,
+            "failed": 0,
+            "results": {},
+            "start_time": datetime.now().isoformat(),
+            "end_time": None,
+            "done_event": threading.Event(),
+        }
+        _running_sweep_id = sweep_id
+        _trim_history()
+
+    print(f"🔍 启动账号校验 {sweep_id}: {len(accounts)} 个账号")
+    submit(_run_sweep(sweep_id, accounts), SWEEP_LOOP)
+    return sweep_id
+
+
+def _trim_history():
+    finished = [sweep_id for sweep_id, sweep in _sweeps.items() if sweep["status"] != "running"]
+    for sweep_id in finished[:max(0, len(_sweeps) - SWEEP_HISTORY_LIMIT)]:
+        _sweeps.pop(sweep_id, None)
+
+
+async def _run_sweep(sweep_id: str, accounts: list):
+    sweep = _sweeps[sweep_id]
+    semaphores = {}
+
+    async def check_one(account):
+        platform_type = account["type"]
+        if platform_type not in semaphores:
+            limit = PLATFORM_CHECK_CONCURRENCY.get(platform_type, DEFAULT_CHECK_CONCURRENCY)
+            semaphores[platform_type] = asyncio.Semaphore(limit)
+        async with semaphores[platform_type]:
+            try:
+                flag = await check_cookie(platform_type, account["filePath"])
+            except Exception as e:
+                print(f"❌ 验证账号 {account['userName']} 失败: {e}")
+                sweep["failed"] += 1
+                return None
+            finally:
+                sweep["checked"] += 1
+
+        new_status = 1 if flag else 0
+        sweep["valid" if new_status else "invalid"] += 1
+        sweep["results"][account["id"]] = new_status
+        print(f"✅ 验证账号 {account['userName']}: {'正常' if new_status else '异常'}")
+        return account["id"], new_status
+
+    try:
+        results = await asyncio.gather(*(check_one(account) for account in accounts))
+        checked_at = datetime.now().isoformat()
+        updates = [(status, checked_at, account_id) for account_id, status in filter(None, results)]
+        save_check_results(updates)
+        sweep["status"] = "completed"
+    except Exception as e:
+        print(f"❌ 账号校验 {sweep_id} 异常: {e}")
+        sweep["status"] = "failed"
+        sweep["error"] = str(e)
+    finally:
+        sweep["end_time"] = datetime.now().isoformat()
+        sweep["done_event"].set()
+        print(f"🎉 账号校验 {sweep_id} 结束: 正常 {sweep['valid']} / 异常 {sweep['invalid']} / 失败 {sweep['failed']}")
+
+
+def save_check_results(updates: list):
+    """在一个事务中写回 (status, last_check_time, id) 列表"""
+    database.update_account_statuses(updates)
+
+
+def get_sweep_status(sweep_id: str) -> dict:
+    """获取 sweep 状态快照（不含内部同步对象）"""
+    sweep = _sweeps.get(sweep_id)
+    if sweep is None:
+        return None
+    snapshot = {key: value for key, value in sweep.items() if key != "done_event"}
+    snapshot["results"] = dict(sweep["results"])
+    return snapshot
+
+
+def wait_for_sweep(sweep_id: str, timeout: float = None) -> bool:
+    """阻塞等待 sweep 完成，返回是否已完成"""
+    sweep = _sweeps.get(sweep_id)
+    if sweep is None:
+        return True
+    return sweep["done_event"].wait(timeout)
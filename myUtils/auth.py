@@ -2,114 +2,143 @@ import asyncio
 import configparser
 import os
 
-from playwright.async_api import async_playwright
+import requests
+
 from xhs import XhsClient
 
 from conf import BASE_DIR
-from utils.base_social_media import set_init_script
+from utils.browser_pool import run_with_context
 from utils.log import tencent_logger, kuaishou_logger
 from pathlib import Path
 from uploader.xhs_uploader.main import sign_local
+from uploader.bilibili_uploader.main import read_cookie_json_file, extract_keys_from_json
+from uploader.baijiahao_uploader.main import cookie_auth as cookie_auth_baijiahao
+
+
+async def _auth_douyin(context):
+    # 创建一个新的页面
+    page = await context.new_page()
+    # 访问指定的 URL
+    await page.goto("https://creator.douyin.com/creator-micro/content/upload")
+    try:
+        await page.wait_for_url("https://creator.douyin.com/creator-micro/content/upload", timeout=5000)
+    except:
+        print("[+] 等待5秒 cookie 失效")
+        return False
+    # 2024.06.17 抖音创作者中心改版
+    if await page.get_by_text('手机号登录').count() or await page.get_by_text('扫码登录').count():
+        print("[+] 等待5秒 cookie 失效")
+        return False
+    else:
+        print("[+] cookie 有效")
+        return True
+
+
+async def _auth_tencent(context):
+    # 创建一个新的页面
+    page = await context.new_page()
+    # 访问指定的 URL
+    await page.goto("https://channels.weixin.qq.com/platform/post/create")
+    try:
+        await page.wait_for_selector('div.title-name:has-text("微信小店")', timeout=5000)  # 等待5秒
+        tencent_logger.error("[+] 等待5秒 cookie 失效")
+        return False
+    except:
+        tencent_logger.success("[+] cookie 有效")
+        return True
+
+
+async def _auth_ks(context):
+    # 创建一个新的页面
+    page = await context.new_page()
+    # 访问指定的 URL
+    await page.goto("https://cp.kuaishou.com/article/publish/video")
+    try:
+        await page.wait_for_selector("div.names div.container div.name:text('机构服务')", timeout=5000)  # 等待5秒
+
+        kuaishou_logger.info("[+] 等待5秒 cookie 失效")
+        return False
+    except:
+        kuaishou_logger.success("[+] cookie 有效")
+        return True
+
+
+async def _auth_xhs(context):
+    # 创建一个新的页面
+    page = await context.new_page()
+    # 访问指定的 URL
+    await page.goto("https://creator.xiaohongshu.com/creator-micro/content/upload")
+    try:
+        await page.wait_for_url("https://creator.xiaohongshu.com/creator-micro/content/upload", timeout=5000)
+    except:
+        print("[+] 等待5秒 cookie 失效")
+        return False
+    # 2024.06.17 抖音创作者中心改版
+    if await page.get_by_text('手机号登录').count() or await page.get_by_text('扫码登录').count():
+        print("[+] 等待5秒 cookie 失效")
+        return False
+    else:
+        print("[+] cookie 有效")
+        return True
+
 
+# 🔥 所有校验共用常驻浏览器池，每次校验只创建一个隔离上下文
 async def cookie_auth_douyin(account_file):
-    async with async_playwright() as playwright:
-        browser = await playwright.chromium.launch(headless=True)
-        context = await browser.new_context(storage_state=account_file)
-        context = await set_init_script(context)
-        # 创建一个新的页面
-        page = await context.new_page()
-        # 访问指定的 URL
-        await page.goto("https://creator.douyin.com/creator-micro/content/upload")
-        try:
-            await page.wait_for_url("https://creator.douyin.com/creator-micro/content/upload", timeout=5000)
-        except:
-            print("[+] 等待5秒 cookie 失效")
-            await context.close()
-            await browser.close()
-            return False
-        # 2024.06.17 抖音创作者中心改版
-        if await page.get_by_text('手机号登录').count() or await page.get_by_text('扫码登录').count():
-            print("[+] 等待5秒 cookie 失效")
-            return False
-        else:
-            print("[+] cookie 有效")
-            return True
+    return await run_with_context(account_file, _auth_douyin)
 
 async def cookie_auth_tencent(account_file):
-    async with async_playwright() as playwright:
-        browser = await playwright.chromium.launch(headless=True)
-        context = await browser.new_context(storage_state=account_file)
-        context = await set_init_script(context)
-        # 创建一个新的页面
-        page = await context.new_page()
-        # 访问指定的 URL
-        await page.goto("https://channels.weixin.qq.com/platform/post/create")
-        try:
-            await page.wait_for_selector('div.title-name:has-text("微信小店")', timeout=5000)  # 等待5秒
-            tencent_logger.error("[+] 等待5秒 cookie 失效")
-            return False
-        except:
-            tencent_logger.success("[+] cookie 有效")
-            return True
+    return await run_with_context(account_file, _auth_tencent)
 
 async def cookie_auth_ks(account_file):
-    async with async_playwright() as playwright:
-        browser = await playwright.chromium.launch(headless=True)
-        context = await browser.new_context(storage_state=account_file)
-        context = await set_init_script(context)
-        # 创建一个新的页面
-        page = await context.new_page()
-        # 访问指定的 URL
-        await page.goto("https://cp.kuaishou.com/article/publish/video")
-        try:
-            await page.wait_for_selector("div.names div.container div.name:text('机构服务')", timeout=5000)  # 等待5秒
-
-            kuaishou_logger.info("[+] 等待5秒 cookie 失效")
-            return False
-        except:
-            kuaishou_logger.success("[+] cookie 有效")
-            return True
-
+    return await run_with_context(account_file, _auth_ks)
 
 async def cookie_auth_xhs(account_file):
-    async with async_playwright() as playwright:
-        browser = await playwright.chromium.launch(headless=True)
-        context = await browser.new_context(storage_state=account_file)
-        context = await set_init_script(context)
-        # 创建一个新的页面
-        page = await context.new_page()
-        # 访问指定的 URL
-        await page.goto("https://creator.xiaohongshu.com/creator-micro/content/upload")
-        try:
-            await page.wait_for_url("https://creator.xiaohongshu.com/creator-micro/content/upload", timeout=5000)
-        except:
-            print("[+] 等待5秒 cookie 失效")
-            await context.close()
-            await browser.close()
-            return False
-        # 2024.06.17 抖音创作者中心改版
-        if await page.get_by_text('手机号登录').count() or await page.get_by_text('扫码登录').count():
-            print("[+] 等待5秒 cookie 失效")
-            return False
-        else:
-            print("[+] cookie 有效")
-            return True
+    return await run_with_context(account_file, _auth_xhs)
+
+
+def _auth_bilibili(account_file):
+    # B站账号文件是 biliup 的 cookie json，直接请求登录状态接口，不需要浏览器
+    try:
+        cookies = extract_keys_from_json(read_cookie_json_file(account_file))
+        cookies.pop('access_token', None)
+        ret = requests.get("https://api.bilibili.com/x/web-interface/nav", cookies=cookies, timeout=10,
+                           headers={"User-Agent": "Mozilla/5.0"}).json()
+    except Exception as e:
+        print(f"[+] B站 cookie 校验失败: {e}")
+        return False
+    if ret.get('data', {}).get('isLogin'):
+        print("[+] cookie 有效")
+        return True
+    print("[+] cookie 失效")
+    return False
+
+async def cookie_auth_bilibili(account_file):
+    return await asyncio.to_thread(_auth_bilibili, account_file)
 
 
 async def check_cookie(type,file_path):
+    account_file = Path(BASE_DIR / "cookiesFile" / file_path)
+    if not account_file.exists():
+        print(f"⚠️ cookie 文件不存在: {account_file}")
+        return False
     match type:
         # 小红书
         case 1:
-            return await cookie_auth_xhs(Path(BASE_DIR / "cookiesFile" / file_path))
+            return await cookie_auth_xhs(account_file)
         # 视频号
         case 2:
-            return await cookie_auth_tencent(Path(BASE_DIR / "cookiesFile" / file_path))
+            return await cookie_auth_tencent(account_file)
         # 抖音
         case 3:
-            return await cookie_auth_douyin(Path(BASE_DIR / "cookiesFile" / file_path))
+            return await cookie_auth_douyin(account_file)
         # 快手
         case 4:
-            return await cookie_auth_ks(Path(BASE_DIR / "cookiesFile" / file_path))
+            return await cookie_auth_ks(account_file)
+        # B站
+        case 6:
+            return await cookie_auth_bilibili(account_file)
+        # 百家号
+        case 7:
+            return await cookie_auth_baijiahao(str(account_file))
         case _:
             return False
-
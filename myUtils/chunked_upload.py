@@ -0,0 +1,304 @@
+# myUtils/chunked_upload.py
+"""
+分片断点续传（参考 tus 协议）
+- 创建上传会话时按文件大小预分配 videoFile/.uploads/<id>.part，分片直接按偏移量流式写入，
+  不经过 Werkzeug 临时文件，也不需要最后再拼接一次
+- 每个分片带 SHA-256 校验，校验通过才记录为已接收；分片之间互不依赖，可以并行上传
+- 会话和已接收分片保存在 SQLite 中，网络中断或服务重启后查询已接收分片即可续传
+- 合并后的文件进入内容寻址存储（utils/content_store），创建会话时带上整个文件的 SHA-256 且内容已存在则秒传
+"""
+import hashlib
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from conf import BASE_DIR
+from utils import database, content_store
+from utils.video_probe import get_probe_pool
+from utils.video_utils import is_video_file
+
+UPLOAD_DIR = Path(BASE_DIR / "videoFile")
+PART_DIR = UPLOAD_DIR / ".uploads"
+# 默认分片大小 8MB，客户端可以在 4MB~64MB 之间自行指定
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+MIN_CHUNK_SIZE = 4 * 1024 * 1024
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+# 单个文件上限，与 sau_backend 原来的 MAX_CONTENT_LENGTH 一致
+MAX_UPLOAD_SIZE = 1024 * 1024 * 1024 * 4
+# 从请求流读取并写盘的块大小
+STREAM_BUFFER_SIZE = 1024 * 1024
+# 未完成会话的保留时间（秒），过期后删除分片文件
+UPLOAD_SESSION_TTL = 24 * 3600
+
+UPLOAD_PENDING = "uploading"
+UPLOAD_COMPLETED = "completed"
+
+UPLOAD_TABLE_SQL = [
+    '''
+    CREATE TABLE IF NOT EXISTS upload_sessions (
+        id TEXT PRIMARY KEY,
+        filename TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        chunk_size INTEGER NOT NULL,
+        total_chunks INTEGER NOT NULL,
+        checksum TEXT,
+        record INTEGER DEFAULT 1,
+        status TEXT NOT NULL DEFAULT 'uploading',
+        file_path TEXT,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS upload_chunks (
+        upload_id TEXT NOT NULL,
+        chunk_index INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        sha256 TEXT NOT NULL,
+        PRIMARY KEY (upload_id, chunk_index)
+    )
+    ''',
+]
+
+_table_ready = False
+_table_lock = threading.Lock()
+
+
+class UploadError(Exception):
+    """上传协议错误，status 为对应的 HTTP 状态码"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def _init_tables():
+    global _table_ready
+    if _table_ready:
+        return
+    with _table_lock:
+        if _table_ready:
+            return
+        with database.transaction() as conn:
+            for sql in UPLOAD_TABLE_SQL:
+                conn.execute(sql)
+        PART_DIR.mkdir(parents=True, exist_ok=True)
+        _table_ready = True
+
+
+def _part_path(upload_id: str) -> Path:
+    return PART_DIR / f"{upload_id}.part"
+
+
+def _get_session(upload_id: str) -> dict:
+    _init_tables()
+    row = database.query_one("SELECT * FROM upload_sessions WHERE id = ?", (upload_id,))
+    if row is None:
+        raise UploadError("上传会话不存在或已过期", 404)
+    return dict(row)
+
+
+def _received_chunks(upload_id: str) -> list:
+    rows = database.query("SELECT chunk_index FROM upload_chunks WHERE upload_id = ? ORDER BY chunk_index",
+                          (upload_id,))
+    return [row["chunk_index"] for row in rows]
+
+
+def _chunk_length(session: dict, index: int) -> int:
+    if index == session["total_chunks"] - 1:
+        return session["size"] - index * session["chunk_size"]
+    return session["chunk_size"]
+
+
+def session_info(session: dict) -> dict:
+    """会话状态：已接收分片、已接收字节数、从头开始连续接收到的偏移量"""
+    received = _received_chunks(session["id"])
+    received_set = set(received)
+    offset_chunks = 0
+    while offset_chunks in received_set:
+        offset_chunks += 1
+    return {
+        "upload_id": session["id"],
+        "filename": session["filename"],
+        "size": session["size"],
+        "chunk_size": session["chunk_size"],
+        "total_chunks": session["total_chunks"],
+        "received": received,
+        "received_bytes": sum(_chunk_length(session, index) for index in received),
+        "offset": min(offset_chunks * session["chunk_size"], session["size"]),
+        "status": session["status"],
+        "filepath": session["file_path"],
+    }
+
+
+def create_session(filename: str, size: int, chunk_size: int = None, checksum: str = None,
+                   record: bool = True, custom_filename: str = None) -> dict:
+    """
+    创建上传会话并预分配分片文件
+    checksum: 可选的整个文件 SHA-256，合并时校验；内容已在存储中时直接完成（秒传），不需要上传分片
+    record: 完成后是否写入 file_records（素材库）；custom_filename: 自定义文件名（不含扩展名）
+    """
+    _init_tables()
+    purge_expired_sessions()
+    if not filename or '/' in filename or '\\' in filename or '..' in filename:
+        raise UploadError("Invalid filename")
+    if not is_video_file(filename):
+        raise UploadError("不支持的视频格式，请上传 MP4、MOV、AVI 等格式的视频")
+    if size <= 0 or size > MAX_UPLOAD_SIZE:
+        raise UploadError("文件大小超出限制", 413)
+    if custom_filename:
+        filename = custom_filename + "." + filename.split('.')[-1]
+    chunk_size = min(max(chunk_size or DEFAULT_CHUNK_SIZE, MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+    total_chunks = (size + chunk_size - 1) // chunk_size
+    checksum = checksum.lower() if checksum else None
+
+    upload_id = uuid.uuid4().hex
+    now = time.time()
+    stored = content_store.add_file_record(filename, checksum, size) if checksum and record else None
+    if stored:
+        database.execute('''
+            INSERT INTO upload_sessions (id, filename, size, chunk_size, total_chunks, checksum, record, status, file_path, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (upload_id, filename, size, chunk_size, total_chunks, checksum, 1, UPLOAD_COMPLETED, stored["path"], now, now))
+        print(f"⚡ 秒传: {filename} -> {stored['path']}")
+        get_probe_pool().submit(stored["id"])
+        return session_info(_get_session(upload_id))
+
+    with open(_part_path(upload_id), "wb") as f:
+        f.truncate(size)
+    database.execute('''
+        INSERT INTO upload_sessions (id, filename, size, chunk_size, total_chunks, checksum, record, status, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (upload_id, filename, size, chunk_size, total_chunks, checksum, 1 if record else 0, UPLOAD_PENDING, now, now))
+    print(f"📦 创建上传会话 {upload_id}: {filename} ({size} 字节, {total_chunks} 个分片)")
+    return session_info(_get_session(upload_id))
+
+
+def get_session_info(upload_id: str) -> dict:
+    return session_info(_get_session(upload_id))
+
+
+def write_chunk(upload_id: str, index: int, stream, sha256: str, content_length: int = None) -> dict:
+    """
+    从请求流读取一个分片，边读边写入分片文件的对应偏移量并计算 SHA-256
+    校验不通过时不记录该分片（已写入的数据会被重传覆盖）
+    """
+    session = _get_session(upload_id)
+    if session["status"] != UPLOAD_PENDING:
+        raise UploadError("上传已完成", 409)
+    if index < 0 or index >= session["total_chunks"]:
+        raise UploadError("分片序号超出范围", 416)
+    if not sha256:
+        raise UploadError("缺少分片校验值")
+    expected = _chunk_length(session, index)
+    if content_length is not None and content_length != expected:
+        raise UploadError(f"分片大小错误，应为 {expected} 字节", 416)
+
+    digest = hashlib.sha256()
+    written = 0
+    with open(_part_path(upload_id), "r+b") as f:
+        f.seek(index * session["chunk_size"])
+        while written < expected:
+            block = stream.read(min(STREAM_BUFFER_SIZE, expected - written))
+            if not block:
+                break
+            f.write(block)
+            digest.update(block)
+            written += len(block)
+    if written != expected:
+        raise UploadError(f"分片数据不完整: {written}/{expected}", 400)
+    if digest.hexdigest() != sha256.lower():
+        raise UploadError("分片校验失败", 422)
+
+    with database.transaction() as conn:
+        conn.execute('''
+            INSERT OR REPLACE INTO upload_chunks (upload_id, chunk_index, size, sha256) VALUES (?, ?, ?, ?)
+        ''', (upload_id, index, written, sha256.lower()))
+        conn.execute("UPDATE upload_sessions SET updated_at = ? WHERE id = ?", (time.time(), upload_id))
+    return {"upload_id": upload_id, "index": index, "size": written}
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(STREAM_BUFFER_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def complete_session(upload_id: str, custom_filename: str = None) -> dict:
+    """
+    所有分片到齐后合并：需要写入素材库的文件移动进内容寻址存储（相同内容只保留一份），
+    否则按原来的 uuid_文件名 放到 videoFile/。返回 {filename, filepath}
+    """
+    session = _get_session(upload_id)
+    if session["status"] == UPLOAD_COMPLETED:
+        return {"filename": session["filename"], "filepath": session["file_path"]}
+    missing = session["total_chunks"] - len(_received_chunks(upload_id))
+    if missing:
+        raise UploadError(f"还有 {missing} 个分片未上传", 409)
+
+    part_path = _part_path(upload_id)
+    # 分片乱序到达，无法边收边算整个文件的摘要，合并时顺序读取一遍
+    digest = _file_sha256(part_path)
+    if session["checksum"] and digest != session["checksum"]:
+        raise UploadError("文件校验失败", 422)
+
+    filename = session["filename"]
+    if custom_filename:
+        filename = custom_filename + "." + filename.split('.')[-1]
+
+    # 先把会话标记为完成，并发的 complete 请求只有一个会移动文件
+    claimed = database.execute('''
+        UPDATE upload_sessions SET status = ?, filename = ?, updated_at = ?
+        WHERE id = ? AND status = ?
+    ''', (UPLOAD_COMPLETED, filename, time.time(), upload_id, UPLOAD_PENDING)).rowcount
+    if not claimed:
+        session = _get_session(upload_id)
+        return {"filename": session["filename"], "filepath": session["file_path"]}
+    try:
+        if session["record"]:
+            stored = content_store.store_file(part_path, filename, digest)
+            final_filename = stored["path"]
+            get_probe_pool().submit(stored["id"])
+        else:
+            final_filename = f"{uuid.uuid1()}_{filename}"
+            os.replace(part_path, UPLOAD_DIR / final_filename)
+    except OSError:
+        database.execute("UPDATE upload_sessions SET status = ? WHERE id = ?", (UPLOAD_PENDING, upload_id))
+        raise
+
+    with database.transaction() as conn:
+        conn.execute("UPDATE upload_sessions SET file_path = ? WHERE id = ?", (final_filename, upload_id))
+        conn.execute("DELETE FROM upload_chunks WHERE upload_id = ?", (upload_id,))
+    print(f"✅ 分片上传完成: {final_filename}")
+    return {"filename": filename, "filepath": final_filename}
+
+
+def abort_session(upload_id: str):
+    """取消上传，删除分片文件和会话"""
+    _get_session(upload_id)
+    _delete_session(upload_id)
+
+
+def _delete_session(upload_id: str):
+    try:
+        _part_path(upload_id).unlink(missing_ok=True)
+    except OSError as e:
+        print(f"⚠️ 删除分片文件失败 {upload_id}: {e}")
+    with database.transaction() as conn:
+        conn.execute("DELETE FROM upload_chunks WHERE upload_id = ?", (upload_id,))
+        conn.execute("DELETE FROM upload_sessions WHERE id = ?", (upload_id,))
+
+
+def purge_expired_sessions(ttl: float = UPLOAD_SESSION_TTL) -> int:
+    """清理超过保留时间的会话（未完成的同时删除分片文件）"""
+    _init_tables()
+    rows = database.query("SELECT id FROM upload_sessions WHERE updated_at < ?", (time.time() - ttl,))
+    for row in rows:
+        _delete_session(row["id"])
+    if rows:
+        print(f"🧹 清理过期上传会话 {len(rows)} 个")
+    return len(rows)
@@ -0,0 +1,96 @@
+# myUtils/login_hub.py
+"""
+扫码登录中心 - 所有登录流程在同一个后台事件循环中并发执行
+登录状态写入每个登录自己的队列，SSE 订阅者阻塞等待事件（不再 100ms 轮询），
+空闲时发送心跳，超时或连接断开时取消登录并清理队列
+"""
+import queue
+import threading
+import time
+
+from myUtils.login import xiaohongshu_cookie_gen, get_tencent_cookie, douyin_cookie_gen, get_ks_cookie
+from utils.background_loop import submit
+
+# 登录流程所在的后台事件循环名称
+LOGIN_LOOP = "login"
+# 单次登录（扫码 + 保存账号）的最长时间（秒）
+LOGIN_TIMEOUT = 300
+# 没有新状态时发送 SSE 心跳的间隔（秒），避免代理断开空闲连接
+LOGIN_HEARTBEAT_INTERVAL = 15
+# 登录结束状态：200 成功 / 500 失败
+FINAL_STATUSES = ("200", "500")
+
+# 平台类型 -> 登录流程（1 小红书 2 视频号 3 抖音 4 快手）
+LOGIN_FLOWS = {
+    '1': xiaohongshu_cookie_gen,
+    '2': get_tencent_cookie,
+    '3': douyin_cookie_gen,
+    '4': get_ks_cookie,
+}
+
+_logins = {}
+_logins_lock = threading.Lock()
+
+
+def start_login(type, id) -> queue.Queue:
+    """在登录循环中启动扫码登录，返回该登录的状态队列；同一 id 的旧登录会被取消"""
+    status_queue = queue.Queue()
+    flow = LOGIN_FLOWS.get(str(type))
+    if flow is None:
+        print(f"❌ 不支持的登录平台类型: {type}")
+        status_queue.put("500")
+        return status_queue
+
+    with _logins_lock:
+        previous = _logins.pop(id, None)
+        future = submit(flow(id, status_queue), LOGIN_LOOP)
+        _logins[id] = {"queue": status_queue, "future": future}
+
+    if previous:
+        _cancel(previous)
+    return status_queue
+
+
+def _cancel(login: dict):
+    if not login["future"].done():
+        login["future"].cancel()
+        # 通知仍在等待的订阅者结束
+        login["queue"].put("500")
+
+
+def _release(id, status_queue: queue.Queue):
+    with _logins_lock:
+        login = _logins.get(id)
+        if login is None or login["queue"] is not status_queue:
+            return
+        _logins.pop(id)
+    _cancel(login)
+
+
+def login_event_stream(id, status_queue: queue.Queue, timeout: float = LOGIN_TIMEOUT,
+                       heartbeat: float = LOGIN_HEARTBEAT_INTERVAL):
+    """SSE 事件生成器：推送二维码和最终状态，结束（含客户端断开）时清理登录"""
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print(f"⏰ 登录 {id} 超时")
+                yield "data: 500\n\n"
+                break
+            try:
+                msg = status_queue.get(timeout=min(heartbeat, remaining))
+            except queue.Empty:
+                yield ": heartbeat\n\n"
+                continue
+            yield f"data: {msg}\n\n"
+            if msg in FINAL_STATUSES:
+                print(f"✅ SSE 发送完成状态: {msg}")
+                break
+    finally:
+        _release(id, status_queue)
+
+
+def get_active_logins() -> list:
+    with _logins_lock:
+        return list(_logins)
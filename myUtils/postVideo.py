@@ -1,89 +1,71 @@
-import asyncio
 from pathlib import Path
 from conf import BASE_DIR
-from uploader.douyin_uploader.main import DouYinVideo
-from uploader.ks_uploader.main import KSVideo
-from uploader.tencent_uploader.main import TencentVideo
-from uploader.xiaohongshu_uploader.main import XiaoHongShuVideo
+from myUtils.publish_engine import create_publish_job, run_publish_jobs
+from utils.base_social_media import SOCIAL_MEDIA_DOUYIN, SOCIAL_MEDIA_TENCENT, SOCIAL_MEDIA_KUAISHOU, \
+    SOCIAL_MEDIA_XIAOHONGSHU, SOCIAL_MEDIA_TIKTOK, SOCIAL_MEDIA_BILIBILI, SOCIAL_MEDIA_BAIJIAHAO
 
 from utils.constant import TencentZoneTypes
 from utils.files_times import generate_schedule_time_next_day
+from utils.rate_limiter import THROTTLE_MAX_WAIT
 
+# 平台标识 -> 发布平台
+PLATFORM_TYPES = {
+    1: SOCIAL_MEDIA_XIAOHONGSHU,
+    2: SOCIAL_MEDIA_TENCENT,
+    3: SOCIAL_MEDIA_DOUYIN,
+    4: SOCIAL_MEDIA_KUAISHOU,
+    5: SOCIAL_MEDIA_TIKTOK,
+    6: SOCIAL_MEDIA_BILIBILI,
+    7: SOCIAL_MEDIA_BAIJIAHAO,
+}
 
-def post_video_tencent(title, files, tags, account_file, category=TencentZoneTypes.LIFESTYLE.value, enableTimer=False, videos_per_day=1, daily_times=None, start_days=0):
-    """视频号发布 - 自动选择浏览器实现"""
+
+def build_publish_jobs(platform, title, files, tags, account_file, category=None, enableTimer=False, videos_per_day=1, daily_times=None, start_days=0, uploader=None):
+    """把 文件×账号 展开为发布任务列表；uploader 指定上传器实现（browser / api），不指定时按 conf 默认"""
     account_file = [Path(BASE_DIR / "cookiesFile" / file) for file in account_file]
     files = [Path(BASE_DIR / "videoFile" / file) for file in files]
-    
+
     if enableTimer:
-        publish_datetimes = generate_schedule_time_next_day(len(files), videos_per_day, daily_times, start_days)
+        publish_datetimes = generate_schedule_time_next_day(len(files), videos_per_day, daily_times, start_days=start_days)
     else:
         publish_datetimes = [0 for i in range(len(files))]
-    
+
+    jobs = []
     for index, file in enumerate(files):
         for cookie in account_file:
-            print(f"文件路径{str(file)}")
-            print(f"视频文件名：{file}")
-            print(f"标题：{title}")
-            print(f"Hashtag：{tags}")
-            
-            app = TencentVideo(title, str(file), tags, publish_datetimes[index], cookie, category)
-            asyncio.run(app.main(), debug=False)
+            jobs.append(create_publish_job(platform, title, file, tags, publish_datetimes[index], cookie, category, uploader))
+    return jobs
 
-def post_video_DouYin(title, files, tags, account_file, category=None, enableTimer=False, videos_per_day=1, daily_times=None, start_days=0):
+
+def build_publish_jobs_by_type(type_val, title, files, tags, account_file, category=None, enableTimer=False, videos_per_day=1, daily_times=None, start_days=0, uploader=None):
+    """按平台标识（1 小红书 2 视频号 3 抖音 4 快手 5 TikTok 6 B站 7 百家号）展开发布任务"""
+    if type_val not in PLATFORM_TYPES:
+        raise ValueError(f"不支持的平台类型: {type_val}")
+    if type_val == 2 and category is None:
+        category = TencentZoneTypes.LIFESTYLE.value
+    return build_publish_jobs(PLATFORM_TYPES[type_val], title, files, tags, account_file, category, enableTimer, videos_per_day, daily_times, start_days, uploader)
+
+
+def post_video_tencent(title, files, tags, account_file, category=TencentZoneTypes.LIFESTYLE.value, enableTimer=False, videos_per_day=1, daily_times=None, start_days=0, throttle_max_wait=THROTTLE_MAX_WAIT):
+    """视频号发布 - 自动选择浏览器实现"""
+    jobs = build_publish_jobs(SOCIAL_MEDIA_TENCENT, title, files, tags, account_file, category, enableTimer, videos_per_day, daily_times, start_days)
+    return run_publish_jobs(jobs, throttle_max_wait=throttle_max_wait)
+
+def post_video_DouYin(title, files, tags, account_file, category=None, enableTimer=False, videos_per_day=1, daily_times=None, start_days=0, throttle_max_wait=THROTTLE_MAX_WAIT):
     """抖音发布 - 自动选择浏览器实现"""
-    account_file = [Path(BASE_DIR / "cookiesFile" / file) for file in account_file]
-    files = [Path(BASE_DIR / "videoFile" / file) for file in files]
-    
-    if enableTimer:
-        publish_datetimes = generate_schedule_time_next_day(len(files), videos_per_day, daily_times, start_days)
-    else:
-        publish_datetimes = [0 for i in range(len(files))]
-    
-    for index, file in enumerate(files):
-        for cookie in account_file:
-            print(f"文件路径{str(file)}")
-            print(f"视频文件名：{file}")
-            print(f"标题：{title}")
-            print(f"Hashtag：{tags}")
-            
-            app = DouYinVideo(title, str(file), tags, publish_datetimes[index], cookie, category)
-            asyncio.run(app.main(), debug=False)
+    jobs = build_publish_jobs(SOCIAL_MEDIA_DOUYIN, title, files, tags, account_file, category, enableTimer, videos_per_day, daily_times, start_days)
+    return run_publish_jobs(jobs, throttle_max_wait=throttle_max_wait)
 
-def post_video_ks(title, files, tags, account_file, category=None, enableTimer=False, videos_per_day=1, daily_times=None, start_days=0):
-    account_file = [Path(BASE_DIR / "cookiesFile" / file) for file in account_file]
-    files = [Path(BASE_DIR / "videoFile" / file) for file in files]
-    
-    if enableTimer:
-        publish_datetimes = generate_schedule_time_next_day(len(files), videos_per_day, daily_times, start_days)
-    else:
-        publish_datetimes = [0 for i in range(len(files))]
-    
-    for index, file in enumerate(files):
-        for cookie in account_file:
-            print(f"文件路径{str(file)}")
-            print(f"视频文件名：{file}")
-            print(f"标题：{title}")
-            print(f"Hashtag：{tags}")
-            
-            app = KSVideo(title, str(file), tags, publish_datetimes[index], cookie)
-            asyncio.run(app.main(), debug=False)
+def post_video_ks(title, files, tags, account_file, category=None, enableTimer=False, videos_per_day=1, daily_times=None, start_days=0, throttle_max_wait=THROTTLE_MAX_WAIT):
+    jobs = build_publish_jobs(SOCIAL_MEDIA_KUAISHOU, title, files, tags, account_file, category, enableTimer, videos_per_day, daily_times, start_days)
+    return run_publish_jobs(jobs, throttle_max_wait=throttle_max_wait)
 
-def post_video_xhs(title, files, tags, account_file, category=None, enableTimer=False, videos_per_day=1, daily_times=None, start_days=0):
-    account_file = [Path(BASE_DIR / "cookiesFile" / file) for file in account_file]
-    files = [Path(BASE_DIR / "videoFile" / file) for file in files]
-    
-    file_num = len(files)
-    if enableTimer:
-        publish_datetimes = generate_schedule_time_next_day(file_num, videos_per_day, daily_times, start_days)
-    else:
-        publish_datetimes = 0
-    
-    for index, file in enumerate(files):
-        for cookie in account_file:
-            print(f"视频文件名：{file}")
-            print(f"标题：{title}")
-            print(f"Hashtag：{tags}")
-            
-            app = XiaoHongShuVideo(title, file, tags, publish_datetimes, cookie)
-            asyncio.run(app.main(), debug=False)
+def post_video_xhs(title, files, tags, account_file, category=None, enableTimer=False, videos_per_day=1, daily_times=None, start_days=0, uploader=None, throttle_max_wait=THROTTLE_MAX_WAIT):
+    """小红书发布 - uploader="api" 时通过 XhsClient 接口发布，不启动浏览器"""
+    jobs = build_publish_jobs(SOCIAL_MEDIA_XIAOHONGSHU, title, files, tags, account_file, category, enableTimer, videos_per_day, daily_times, start_days, uploader)
+    return run_publish_jobs(jobs, throttle_max_wait=throttle_max_wait)
+
+def post_video_bilibili(title, files, tags, account_file, category=None, enableTimer=False, videos_per_day=1, daily_times=None, start_days=0, throttle_max_wait=THROTTLE_MAX_WAIT):
+    """B站发布 - 接口上传，category 为分区 tid（默认 日常）"""
+    jobs = build_publish_jobs(SOCIAL_MEDIA_BILIBILI, title, files, tags, account_file, category, enableTimer, videos_per_day, daily_times, start_days)
+    return run_publish_jobs(jobs, throttle_max_wait=throttle_max_wait)
@@ -0,0 +1,267 @@
+# myUtils/publish_engine.py
+"""
+并发发布引擎 - 在同一个事件循环中并发执行 文件×账号 的上传任务
+每个平台、每个账号都有独立的并发上限，返回每一对任务的执行结果
+每次调用上传器之前先经过发布限流（utils/rate_limiter），短时间的限流原地等待，
+需要等待更久（或当日配额用完）的任务返回 throttled 结果，由调用方延后重新调度
+启动浏览器前先检查视频探测结果，损坏 / 不支持的文件直接失败；大文件、长视频优先开始上传
+开启转码时（conf.ENABLE_TRANSCODE）不符合平台规格的视频先转码，上传转码后的文件
+同一账号的连续上传在 session_scope 内复用常驻浏览器上下文（utils/account_sessions）
+上传器的进度事件（阶段、百分比、字节数、重试）带上任务标识 job 交给 on_event，汇总写入结果的 progress 字段
+任务的 uploader 为 "api" 时使用平台接口发布（目前支持小红书），不启动浏览器，按 "<平台>:api" 单独计算并发上限
+"""
+import asyncio
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import conf
+from uploader.douyin_uploader.main import DouYinVideo
+from uploader.ks_uploader.main import KSVideo
+from uploader.tencent_uploader.main import TencentVideo
+from uploader.xiaohongshu_uploader.main import XiaoHongShuVideo
+from uploader.xhs_uploader.api_publisher import XhsApiVideo
+from uploader.tk_uploader.main_chrome import TiktokVideo
+from uploader.baijiahao_uploader.main import BaiJiaHaoVideo
+from uploader.bilibili_uploader.main import BilibiliVideo
+from uploader.bilibili_uploader.upload_tuning import CONCURRENT_UPLOADS as BILIBILI_CONCURRENT_UPLOADS
+from utils.account_sessions import session_scope
+from utils.browser_adapter import close_adapter_session
+from utils.rate_limiter import acquire, RateLimited, THROTTLE_MAX_WAIT
+from utils.video_probe import get_video_metadata, ProbeError
+from utils.transcoder import get_transcoder, TranscodeError, ENABLE_TRANSCODE
+from utils.upload_progress import UploadProgress
+from utils.base_social_media import SOCIAL_MEDIA_DOUYIN, SOCIAL_MEDIA_TENCENT, SOCIAL_MEDIA_KUAISHOU, \
+    SOCIAL_MEDIA_XIAOHONGSHU, SOCIAL_MEDIA_TIKTOK, SOCIAL_MEDIA_BAIJIAHAO, SOCIAL_MEDIA_BILIBILI
+
+# 每个平台同时进行的上传数上限
+PLATFORM_CONCURRENCY = {
+    SOCIAL_MEDIA_XIAOHONGSHU: 2,
+    SOCIAL_MEDIA_TENCENT: 2,
+    SOCIAL_MEDIA_DOUYIN: 3,
+    SOCIAL_MEDIA_KUAISHOU: 3,
+    SOCIAL_MEDIA_TIKTOK: 2,
+    SOCIAL_MEDIA_BAIJIAHAO: 2,
+    # B 站走接口上传，分片线程由共享带宽预算分配（uploader/bilibili_uploader/upload_tuning）
+    SOCIAL_MEDIA_BILIBILI: BILIBILI_CONCURRENT_UPLOADS,
+    # 接口发布不占用浏览器，并发只受平台接口限流约束
+    f"{SOCIAL_MEDIA_XIAOHONGSHU}:api": 6,
+}
+DEFAULT_PLATFORM_CONCURRENCY = 2
+
+# 上传器实现：browser 驱动浏览器页面，api 直接调用平台接口
+UPLOADER_BROWSER = "browser"
+UPLOADER_API = "api"
+# 支持接口发布的平台
+API_PLATFORMS = [SOCIAL_MEDIA_XIAOHONGSHU]
+# 任务没有指定 uploader 时各平台的默认实现，如 {"xiaohongshu": "api"}
+DEFAULT_UPLOADERS = getattr(conf, "DEFAULT_UPLOADERS", {})
+
+# 同一账号同时进行的上传数上限（同账号并发发布容易触发平台风控）
+ACCOUNT_CONCURRENCY = 1
+
+
+def resolve_uploader(platform: str, uploader: str = None) -> str:
+    """任务使用的上传器实现；平台不支持接口发布时始终使用浏览器"""
+    uploader = uploader or DEFAULT_UPLOADERS.get(platform, UPLOADER_BROWSER)
+    if uploader == UPLOADER_API and platform not in API_PLATFORMS:
+        return UPLOADER_BROWSER
+    return uploader
+
+
+def create_publish_job(platform, title, file_path, tags, publish_date, account_file, category=None,
+                       uploader=None) -> dict:
+    """构造一个 文件×账号 发布任务"""
+    return {
+        "platform": platform,
+        "title": title,
+        "file": str(file_path),
+        "tags": tags,
+        "publish_date": publish_date,
+        "account_file": str(account_file),
+        "category": category,
+        "uploader": resolve_uploader(platform, uploader),
+    }
+
+
+def job_to_payload(job: dict) -> dict:
+    """转换为可 JSON 序列化的任务（定时发布时间转为 ISO 字符串），用于写入任务队列"""
+    payload = dict(job)
+    if isinstance(job["publish_date"], datetime):
+        payload["publish_date"] = job["publish_date"].isoformat()
+    return payload
+
+
+def job_from_payload(payload: dict) -> dict:
+    job = dict(payload)
+    if isinstance(payload["publish_date"], str):
+        job["publish_date"] = datetime.fromisoformat(payload["publish_date"])
+    return job
+
+
+def job_key(job: dict) -> str:
+    """任务的唯一标识，用于重新调度时跳过已经执行过的任务"""
+    return f"{job['platform']}|{job['file']}|{job['account_file']}"
+
+
+def concurrency_key(job: dict) -> str:
+    """平台并发名额的计数键：接口发布和浏览器发布分开计算"""
+    if job.get("uploader") == UPLOADER_API:
+        return f"{job['platform']}:{UPLOADER_API}"
+    return job["platform"]
+
+
+def create_uploader(job: dict):
+    """根据任务平台（和 uploader 实现）创建对应的上传器实例"""
+    match job["platform"]:
+        case "xiaohongshu" if job.get("uploader") == UPLOADER_API:
+            return XhsApiVideo(job["title"], Path(job["file"]), job["tags"], job["publish_date"], Path(job["account_file"]))
+        case "xiaohongshu":
+            return XiaoHongShuVideo(job["title"], Path(job["file"]), job["tags"], job["publish_date"], Path(job["account_file"]))
+        case "tencent":
+            return TencentVideo(job["title"], job["file"], job["tags"], job["publish_date"], Path(job["account_file"]), job["category"])
+        case "douyin":
+            return DouYinVideo(job["title"], job["file"], job["tags"], job["publish_date"], Path(job["account_file"]))
+        case "kuaishou":
+            return KSVideo(job["title"], job["file"], job["tags"], job["publish_date"], Path(job["account_file"]))
+        case "tiktok":
+            return TiktokVideo(job["title"], job["file"], job["tags"], job["publish_date"], Path(job["account_file"]))
+        case "baijiahao":
+            return BaiJiaHaoVideo(job["title"], job["file"], job["tags"], job["publish_date"], Path(job["account_file"]))
+        case "bilibili":
+            return BilibiliVideo(job["title"], job["file"], job["tags"], job["publish_date"], Path(job["account_file"]), job["category"])
+        case _:
+            raise ValueError(f"不支持的发布平台: {job['platform']}")
+
+
+class PublishEngine:
+    def __init__(self, platform_concurrency: dict = None, account_concurrency: int = ACCOUNT_CONCURRENCY,
+                 throttle_max_wait: float = THROTTLE_MAX_WAIT, transcode: bool = ENABLE_TRANSCODE):
+        self.platform_concurrency = {**PLATFORM_CONCURRENCY, **(platform_concurrency or {})}
+        self.account_concurrency = account_concurrency
+        self.throttle_max_wait = throttle_max_wait
+        self.transcode = transcode
+        self._platform_semaphores = {}
+        self._account_semaphores = {}
+        self._metadata = {}
+
+    def _platform_semaphore(self, platform: str) -> asyncio.Semaphore:
+        if platform not in self._platform_semaphores:
+            limit = self.platform_concurrency.get(platform, DEFAULT_PLATFORM_CONCURRENCY)
+            self._platform_semaphores[platform] = asyncio.Semaphore(limit)
+        return self._platform_semaphores[platform]
+
+    def _account_semaphore(self, account_file: str) -> asyncio.Semaphore:
+        if account_file not in self._account_semaphores:
+            self._account_semaphores[account_file] = asyncio.Semaphore(self.account_concurrency)
+        return self._account_semaphores[account_file]
+
+    async def _video_metadata(self, file: str):
+        """视频元数据（同一文件只查询一次），探测失败时返回 ProbeError 实例"""
+        if file not in self._metadata:
+            try:
+                self._metadata[file] = await asyncio.to_thread(get_video_metadata, file)
+            except (ProbeError, OSError) as e:
+                self._metadata[file] = ProbeError(str(e))
+        return self._metadata[file]
+
+    async def _job_weight(self, job: dict) -> tuple:
+        metadata = await self._video_metadata(job["file"])
+        duration = (metadata.get("duration") or 0) if isinstance(metadata, dict) else 0
+        try:
+            size = os.path.getsize(job["file"])
+        except OSError:
+            size = 0
+        return duration, size
+
+    async def run(self, jobs: list, on_event=None) -> list:
+        """
+        并发执行所有任务，结果顺序与 jobs 一致；时长 / 体积大的任务先开始（先拿到并发名额）
+        on_event(event) 接收所有任务的上传进度事件
+        """
+        if not jobs:
+            return []
+        print(f"🚀 发布引擎启动: {len(jobs)} 个上传任务")
+        weights = await asyncio.gather(*(self._job_weight(job) for job in jobs))
+        order = sorted(range(len(jobs)), key=lambda index: weights[index], reverse=True)
+        tasks = {index: asyncio.ensure_future(self.run_job(jobs[index], on_event)) for index in order}
+        results = [await tasks[index] for index in range(len(jobs))]
+        success_count = sum(1 for result in results if result["success"])
+        throttled_count = sum(1 for result in results if result.get("throttled"))
+        print(f"📊 发布引擎完成: {success_count}/{len(results)} 成功" +
+              (f"，{throttled_count} 个限流待重新调度" if throttled_count else ""))
+        return results
+
+    async def run_job(self, job: dict, on_event=None) -> dict:
+        result = {
+            "platform": job["platform"],
+            "file": Path(job["file"]).name,
+            "account": Path(job["account_file"]).name,
+            "title": job["title"],
+            "success": False,
+            "error": None,
+        }
+        key = job_key(job)
+        # 无法解析的视频在启动浏览器之前直接失败
+        metadata = await self._video_metadata(job["file"])
+        if isinstance(metadata, ProbeError):
+            result["error"] = f"视频文件无效: {metadata}"
+            print(f"❌ 跳过上传 [{job['platform']}] {result['file']}: {result['error']}")
+            return result
+        if self.transcode:
+            try:
+                # 同一源文件、同一规格的转码只执行一次，多个平台 / 账号共用
+                future = await asyncio.to_thread(
+                    get_transcoder().transcode_for_platform, job["file"], job["platform"], metadata)
+                upload_file = await asyncio.wrap_future(future)
+            except (TranscodeError, OSError) as e:
+                result["error"] = f"转码失败: {e}"
+                print(f"❌ 跳过上传 [{job['platform']}] {result['file']}: {result['error']}")
+                return result
+            job = {**job, "file": str(upload_file)}
+        # 限流等待不占用账号 / 平台并发名额
+        try:
+            await acquire(job["platform"], result["account"], self.throttle_max_wait)
+        except RateLimited as e:
+            result.update(error=str(e), throttled=True, retry_after=round(e.retry_after, 1))
+            print(f"⏳ 限流 [{job['platform']}] {result['file']} -> {result['account']}: {e}")
+            return result
+        # 先拿账号锁再拿平台锁，避免排队中的同账号任务占用平台并发名额
+        async with self._account_semaphore(job["account_file"]):
+            async with self._platform_semaphore(concurrency_key(job)):
+                started = time.monotonic()
+                result["started_at"] = datetime.now().isoformat()
+                print(f"⬆️ 开始上传 [{job['platform']}] {result['file']} -> {result['account']}")
+                progress = UploadProgress(job["platform"], result["account"], result["file"], on_event, job=key)
+                try:
+                    app = create_uploader(job)
+                    app.progress = progress
+                    await app.main()
+                    result["success"] = True
+                    print(f"✅ 上传完成 [{job['platform']}] {result['file']} -> {result['account']}")
+                except Exception as e:
+                    result["error"] = str(e)
+                    print(f"❌ 上传失败 [{job['platform']}] {result['file']} -> {result['account']}: {e}")
+                finally:
+                    progress.finish(result["error"])
+                    result["finished_at"] = datetime.now().isoformat()
+                    result["duration"] = round(time.monotonic() - started, 2)
+                    result["progress"] = progress.summary()
+        return result
+
+
+def run_publish_jobs(jobs: list, platform_concurrency: dict = None, account_concurrency: int = ACCOUNT_CONCURRENCY,
+                     throttle_max_wait: float = THROTTLE_MAX_WAIT, on_event=None) -> list:
+    """同步入口：在一个事件循环中执行全部任务并返回每一对任务的结果，on_event 接收上传进度事件"""
+    engine = PublishEngine(platform_concurrency, account_concurrency, throttle_max_wait)
+
+    async def _run():
+        try:
+            async with session_scope():
+                return await engine.run(jobs, on_event)
+        finally:
+            # 事件循环随 asyncio.run 结束，顺带关闭该循环上的 multi-account-browser 连接池
+            await close_adapter_session()
+
+    return asyncio.run(_run())
@@ -0,0 +1,288 @@
+# myUtils/publish_tasks.py
+"""
+发布相关的持久化任务 - 批量发布任务写入 tasks 表
+- embedded 模式（默认）：由 sau_backend 内置的固定大小 worker 池执行，
+  子任务结果随进度写回数据库，任务中断或限流后重新执行时跳过已完成的子任务
+- external 模式：批量任务展开为 文件×账号 的 publish 子任务，由独立的 sau_worker.py 进程领取执行，
+  Flask 进程内不再启动浏览器；最后一个子任务结束时由 worker 写入汇总结果并结束父任务，查询接口只读
+上传器的进度事件写入 task_events（external 模式写在各 publish 子任务上），
+任务进度按正在上传的视频百分比连续更新，而不是只在子任务结束时跳变
+"""
+import os
+
+from myUtils.postVideo import build_publish_jobs_by_type
+from myUtils.publish_engine import run_publish_jobs, job_to_payload, job_key
+from utils.task_queue import TaskWorkerPool, RescheduleTask, TASK_RUNNING, TASK_COMPLETED, TASK_FAILED, enqueue, \
+    enqueue_group, get_task, list_children, list_children_of, list_settled_parents, complete
+
+# 任务类型
+PUBLISH_BATCH_TASK = "publish_batch"
+PUBLISH_TASK = "publish"
+# sau_backend 内置的 worker 数量（同时执行的批量任务数）
+BACKEND_WORKER_COUNT = 2
+
+WORKER_MODE_EMBEDDED = "embedded"
+WORKER_MODE_EXTERNAL = "external"
+
+
+def get_worker_mode() -> str:
+    """发布任务的执行位置，通过环境变量 SAU_WORKER_MODE 配置（embedded / external）"""
+    return os.environ.get("SAU_WORKER_MODE", WORKER_MODE_EMBEDDED)
+
+
+def new_batch_state(total_tasks: int) -> dict:
+    return {
+        "total_tasks": total_tasks,
+        "completed_tasks": 0,
+        "success_count": 0,
+        "failed_count": 0,
+        "results": [],
+    }
+
+
+def _batch_event_recorder(ctx, state: dict, total: int, job_count: int):
+    """记录上传事件，并按当前子任务中各上传的百分比更新整体进度"""
+    percents = {}
+
+    def record(event: dict):
+        ctx.event(event)
+        if event["type"] == "percent":
+            percents[event["job"]] = event["percent"]
+            current = sum(percents.values()) / 100 / max(job_count, 1)
+            ctx.update(progress=round((len(state["results"]) + current) / total * 100, 1))
+    return record
+
+
+def run_publish_batch_task(task: dict, ctx) -> dict:
+    """
+    执行批量发布任务，payload: {"tasks": [...], "browser_mode": ...}
+    被限流的上传不算失败：已执行的上传记录在 state["partial"] 中，整个任务延后重新调度，
+    重新执行时只补发剩余的上传
+    """
+    data_list = task["payload"]["tasks"]
+    task_id = task["id"]
+    state = task["result"] or new_batch_state(len(data_list))
+    partial = state.setdefault("partial", {})
+    finished = {item["index"] for item in state["results"]}
+    retry_after = None
+
+    for index, data in enumerate(data_list, 1):
+        if index in finished:
+            continue
+        ctx.update(message=f"执行子任务 {index}/{len(data_list)}")
+
+        file_list = data.get('fileList', [])
+        account_list = data.get('accountList', [])
+        title = data.get('title', f'批量任务_{index}')
+        category = data.get('category')
+        if category == 0:
+            category = None
+
+        try:
+            jobs = build_publish_jobs_by_type(
+                data.get('type'), title, file_list, data.get('tags', []), account_list, category,
+                data.get('enableTimer', False), data.get('videosPerDay', 1), data.get('dailyTimes'),
+                data.get('startDays', 0), data.get('uploader')
+            )
+            done = partial.get(str(index), {"keys": [], "details": []})
+            pending_jobs = [job for job in jobs if job_key(job) not in done["keys"]]
+            on_event = _batch_event_recorder(ctx, state, len(data_list), len(pending_jobs))
+            for job, upload in zip(pending_jobs, run_publish_jobs(pending_jobs, on_event=on_event)):
+                if upload.get("throttled"):
+                    retry_after = min(upload["retry_after"], retry_after or upload["retry_after"])
+                    continue
+                done["keys"].append(job_key(job))
+                done["details"].append(upload)
+
+            if len(done["keys"]) < len(jobs):
+                partial[str(index)] = done
+                ctx.update(result=state)
+                print(f"⏳ 异步任务 {task_id} - 子任务 {index} 被限流: {len(done['keys'])}/{len(jobs)} 已执行")
+                continue
+
+            partial.pop(str(index), None)
+            uploads = done["details"]
+            success_uploads = sum(1 for upload in uploads if upload["success"])
+            state["success_count"] += success_uploads
+            state["failed_count"] += len(uploads) - success_uploads
+            state["results"].append({
+                "index": index,
+                "success": success_uploads == len(uploads),
+                "uploads": success_uploads,
+                "title": title,
+                "details": uploads
+            })
+            print(f"✅ 异步任务 {task_id} - 子任务 {index} 完成: {success_uploads}/{len(uploads)}")
+
+        except Exception as task_error:
+            partial.pop(str(index), None)
+            state["failed_count"] += len(file_list) * len(account_list)
+            state["results"].append({
+                "index": index,
+                "success": False,
+                "uploads": 0,
+                "error": str(task_error),
+                "title": title
+            })
+            print(f"❌ 异步任务 {task_id} - 子任务 {index} 失败: {task_error}")
+
+        state["completed_tasks"] = len(state["results"])
+        ctx.update(progress=round(state["completed_tasks"] / len(data_list) * 100, 1), result=state)
+
+    if retry_after is not None:
+        raise RescheduleTask(retry_after, f"部分上传被限流，{retry_after:.0f} 秒后继续")
+
+    print(f"🎉 异步批量任务 {task_id} 完成")
+    return state
+
+
+def submit_publish_batch(data_list: list, browser_mode: str, task_id: str) -> str:
+    """提交批量发布任务：embedded 模式整体入队，external 模式展开为 publish 子任务"""
+    state = new_batch_state(len(data_list))
+    payload = {"tasks": data_list, "browser_mode": browser_mode}
+    if get_worker_mode() != WORKER_MODE_EXTERNAL:
+        return enqueue(PUBLISH_BATCH_TASK, payload, task_id=task_id, result=state)
+
+    children = []
+    for index, data in enumerate(data_list, 1):
+        file_list = data.get('fileList', [])
+        account_list = data.get('accountList', [])
+        title = data.get('title', f'批量任务_{index}')
+        category = data.get('category')
+        if category == 0:
+            category = None
+        try:
+            jobs = build_publish_jobs_by_type(
+                data.get('type'), title, file_list, data.get('tags', []), account_list, category,
+                data.get('enableTimer', False), data.get('videosPerDay', 1), data.get('dailyTimes'),
+                data.get('startDays', 0), data.get('uploader')
+            )
+        except Exception as task_error:
+            # 参数错误的子任务直接记为失败，不进入队列
+            state["failed_count"] += len(file_list) * len(account_list)
+            state["results"].append({
+                "index": index,
+                "success": False,
+                "uploads": 0,
+                "error": str(task_error),
+                "title": title
+            })
+            continue
+        children.extend((PUBLISH_TASK, {"batch_index": index, "job": job_to_payload(job)}) for job in jobs)
+
+    payload["dispatched"] = True
+    task_id = enqueue_group(PUBLISH_BATCH_TASK, payload, children, task_id=task_id, result=state)
+    if not children:
+        # 全部子任务参数错误，没有需要 worker 执行的上传
+        complete(task_id, state)
+    return task_id
+
+
+def _aggregate_dispatched_batch(task: dict, children: list) -> dict:
+    """汇总 external 模式下各 publish 子任务的状态（只读，不修改数据库）；子任务全部结束时返回的状态为 completed"""
+    state = task["result"]
+    data_list = task["payload"]["tasks"]
+    results = {item["index"]: item for item in state["results"]}
+    finished_children = 0
+
+    grouped = {}
+    for child in children:
+        grouped.setdefault(child["payload"]["batch_index"], []).append(child)
+        if child["status"] in (TASK_COMPLETED, TASK_FAILED):
+            finished_children += 1
+
+    success_count = failed_count = 0
+    for index, group in grouped.items():
+        success_uploads = sum(1 for child in group if child["status"] == TASK_COMPLETED)
+        failed_uploads = sum(1 for child in group if child["status"] == TASK_FAILED)
+        success_count += success_uploads
+        failed_count += failed_uploads
+        if success_uploads + failed_uploads < len(group):
+            continue
+        errors = [child["error"] for child in group if child["error"]]
+        results[index] = {
+            "index": index,
+            "success": failed_uploads == 0,
+            "uploads": success_uploads,
+            "title": data_list[index - 1].get('title', f'批量任务_{index}'),
+            "details": [child["result"] for child in group if child["result"]],
+            **({"error": errors[0]} if errors else {})
+        }
+
+    # 父任务里保存的是提交时的状态（只包含参数错误的子任务），在此基础上累加子任务结果
+    state = {
+        **state,
+        "completed_tasks": len(results),
+        "success_count": state["success_count"] + success_count,
+        "failed_count": state["failed_count"] + failed_count,
+        "results": sorted(results.values(), key=lambda item: item["index"]),
+    }
+    task = {**task, "result": state}
+    if children:
+        # 未结束的子任务按 worker 上报的上传百分比计入
+        progress = sum(100 if child["status"] in (TASK_COMPLETED, TASK_FAILED) else child["progress"] or 0
+                       for child in children)
+        task["progress"] = round(progress / len(children), 1)
+    if finished_children == len(children):
+        task.update(status=TASK_COMPLETED, progress=100)
+    return task
+
+
+def finalize_dispatched_batch(parent_id: str) -> bool:
+    """worker 在 publish 子任务结束后调用：子任务全部结束时写入汇总结果并把父任务标记为完成"""
+    task = get_task(parent_id, PUBLISH_BATCH_TASK)
+    if task is None or task["status"] != TASK_RUNNING:
+        return False
+    task = _aggregate_dispatched_batch(task, list_children(parent_id))
+    if task["status"] != TASK_COMPLETED:
+        return False
+    complete(parent_id, task["result"])
+    print(f"🎉 批量任务 {parent_id} 的子任务已全部结束")
+    return True
+
+
+def finalize_settled_batches() -> int:
+    """结束子任务已全部结束、但父任务仍在运行的批量任务（子任务因租约过期被回收为失败时没有 worker 负责收尾）"""
+    return sum(1 for parent_id in list_settled_parents(PUBLISH_BATCH_TASK) if finalize_dispatched_batch(parent_id))
+
+
+def _is_dispatched_running(task: dict) -> bool:
+    return bool(task["payload"].get("dispatched")) and task["status"] not in (TASK_COMPLETED, TASK_FAILED)
+
+
+def batch_task_info(task: dict, children: list = None) -> dict:
+    """把 tasks 表记录转换为批量任务状态接口的返回格式；children 为已查询好的子任务（不传时按需查询）"""
+    if _is_dispatched_running(task):
+        task = _aggregate_dispatched_batch(task, list_children(task["id"]) if children is None else children)
+    state = task["result"] or new_batch_state(len(task["payload"]["tasks"]))
+    return {
+        "task_id": task["id"],
+        "status": task["status"],
+        "progress": task["progress"],
+        "message": task["message"],
+        "total_tasks": state["total_tasks"],
+        "completed_tasks": state["completed_tasks"],
+        "success_count": state["success_count"],
+        "failed_count": state["failed_count"],
+        "results": state["results"],
+        "browser_mode": task["payload"].get("browser_mode"),
+        "start_time": task["created_at"],
+        "end_time": task["completed_at"],
+        "error": task["error"],
+    }
+
+
+def batch_task_infos(tasks: list) -> list:
+    """批量转换任务列表，external 模式下未结束任务的子任务用一次查询取出"""
+    children = list_children_of([task["id"] for task in tasks if _is_dispatched_running(task)])
+    return [batch_task_info(task, children.get(task["id"])) for task in tasks]
+
+
+_pool = None
+
+
+def get_backend_task_pool() -> TaskWorkerPool:
+    global _pool
+    if _pool is None:
+        _pool = TaskWorkerPool({PUBLISH_BATCH_TASK: run_publish_batch_task}, size=BACKEND_WORKER_COUNT, name="backend")
+    return _pool
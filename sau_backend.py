@@ -1,23 +1,31 @@
-import asyncio
+import json
 import os
 import sqlite3
-import threading
-import time
 import uuid
 from pathlib import Path
-from queue import Queue
 from flask_cors import CORS
-from myUtils.auth import check_cookie
-from flask import Flask, request, jsonify, Response, render_template, send_from_directory
+from myUtils.account_sweep import start_account_sweep, get_sweep_status, wait_for_sweep, is_account_stale
+from myUtils.account_scheduler import get_account_scheduler
+from flask import Flask, request, jsonify, Response, render_template, send_from_directory, send_file
 from conf import BASE_DIR
-from myUtils.login import get_tencent_cookie, douyin_cookie_gen, get_ks_cookie, xiaohongshu_cookie_gen
-from myUtils.postVideo import post_video_tencent, post_video_DouYin, post_video_ks, post_video_xhs
+from myUtils.login_hub import start_login, login_event_stream
+from myUtils.postVideo import PLATFORM_TYPES, build_publish_jobs_by_type
+from myUtils.publish_engine import run_publish_jobs
+from myUtils.chunked_upload import UploadError, create_session, get_session_info, write_chunk, complete_session, \
+    abort_session
+from myUtils.publish_tasks import PUBLISH_BATCH_TASK, submit_publish_batch, batch_task_info, batch_task_infos, \
+    get_backend_task_pool
+from utils import database, content_store
+from utils.file_catalog import get_file_catalog
+from utils.file_handoff import register_file, open_handle
+from utils.video_probe import get_probe_pool
+from utils.task_queue import get_task, list_tasks, list_children, TASK_COMPLETED, TASK_FAILED
+from utils.upload_progress import sse_events
 from utils.video_utils import is_video_file
 from datetime import datetime
 import requests
 
 
-active_queues = {}
 app = Flask(__name__)
 
 #允许所有来源跨域访问
@@ -26,6 +34,9 @@ CORS(app)
 # 限制上传文件大小为4GB
 app.config['MAX_CONTENT_LENGTH'] = 1024 * 1024 * 1024 * 4
 
+# 同步发布接口（/postVideo、/postVideoBatch）不在请求里等待限流，被限流的上传直接返回 throttled + retry_after
+SYNC_THROTTLE_MAX_WAIT = 0
+
 # 获取当前目录（假设 index.html 和 assets 在这里）
 current_dir = os.path.dirname(os.path.abspath(__file__))
 
@@ -118,32 +129,18 @@ def upload_save():
             "data": None
         }), 400
     try:
-        # 生成 UUID v1
-        uuid_v1 = uuid.uuid1()
-        print(f"UUID v1: {uuid_v1}")
-
-        # 构造文件名和路径
-        final_filename = f"{uuid_v1}_{filename}"
-        filepath = Path(BASE_DIR / "videoFile" / f"{uuid_v1}_{filename}")
-
-        # 保存文件
-        file.save(filepath)
-
-        with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                                INSERT INTO file_records (filename, filesize, file_path)
-            VALUES (?, ?, ?)
-                                ''', (filename, round(float(os.path.getsize(filepath)) / (1024 * 1024),2), final_filename))
-            conn.commit()
-            print("✅ 上传文件已记录")
+        # 边写入边计算 SHA-256，相同内容只保存一份，素材库记录引用该内容
+        stored = content_store.store_stream(file.stream, filename)
+        print(f"✅ 上传文件已记录: {stored['path']}")
+        # 后台探测视频元数据，损坏 / 不支持的文件在发布前就能发现
+        get_probe_pool().submit(stored["id"])
 
         return jsonify({
             "code": 200,
             "msg": "File uploaded and saved successfully",
             "data": {
                 "filename": filename,
-                "filepath": final_filename
+                "filepath": stored["path"]
             }
         }), 200
 
@@ -154,26 +151,152 @@ def upload_save():
             "data": None
         }), 500
 
-@app.route('/getFiles', methods=['GET'])
-def get_all_files():
+# ========================================
+# 分片断点续传：POST /uploads 创建会话 -> PUT /uploads/<id>/chunks/<n>（可并行）
+# -> GET /uploads/<id> 查询已接收分片（续传）-> POST /uploads/<id>/complete 合并
+# /upload 和 /uploadSave 保留给小文件和旧客户端
+# ========================================
+
+def _upload_error_response(e: UploadError):
+    return jsonify({"code": e.status, "msg": str(e), "data": None}), e.status
+
+
+@app.route('/uploads', methods=['POST'])
+def create_upload():
+    data = request.get_json(silent=True) or {}
+    try:
+        info = create_session(
+            data.get('filename', ''),
+            int(data.get('size', 0)),
+            data.get('chunkSize'),
+            data.get('checksum'),
+            data.get('record', True),
+            (data.get('customFilename') or '').strip() or None
+        )
+        return jsonify({"code": 200, "msg": "success", "data": info}), 201
+    except UploadError as e:
+        return _upload_error_response(e)
+    except (TypeError, ValueError):
+        return jsonify({"code": 400, "msg": "size 参数错误", "data": None}), 400
+
+
+@app.route('/uploads/<upload_id>', methods=['GET', 'HEAD'])
+def get_upload(upload_id):
     try:
-        # 使用 with 自动管理数据库连接
-        with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-            conn.row_factory = sqlite3.Row  # 允许通过列名访问结果
-            cursor = conn.cursor()
+        info = get_session_info(upload_id)
+    except UploadError as e:
+        return _upload_error_response(e)
+    response = jsonify({"code": 200, "msg": "success", "data": info})
+    response.headers['Upload-Offset'] = str(info['offset'])
+    response.headers['Upload-Length'] = str(info['size'])
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
-            # 查询所有记录
-            cursor.execute("SELECT * FROM file_records")
-            rows = cursor.fetchall()
 
-            # 将结果转为字典列表
-            data = [dict(row) for row in rows]
+@app.route('/uploads/<upload_id>/chunks/<int:index>', methods=['PUT'])
+def put_upload_chunk(upload_id, index):
+    # 直接读取请求流写入分片文件，不经过 request.files / 临时文件
+    try:
+        result = write_chunk(upload_id, index, request.stream, request.headers.get('X-Chunk-Sha256'),
+                             request.content_length)
+        return jsonify({"code": 200, "msg": "success", "data": result}), 200
+    except UploadError as e:
+        return _upload_error_response(e)
 
-        return jsonify({
-            "code": 200,
-            "msg": "success",
-            "data": data
-        }), 200
+
+@app.route('/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    data = request.get_json(silent=True) or {}
+    try:
+        result = complete_session(upload_id, (data.get('filename') or '').strip() or None)
+        return jsonify({"code": 200, "msg": "File uploaded and saved successfully", "data": result}), 200
+    except UploadError as e:
+        return _upload_error_response(e)
+
+
+@app.route('/uploads/<upload_id>', methods=['DELETE'])
+def delete_upload(upload_id):
+    try:
+        abort_session(upload_id)
+        return jsonify({"code": 200, "msg": "upload aborted", "data": None}), 200
+    except UploadError as e:
+        return _upload_error_response(e)
+
+# ========================================
+# 文件交接：登记句柄后 multi-account-browser 可以按 Range 并行拉取视频分段
+# ========================================
+
+@app.route('/files/handles', methods=['POST'])
+def create_file_handle():
+    # 只能按素材库记录登记，不接受任意本地路径
+    data = request.get_json(silent=True) or {}
+    if data.get('fileId') is None:
+        return jsonify({"code": 400, "msg": "fileId 不能为空", "data": None}), 400
+    record = database.get_file(data['fileId'])
+    if record is None:
+        return jsonify({"code": 404, "msg": "文件不存在", "data": None}), 404
+    try:
+        return jsonify({"code": 200, "msg": "success", "data": register_file(record['file_path'])}), 200
+    except FileNotFoundError as e:
+        return jsonify({"code": 404, "msg": str(e), "data": None}), 404
+
+
+@app.route('/files/handles/<handle_id>', methods=['GET', 'HEAD'])
+def get_file_handle(handle_id):
+    try:
+        handle = open_handle(handle_id)
+    except FileNotFoundError as e:
+        return jsonify({"code": 404, "msg": str(e), "data": None}), 404
+    # conditional=True 支持 Range / If-Range，文件内容由 WSGI file_wrapper 直接发送，不读入内存
+    response = send_file(handle['path'], mimetype='application/octet-stream', conditional=True,
+                         etag=handle['digest'] or True, max_age=0)
+    if handle['digest']:
+        response.headers['X-Content-Sha256'] = handle['digest']
+    return response
+
+# 列表接口的分页参数：page 从 1 开始；不传 page / pageSize 时返回全部（兼容旧前端）
+MAX_PAGE_SIZE = 500
+
+
+def _page_args(default_sort: str, default_order: str):
+    page = request.args.get('page', type=int)
+    page_size = request.args.get('pageSize', type=int)
+    if page is None and page_size is None:
+        offset, limit = 0, None
+    else:
+        page = max(page or 1, 1)
+        page_size = min(max(page_size or 50, 1), MAX_PAGE_SIZE)
+        offset, limit = (page - 1) * page_size, page_size
+    return {
+        "offset": offset,
+        "limit": limit,
+        "sort": request.args.get('sort', default_sort),
+        "order": request.args.get('order', default_order),
+        "keyword": (request.args.get('keyword') or '').strip() or None,
+    }
+
+
+def _paged_response(data: list, total: int, args: dict):
+    """data 仍是数组（前端约定），分页信息放在顶层；带 ETag，内容未变化时返回 304"""
+    response = jsonify({
+        "code": 200,
+        "msg": "success",
+        "data": data,
+        "total": total,
+        "page": args["offset"] // args["limit"] + 1 if args["limit"] else 1,
+        "pageSize": args["limit"] or total,
+    })
+    response.headers['Cache-Control'] = 'no-cache'
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+@app.route('/getFiles', methods=['GET'])
+def get_all_files():
+    try:
+        args = _page_args("id", "asc")
+        rows, total = database.list_files_page(**args)
+        return _paged_response([dict(row) for row in rows], total, args)
     except Exception as e:
         return jsonify({
             "code": 500,
@@ -183,42 +306,19 @@ def get_all_files():
 
 @app.route('/getRecentUploads', methods=['GET'])
 def get_recent_uploads():
-    """获取最近上传的视频文件（videoFile目录）"""
+    """获取最近上传的视频文件（videoFile目录），数据来自文件目录索引，不再每次扫描目录"""
     try:
-        videoFile_dir = Path(BASE_DIR / "videoFile")
-        recent_videos = []
-        
-        # 检查目录是否存在
-        if not videoFile_dir.exists():
-            return jsonify({
-                "code": 200,
-                "msg": "success",
-                "data": []
-            }), 200
-        
-        # 扫描 videoFile 目录
-        for file_path in videoFile_dir.iterdir():
-            if file_path.is_file():
-                # 检查是否为视频文件
-                if is_video_file(file_path.name):
-                    stat = file_path.stat()
-                    recent_videos.append({
-                        "id": str(hash(file_path.name + str(stat.st_mtime))),  # 生成唯一ID
-                        "filename": file_path.name,
-                        "filesize": round(stat.st_size / (1024 * 1024), 2),  # MB
-                        "upload_time": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                        "file_path": file_path.name  # 只存文件名，因为都在videoFile目录
-                    })
-        
-        # 按修改时间倒序排列（最新的在前面）
-        recent_videos.sort(key=lambda x: x['upload_time'], reverse=True)
-        
-        return jsonify({
-            "code": 200,
-            "msg": "success", 
-            "data": recent_videos
-        }), 200
-        
+        args = _page_args("upload_time", "desc")
+        rows, total = get_file_catalog().query(**args)
+        recent_videos = [{
+            "id": str(row["id"]),
+            "filename": row["filename"],
+            "filesize": round(row["size"] / (1024 * 1024), 2),  # MB
+            "upload_time": datetime.fromtimestamp(row["mtime"]).isoformat(),
+            "file_path": row["path"]  # 相对 videoFile 目录的路径
+        } for row in rows]
+        return _paged_response(recent_videos, total, args)
+
     except Exception as e:
         print(f"获取最近上传文件出错: {e}")
         return jsonify({
@@ -228,72 +328,43 @@ def get_recent_uploads():
         }), 500
 
 @app.route("/getValidAccounts", methods=['GET'])
-async def getValidAccounts():
+def getValidAccounts():
     force_check = request.args.get('force', 'false').lower() == 'true'
     
-    with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-        cursor = conn.cursor()
+    rows = database.list_accounts()
         
-        cursor.execute('''
-        SELECT id, type, filePath, userName, status, last_check_time, check_interval 
-        FROM user_info''')
-        rows = cursor.fetchall()
+    current_time = datetime.now()
+    platform_map = {1: '小红书', 2: '视频号', 3: '抖音', 4: '快手', 5: 'TikTok', 6: 'B站', 7: '百家号'}
+    accounts = []
+    stale_accounts = []
+    
+    for row in rows:
+        user_id, type_val, file_path, user_name, status, last_check_time, check_interval = row
         
-        current_time = datetime.now()
-        platform_map = {1: '小红书', 2: '视频号', 3: '抖音', 4: '快手', 5: 'TikTok'}
-        accounts = []
+        # 调度器运行时列表接口只读；force 或调度器未运行时过期账号交给后台 sweep，这里直接返回缓存状态
+        if needs_sweep(force_check, last_check_time, check_interval, current_time):
+            stale_accounts.append({'id': user_id, 'type': type_val, 'filePath': file_path, 'userName': user_name})
         
-        for row in rows:
-            user_id, type_val, file_path, user_name, status, last_check_time, check_interval = row
-            
-            # 判断是否需要验证（逻辑保持不变）
-            should_check = force_check
-            if not should_check and last_check_time:
-                try:
-                    last_check = datetime.fromisoformat(last_check_time)
-                    should_check = (current_time - last_check).total_seconds() > (check_interval or 3600)
-                except (ValueError, TypeError):
-                    should_check = True
-            elif not last_check_time:
-                should_check = True
-                
-            # 🔥 简化：直接调用验证函数，底层自动选择最优模式
-            if should_check:
-                try:
-                    flag = await check_cookie(type_val, file_path)
-                    new_status = 1 if flag else 0
-                    
-                    cursor.execute('''
-                    UPDATE user_info 
-                    SET status = ?, last_check_time = ?
-                    WHERE id = ?
-                    ''', (new_status, current_time.isoformat(), user_id))
-                    conn.commit()
-                    
-                    status = new_status
-                    print(f"✅ 验证账号 {user_name}: {'正常' if new_status else '异常'}")
-                except Exception as e:
-                    print(f"❌ 验证账号 {user_name} 失败: {e}")
-            
-            # 构建账号信息
-            account = {
-                'id': user_id,
-                'type': type_val, 
-                'filePath': file_path,
-                'name': user_name,
-                'userName': user_name,
-                'platform': platform_map.get(type_val, '未知'),
-                'status': '正常' if status == 1 else '异常',
-                'avatar': '/default-avatar.png'
-            }
-            
-            accounts.append(account)
+        # 构建账号信息
+        account = {
+            'id': user_id,
+            'type': type_val, 
+            'filePath': file_path,
+            'name': user_name,
+            'userName': user_name,
+            'platform': platform_map.get(type_val, '未知'),
+            'status': '正常' if status == 1 else '异常',
+            'avatar': '/default-avatar.png'
+        }
         
-        return jsonify({
-            "code": 200,
-            "msg": "success", 
-            "data": accounts
-        }), 200
+        accounts.append(account)
+    
+    return jsonify({
+        "code": 200,
+        "msg": "success", 
+        "data": accounts,
+        "sweep": build_sweep_info(start_account_sweep(stale_accounts))
+    }), 200
 
 @app.route('/deleteFile', methods=['GET'])
 def delete_file():
@@ -307,27 +378,20 @@ def delete_file():
         }), 400
 
     try:
-        # 获取数据库连接
-        with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+        # 查询要删除的记录
+        record = database.get_file(file_id)
 
-            # 查询要删除的记录
-            cursor.execute("SELECT * FROM file_records WHERE id = ?", (file_id,))
-            record = cursor.fetchone()
-
-            if not record:
-                return jsonify({
-                    "code": 404,
-                    "msg": "File not found",
-                    "data": None
-                }), 404
+        if not record:
+            return jsonify({
+                "code": 404,
+                "msg": "File not found",
+                "data": None
+            }), 404
 
-            record = dict(record)
+        record = dict(record)
 
-            # 删除数据库记录
-            cursor.execute("DELETE FROM file_records WHERE id = ?", (file_id,))
-            conn.commit()
+        # 删除数据库记录，最后一个引用删除时同时删除磁盘上的视频文件
+        content_store.release_file_record(record)
 
         return jsonify({
             "code": 200,
@@ -350,27 +414,20 @@ def delete_account():
     account_id = int(request.args.get('id'))
 
     try:
-        # 获取数据库连接
-        with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+        # 查询要删除的记录
+        record = database.get_account(account_id)
 
-            # 查询要删除的记录
-            cursor.execute("SELECT * FROM user_info WHERE id = ?", (account_id,))
-            record = cursor.fetchone()
-
-            if not record:
-                return jsonify({
-                    "code": 404,
-                    "msg": "account not found",
-                    "data": None
-                }), 404
+        if not record:
+            return jsonify({
+                "code": 404,
+                "msg": "account not found",
+                "data": None
+            }), 404
 
-            record = dict(record)
+        # 删除数据库记录
+        database.delete_account(account_id)
 
-            # 删除数据库记录
-            cursor.execute("DELETE FROM user_info WHERE id = ?", (account_id,))
-            conn.commit()
+        get_account_scheduler().notify_changed()
 
         return jsonify({
             "code": 200,
@@ -396,21 +453,21 @@ def login():
     type = request.args.get('type')
     id = request.args.get('id')
 
-    # 模拟一个用于异步通信的队列
-    status_queue = Queue()
-    active_queues[id] = status_queue
+    # 🔥 所有登录共用一个后台事件循环，状态通过队列推送给 SSE
+    status_queue = start_login(type, id)
 
-    # 🔥 简化：直接使用统一的登录函数，底层自动选择最优实现
-    thread = threading.Thread(target=run_async_function, args=(type, id, status_queue), daemon=True)
-    thread.start()
-    
-    response = Response(sse_stream(status_queue,), mimetype='text/event-stream')
+    response = Response(login_event_stream(id, status_queue), mimetype='text/event-stream')
     response.headers['Cache-Control'] = 'no-cache'
     response.headers['X-Accel-Buffering'] = 'no'
     response.headers['Content-Type'] = 'text/event-stream'
     response.headers['Connection'] = 'keep-alive'
     return response
 
+def get_current_browser_mode():
+    """当前浏览器模式（由 /setBrowserMode 写入环境变量）"""
+    use_multi_browser = os.environ.get('USE_MULTI_BROWSER', 'true') == 'true'
+    return "multi-account-browser" if use_multi_browser else "playwright"
+
 @app.route('/setBrowserMode', methods=['POST'])
 def set_browser_mode():
     """
@@ -468,22 +525,27 @@ def postVideo():
     videos_per_day = data.get('videosPerDay')
     daily_times = data.get('dailyTimes')
     start_days = data.get('startDays')
+    # 上传器实现：browser（默认）/ api（小红书接口发布，不启动浏览器）
+    uploader = data.get('uploader')
     
+    if type_val not in PLATFORM_TYPES:
+        return jsonify({"code": 400, "msg": f"不支持的平台类型: {type_val}", "data": None}), 400
+
     try:
-        # 🔥 最简单的调用 - 底层自动选择最优实现
-        match type_val:
-            case 1:  # 小红书
-                post_video_xhs(title, file_list, tags, account_list, category, enableTimer, videos_per_day, daily_times, start_days)
-            case 2:  # 视频号
-                post_video_tencent(title, file_list, tags, account_list, category, enableTimer, videos_per_day, daily_times, start_days)
-            case 3:  # 抖音
-                post_video_DouYin(title, file_list, tags, account_list, category, enableTimer, videos_per_day, daily_times, start_days)
-            case 4:  # 快手
-                post_video_ks(title, file_list, tags, account_list, category, enableTimer, videos_per_day, daily_times, start_days)
-        
+        # 🔥 最简单的调用 - 底层自动选择最优实现，所有 文件×账号 在同一事件循环中并发执行
+        jobs = build_publish_jobs_by_type(type_val, title, file_list, tags, account_list, category, enableTimer, videos_per_day, daily_times, start_days, uploader)
+        results = run_publish_jobs(jobs, throttle_max_wait=SYNC_THROTTLE_MAX_WAIT)
+
+        success_count = sum(1 for result in results if result["success"])
+        throttled = [result for result in results if result.get("throttled")]
+        msg = f"发布完成: {success_count}/{len(results)} 成功"
+        if throttled:
+            retry_after = min(result["retry_after"] for result in throttled)
+            msg += f"，{len(throttled)} 个被限流（{retry_after:.0f} 秒后可重试）"
         return jsonify({
             "code": 200,
-            "msg": "发布任务已提交"
+            "msg": msg,
+            "data": results
         }), 200
         
     except Exception as e:
@@ -499,7 +561,7 @@ def postVideo():
 def postVideoBatch():
     """
     批量发布视频 - 超简化版本
-    自动使用最优浏览器模式，无需复杂的判断逻辑
+    所有子任务的 文件×账号 合并到同一个发布引擎中并发执行
     """
     try:
         data_list = request.get_json()
@@ -515,8 +577,17 @@ def postVideoBatch():
         print(f"🚀 接收到 {total_tasks} 个批量发布任务")
         success_count = 0
         failed_count = 0
+        throttled_count = 0
+        retry_after = None
         results = []
-        
+
+        # 平台名称映射
+        platform_names = {1: "小红书", 2: "视频号", 3: "抖音", 4: "快手", 5: "TikTok", 6: "B站", 7: "百家号"}
+
+        # 先展开所有子任务，再一次性交给发布引擎
+        all_jobs = []
+        task_jobs = {}
+        task_errors = {}
         for index, data in enumerate(data_list, 1):
             print(f"\n📋 处理任务 {index}/{total_tasks}")
             
@@ -536,77 +607,87 @@ def postVideoBatch():
                 videos_per_day = data.get('videosPerDay', 1)
                 daily_times = data.get('dailyTimes')
                 start_days = data.get('startDays', 0)
+                uploader = data.get('uploader')
                 
-                # 平台名称映射
-                platform_names = {1: "小红书", 2: "视频号", 3: "抖音", 4: "快手"}
                 platform_name = platform_names.get(type_val, f"平台{type_val}")
                 
                 print(f"   平台: {platform_name}")
                 print(f"   标题: {title}")
                 print(f"   文件: {len(file_list)} 个")
                 print(f"   账号: {len(account_list)} 个")
-                
-                # 🔥 核心简化：直接调用对应的发布函数
-                # 所有复杂的浏览器模式选择都由底层自动处理
-                match type_val:
-                    case 1:  # 小红书
-                        post_video_xhs(title, file_list, tags, account_list, category, enableTimer, videos_per_day, daily_times, start_days)
-                    case 2:  # 视频号
-                        post_video_tencent(title, file_list, tags, account_list, category, enableTimer, videos_per_day, daily_times, start_days)
-                    case 3:  # 抖音
-                        post_video_DouYin(title, file_list, tags, account_list, category, enableTimer, videos_per_day, daily_times, start_days)
-                    case 4:  # 快手
-                        post_video_ks(title, file_list, tags, account_list, category, enableTimer, videos_per_day, daily_times, start_days)
-                    case _:
-                        raise ValueError(f"不支持的平台类型: {type_val}")
-                
-                # 计算成功的任务数量
-                task_success_count = len(file_list) * len(account_list)
-                success_count += task_success_count
-                
-                results.append({
-                    "index": index,
-                    "platform": platform_name,
-                    "title": title,
-                    "success": True,
-                    "files": len(file_list),
-                    "accounts": len(account_list),
-                    "total_uploads": task_success_count,
-                    "message": f"成功提交 {task_success_count} 个上传任务"
-                })
-                
-                print(f"   ✅ 任务 {index} 提交成功")
-                
+
+                jobs = build_publish_jobs_by_type(type_val, title, file_list, tags, account_list, category, enableTimer, videos_per_day, daily_times, start_days, uploader)
+                task_jobs[index] = (len(all_jobs), len(jobs))
+                all_jobs.extend(jobs)
+
             except Exception as task_error:
                 print(f"   ❌ 任务 {index} 失败: {task_error}")
-                
+                task_errors[index] = task_error
+
+        job_results = run_publish_jobs(all_jobs, throttle_max_wait=SYNC_THROTTLE_MAX_WAIT)
+
+        for index, data in enumerate(data_list, 1):
+            file_count = len(data.get('fileList', []))
+            account_count = len(data.get('accountList', []))
+            platform_name = platform_names.get(data.get('type'), "未知")
+            title = data.get('title', f'批量任务_{index}')
+
+            if index in task_errors:
                 # 估算失败的任务数量
-                file_count = len(data.get('fileList', []))
-                account_count = len(data.get('accountList', []))
-                task_failed_count = file_count * account_count
-                failed_count += task_failed_count
-                
+                failed_count += file_count * account_count
                 results.append({
                     "index": index,
-                    "platform": platform_names.get(data.get('type'), "未知"),
-                    "title": data.get('title', f'任务_{index}'),
+                    "platform": platform_name,
+                    "title": title,
                     "success": False,
                     "files": file_count,
                     "accounts": account_count,
                     "total_uploads": 0,
-                    "error": str(task_error),
-                    "message": f"任务失败: {str(task_error)}"
+                    "error": str(task_errors[index]),
+                    "message": f"任务失败: {str(task_errors[index])}"
                 })
-        
+                continue
+
+            start, count = task_jobs[index]
+            uploads = job_results[start:start + count]
+            task_success_count = sum(1 for upload in uploads if upload["success"])
+            # 被限流的上传没有执行，不算失败，单独返回 retry_after 由调用方稍后重试
+            task_throttled = [upload for upload in uploads if upload.get("throttled")]
+            success_count += task_success_count
+            throttled_count += len(task_throttled)
+            failed_count += count - task_success_count - len(task_throttled)
+            for upload in task_throttled:
+                retry_after = min(upload["retry_after"], retry_after or upload["retry_after"])
+
+            message = f"成功上传 {task_success_count}/{count} 个"
+            if task_throttled:
+                message += f"，{len(task_throttled)} 个被限流"
+            results.append({
+                "index": index,
+                "platform": platform_name,
+                "title": title,
+                "success": task_success_count == count,
+                "files": file_count,
+                "accounts": account_count,
+                "total_uploads": task_success_count,
+                "throttled_uploads": len(task_throttled),
+                "uploads": uploads,
+                "message": message
+            })
+            print(f"   ✅ 任务 {index} 完成: {task_success_count}/{count}")
+
         # 生成总结报告
-        total_estimated_uploads = success_count + failed_count
+        total_estimated_uploads = success_count + failed_count + throttled_count
         success_rate = (success_count / total_estimated_uploads * 100) if total_estimated_uploads > 0 else 0
+        current_mode = get_current_browser_mode()
         
         summary = {
             "total_tasks": total_tasks,
             "total_estimated_uploads": total_estimated_uploads,
             "success_uploads": success_count,
             "failed_uploads": failed_count,
+            "throttled_uploads": throttled_count,
+            "retry_after": retry_after,
             "success_rate": round(success_rate, 1),
             "browser_mode": current_mode
         }
@@ -614,14 +695,16 @@ def postVideoBatch():
         print(f"\n📊 批量发布总结:")
         print(f"   总任务数: {total_tasks}")
         print(f"   预计上传数: {total_estimated_uploads}")
-        print(f"   成功提交: {success_count}")
-        print(f"   提交失败: {failed_count}")
+        print(f"   成功上传: {success_count}")
+        print(f"   上传失败: {failed_count}")
+        if throttled_count:
+            print(f"   被限流: {throttled_count}（{retry_after:.0f} 秒后可重试）")
         print(f"   成功率: {success_rate:.1f}%")
         print(f"   浏览器模式: {current_mode}")
         
         return jsonify({
             "code": 200,
-            "msg": f"批量发布完成: {success_count}/{total_estimated_uploads} 成功提交",
+            "msg": f"批量发布完成: {success_count}/{total_estimated_uploads} 成功",
             "data": {
                 "summary": summary,
                 "results": results
@@ -641,14 +724,11 @@ def postVideoBatch():
 # 可选：添加批量任务状态查询接口
 # ========================================
 
-# 全局任务状态存储（可选，用于更高级的任务管理）
-batch_task_status = {}
-
 @app.route('/postVideoBatchAsync', methods=['POST'])
 def postVideoBatchAsync():
     """
     异步批量发布视频 - 高级版本
-    返回任务ID，可以通过其他接口查询进度
+    任务写入持久化队列，返回任务ID，可以通过其他接口查询进度
     """
     try:
         data_list = request.get_json()
@@ -660,104 +740,9 @@ def postVideoBatchAsync():
                 "data": None
             }), 400
         
-        # 生成任务ID
-        import uuid
-        import threading
-        from datetime import datetime
-        
-        task_id = str(uuid.uuid4())[:8]
-
-        
-        # 初始化任务状态
-        batch_task_status[task_id] = {
-            "task_id": task_id,
-            "status": "running",
-            "total_tasks": len(data_list),
-            "completed_tasks": 0,
-            "success_count": 0,
-            "failed_count": 0,
-            "start_time": datetime.now().isoformat(),
-            "results": []
-        }
-        
-        print(f"🚀 启动异步批量任务: {task_id} ({len(data_list)} 个任务)")
-        
-        # 异步执行批量任务
-        def run_batch_async():
-            try:
-                for index, data in enumerate(data_list, 1):
-                    try:
-                        # 更新进度
-                        batch_task_status[task_id]["completed_tasks"] = index - 1
-                        
-                        # 执行任务（与同步版本相同的逻辑）
-                        file_list = data.get('fileList', [])
-                        account_list = data.get('accountList', [])
-                        type_val = data.get('type')
-                        title = data.get('title', f'批量任务_{index}')
-                        tags = data.get('tags', [])
-                        category = data.get('category')
-                        enableTimer = data.get('enableTimer', False)
-                        
-                        if category == 0:
-                            category = None
-
-                        videos_per_day = data.get('videosPerDay', 1)
-                        daily_times = data.get('dailyTimes')
-                        start_days = data.get('startDays', 0)
-                        
-                        # 执行发布
-                        match type_val:
-                            case 1:
-                                post_video_xhs(title, file_list, tags, account_list, category, enableTimer, videos_per_day, daily_times, start_days)
-                            case 2:
-                                post_video_tencent(title, file_list, tags, account_list, category, enableTimer, videos_per_day, daily_times, start_days)
-                            case 3:
-                                post_video_DouYin(title, file_list, tags, account_list, category, enableTimer, videos_per_day, daily_times, start_days)
-                            case 4:
-                                post_video_ks(title, file_list, tags, account_list, category, enableTimer, videos_per_day, daily_times, start_days)
-                        
-                        # 记录成功
-                        success_uploads = len(file_list) * len(account_list)
-                        batch_task_status[task_id]["success_count"] += success_uploads
-                        batch_task_status[task_id]["results"].append({
-                            "index": index,
-                            "success": True,
-                            "uploads": success_uploads,
-                            "title": title
-                        })
-                        
-                        print(f"✅ 异步任务 {task_id} - 子任务 {index} 完成")
-                        
-                    except Exception as task_error:
-                        # 记录失败
-                        failed_uploads = len(data.get('fileList', [])) * len(data.get('accountList', []))
-                        batch_task_status[task_id]["failed_count"] += failed_uploads
-                        batch_task_status[task_id]["results"].append({
-                            "index": index,
-                            "success": False,
-                            "uploads": 0,
-                            "error": str(task_error),
-                            "title": data.get('title', f'任务_{index}')
-                        })
-                        
-                        print(f"❌ 异步任务 {task_id} - 子任务 {index} 失败: {task_error}")
-                
-                # 任务完成
-                batch_task_status[task_id]["status"] = "completed"
-                batch_task_status[task_id]["completed_tasks"] = len(data_list)
-                batch_task_status[task_id]["end_time"] = datetime.now().isoformat()
-                
-                print(f"🎉 异步批量任务 {task_id} 完成")
-                
-            except Exception as e:
-                batch_task_status[task_id]["status"] = "failed"
-                batch_task_status[task_id]["error"] = str(e)
-                print(f"❌ 异步批量任务 {task_id} 系统错误: {e}")
+        task_id = submit_publish_batch(data_list, get_current_browser_mode(), str(uuid.uuid4())[:8])
         
-        # 启动后台线程
-        thread = threading.Thread(target=run_batch_async, daemon=True)
-        thread.start()
+        print(f"🚀 异步批量任务已入队: {task_id} ({len(data_list)} 个任务)")
         
         return jsonify({
             "code": 200,
@@ -765,8 +750,9 @@ def postVideoBatchAsync():
             "data": {
                 "task_id": task_id,
                 "total_tasks": len(data_list),
-                "browser_mode": current_mode,
-                "status_url": f"/getBatchTaskStatus?task_id={task_id}"
+                "browser_mode": get_current_browser_mode(),
+                "status_url": f"/getBatchTaskStatus?task_id={task_id}",
+                "events_url": f"/batchTaskEventStream?task_id={task_id}"
             }
         }), 200
         
@@ -789,43 +775,54 @@ def getBatchTaskStatus():
             "data": None
         }), 400
     
-    if task_id not in batch_task_status:
+    task = get_task(task_id, PUBLISH_BATCH_TASK)
+    if task is None:
         return jsonify({
             "code": 404,
             "msg": "任务不存在",
             "data": None
         }), 404
     
-    task_info = batch_task_status[task_id]
-    
-    # 计算进度百分比
-    progress = 0
-    if task_info["total_tasks"] > 0:
-        progress = round(task_info["completed_tasks"] / task_info["total_tasks"] * 100, 1)
-    
     return jsonify({
         "code": 200,
         "msg": "success",
-        "data": {
-            **task_info,
-            "progress": progress
-        }
+        "data": batch_task_info(task)
     }), 200
 
+@app.route('/batchTaskEventStream')
+def batchTaskEventStream():
+    """
+    以 SSE 推送批量任务的上传事件（阶段耗时、页面上传百分比、上传字节数 / 吞吐量、重试），任务结束后断开
+    external 模式下事件记录在各 publish 子任务上，一并推送；断线重连时按 Last-Event-ID 续传
+    """
+    task_id = request.args.get('task_id')
+    if not task_id or get_task(task_id, PUBLISH_BATCH_TASK) is None:
+        return jsonify({"code": 404, "msg": "任务不存在", "data": None}), 404
+    after_id = request.headers.get('Last-Event-ID', request.args.get('after', 0, type=int), type=int)
+
+    def task_ids():
+        return [task_id, *(child["id"] for child in list_children(task_id))]
+
+    def is_finished():
+        # external 模式下按子任务状态判断（父任务由 worker 在最后一个子任务结束时收尾）
+        return batch_task_info(get_task(task_id))["status"] in (TASK_COMPLETED, TASK_FAILED)
+
+    response = Response(sse_events(task_ids, after_id, is_finished), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/getAllBatchTasks', methods=['GET'])
 def getAllBatchTasks():
-    """获取所有批量任务状态"""
+    """获取最近的批量任务状态"""
+    limit = request.args.get('limit', 100, type=int)
     tasks = []
     
-    for task_id, task_info in batch_task_status.items():
-        progress = 0
-        if task_info["total_tasks"] > 0:
-            progress = round(task_info["completed_tasks"] / task_info["total_tasks"] * 100, 1)
-        
+    for task_info in batch_task_infos(list_tasks(PUBLISH_BATCH_TASK, limit=limit)):
         tasks.append({
-            "task_id": task_id,
+            "task_id": task_info["task_id"],
             "status": task_info["status"],
-            "progress": progress,
+            "progress": task_info["progress"],
             "total_tasks": task_info["total_tasks"],
             "completed_tasks": task_info["completed_tasks"],
             "success_count": task_info["success_count"],
@@ -853,19 +850,10 @@ def updateUserinfo():
     type = data.get('type')
     userName = data.get('userName')
     try:
-        # 获取数据库连接
-        with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-
-            # 更新数据库记录
-            cursor.execute('''
-                           UPDATE user_info
-                           SET type     = ?,
-                               userName = ?
-                           WHERE id = ?;
-                           ''', (type, userName, user_id))
-            conn.commit()
+        # 更新数据库记录
+        database.update_account(user_id, type, userName)
+
+        get_account_scheduler().notify_changed()
 
         return jsonify({
             "code": 200,
@@ -881,68 +869,11 @@ def updateUserinfo():
         }), 500
 
 
-# 包装函数：在线程中运行异步函数
-def run_async_function(type,id,status_queue):
-    match type:
-        case '1':
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(xiaohongshu_cookie_gen(id, status_queue))
-            loop.close()
-        case '2':
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(get_tencent_cookie(id,status_queue))
-            loop.close()
-        case '3':
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(douyin_cookie_gen(id,status_queue))
-            loop.close()
-        case '4':
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(get_ks_cookie(id,status_queue))
-            loop.close()
-
-# SSE 流生成器函数
-def sse_stream(status_queue):
-    while True:
-        if not status_queue.empty():
-            msg = status_queue.get()
-            yield f"data: {msg}\n\n"
-            if msg == "200" or msg == "500":
-                print(f"✅ SSE 发送完成状态: {msg}")
-                break
-        else:
-            # 避免 CPU 占满
-            time.sleep(0.1)
-
 # 获取所有分组
 @app.route('/getGroups', methods=['GET'])
 def get_groups():
     try:
-        with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT 
-                    g.id, 
-                    g.name, 
-                    g.description, 
-                    g.color,
-                    g.icon,
-                    g.sort_order,
-                    g.created_at,
-                    g.updated_at,
-                    COUNT(u.id) as account_count
-                FROM account_groups g
-                LEFT JOIN user_info u ON g.id = u.group_id
-                GROUP BY g.id, g.name, g.description, g.color, g.icon, g.sort_order, g.created_at, g.updated_at
-                ORDER BY g.sort_order ASC, g.id ASC
-            ''')
-            groups = [dict(row) for row in cursor.fetchall()]
+        groups = [dict(row) for row in database.list_groups()]
             
         return jsonify({"code": 200, "msg": "success", "data": groups}), 200
     except Exception as e:
@@ -962,14 +893,7 @@ def create_group():
         return jsonify({"code": 400, "msg": "分组名称不能为空", "data": None}), 400
     
     try:
-        with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO account_groups (name, description, color, icon, sort_order, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, datetime('now'), datetime('now'))
-            ''', (name, description, color, icon, sort_order))
-            group_id = cursor.lastrowid
-            conn.commit()
+        group_id = database.create_group(name, description, color, icon, sort_order)
             
         return jsonify({"code": 200, "msg": "分组创建成功", "data": {"id": group_id}}), 200
     except sqlite3.IntegrityError:
@@ -992,14 +916,7 @@ def update_group():
         return jsonify({"code": 400, "msg": "分组ID和名称不能为空", "data": None}), 400
     
     try:
-        with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE account_groups 
-                SET name = ?, description = ?, color = ?, icon = ?, sort_order = ?, updated_at = datetime('now')
-                WHERE id = ?
-            ''', (name, description, color, icon, sort_order, group_id))
-            conn.commit()
+        database.update_group(group_id, name, description, color, icon, sort_order)
             
         return jsonify({"code": 200, "msg": "分组更新成功", "data": None}), 200
     except sqlite3.IntegrityError:
@@ -1015,14 +932,7 @@ def update_account_group():
     group_id = data.get('group_id')  # None 表示移出分组
     
     try:
-        with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE user_info
-                SET group_id = ?
-                WHERE id = ?
-            ''', (group_id, account_id))
-            conn.commit()
+        database.set_account_group(account_id, group_id)
             
         return jsonify({"code": 200, "msg": "账号分组更新成功", "data": None}), 200
     except Exception as e:
@@ -1034,15 +944,8 @@ def delete_group():
     group_id = request.args.get('id')
     
     try:
-        with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-            cursor = conn.cursor()
-            
-            # 先将该分组的账号设为未分组
-            cursor.execute('UPDATE user_info SET group_id = NULL WHERE group_id = ?', (group_id,))
-            
-            # 删除分组
-            cursor.execute('DELETE FROM account_groups WHERE id = ?', (group_id,))
-            conn.commit()
+        # 先将该分组的账号设为未分组，再删除分组（同一事务）
+        database.delete_group(group_id)
             
         return jsonify({"code": 200, "msg": "分组删除成功", "data": None}), 200
     except Exception as e:
@@ -1050,79 +953,113 @@ def delete_group():
 
 # 获取带分组信息的账号列表
 @app.route("/getAccountsWithGroups", methods=['GET'])
-async def getAccountsWithGroups():
+def getAccountsWithGroups():
     force_check = request.args.get('force', 'false').lower() == 'true'
     
-    with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-        cursor = conn.cursor()
+    rows = database.list_accounts_with_groups()
         
-        cursor.execute('''
-        SELECT u.id, u.type, u.filePath, u.userName, u.status, u.group_id, 
-               u.last_check_time, u.check_interval, 
-               g.name as group_name, g.color as group_color, g.icon as group_icon
-        FROM user_info u
-        LEFT JOIN account_groups g ON u.group_id = g.id
-        ''')
-        rows = cursor.fetchall()
+    current_time = datetime.now()
+    platform_map = {1: '小红书', 2: '视频号', 3: '抖音', 4: '快手', 5: 'TikTok', 6: 'B站', 7: '百家号'}
+    accounts = []
+    stale_accounts = []
+    
+    for row in rows:
+        user_id, type_val, file_path, user_name, status, group_id, last_check_time, check_interval, group_name, group_color, group_icon = row
         
-        current_time = datetime.now()
-        platform_map = {1: '小红书', 2: '视频号', 3: '抖音', 4: '快手', 5: 'TikTok'}
-        accounts = []
+        # 保持与原有API完全相同的过期判断，验证交给后台 sweep
+        if needs_sweep(force_check, last_check_time, check_interval, current_time):
+            stale_accounts.append({'id': user_id, 'type': type_val, 'filePath': file_path, 'userName': user_name})
         
-        for row in rows:
-            user_id, type_val, file_path, user_name, status, group_id, last_check_time, check_interval, group_name, group_color, group_icon = row
-            
-            # 保持与原有API完全相同的验证逻辑
-            should_check = force_check
-            if not should_check and last_check_time:
-                try:
-                    last_check = datetime.fromisoformat(last_check_time)
-                    should_check = (current_time - last_check).total_seconds() > (check_interval or 3600)
-                except (ValueError, TypeError):
-                    should_check = True
-            elif not last_check_time:
-                should_check = True
-                
-            if should_check:
-                try:
-                    flag = await check_cookie(type_val, file_path)
-                    new_status = 1 if flag else 0
-                    
-                    cursor.execute('''
-                    UPDATE user_info 
-                    SET status = ?, last_check_time = ?
-                    WHERE id = ?
-                    ''', (new_status, current_time.isoformat(), user_id))
-                    conn.commit()
-                    
-                    status = new_status
-                    print(f"✅ 验证账号 {user_name}: {'正常' if new_status else '异常'}")
-                except Exception as e:
-                    print(f"❌ 验证账号 {user_name} 失败: {e}")
-            
-            # 构建账号信息
-            account = {
-                'id': user_id,
-                'type': type_val, 
-                'filePath': file_path,
-                'name': user_name,
-                'userName': user_name,
-                'platform': platform_map.get(type_val, '未知'),
-                'status': '正常' if status == 1 else '异常',
-                'avatar': '/default-avatar.png',
-                # 分组相关字段
-                'group_id': group_id,
-                'group_name': group_name,
-                'group_color': group_color,
-                'group_icon': group_icon
-            }
-            
-            accounts.append(account)
+        # 构建账号信息
+        account = {
+            'id': user_id,
+            'type': type_val, 
+            'filePath': file_path,
+            'name': user_name,
+            'userName': user_name,
+            'platform': platform_map.get(type_val, '未知'),
+            'status': '正常' if status == 1 else '异常',
+            'avatar': '/default-avatar.png',
+            # 分组相关字段
+            'group_id': group_id,
+            'group_name': group_name,
+            'group_color': group_color,
+            'group_icon': group_icon
+        }
         
-        return jsonify({
-            "code": 200,
-            "msg": "success", 
-            "data": accounts
-        }), 200
+        accounts.append(account)
+    
+    return jsonify({
+        "code": 200,
+        "msg": "success", 
+        "data": accounts,
+        "sweep": build_sweep_info(start_account_sweep(stale_accounts))
+    }), 200
+
+
+def needs_sweep(force_check, last_check_time, check_interval, current_time):
+    """列表接口是否需要为该账号触发校验：调度器运行时只有 force 才触发"""
+    if force_check:
+        return True
+    if get_account_scheduler().running:
+        return False
+    return is_account_stale(last_check_time, check_interval, current_time)
+
+def build_sweep_info(sweep_id):
+    """列表接口附带的 sweep 信息，前端据此轮询或订阅校验结果"""
+    if not sweep_id:
+        return None
+    sweep = get_sweep_status(sweep_id)
+    return {
+        "sweep_id": sweep_id,
+        "status": sweep["status"] if sweep else "completed",
+        "total": sweep["total"] if sweep else 0,
+        "status_url": f"/getAccountSweepStatus?sweep_id={sweep_id}",
+        "stream_url": f"/accountSweepStream?sweep_id={sweep_id}"
+    }
+
+@app.route('/getAccountSweepStatus', methods=['GET'])
+def getAccountSweepStatus():
+    """查询账号校验进度"""
+    sweep_id = request.args.get('sweep_id')
+    if not sweep_id:
+        return jsonify({"code": 400, "msg": "缺少 sweep_id 参数", "data": None}), 400
+
+    sweep = get_sweep_status(sweep_id)
+    if not sweep:
+        return jsonify({"code": 404, "msg": "校验任务不存在", "data": None}), 404
+
+    return jsonify({"code": 200, "msg": "success", "data": sweep}), 200
+
+@app.route('/accountSweepStream')
+def accountSweepStream():
+    """以 SSE 推送账号校验进度，完成后推送最终结果并断开"""
+    sweep_id = request.args.get('sweep_id')
+    if not sweep_id or not get_sweep_status(sweep_id):
+        return jsonify({"code": 404, "msg": "校验任务不存在", "data": None}), 404
+
+    def stream():
+        while True:
+            done = wait_for_sweep(sweep_id, timeout=1)
+            sweep = get_sweep_status(sweep_id)
+            if sweep is None:
+                break
+            yield f"data: {json.dumps(sweep, ensure_ascii=False)}\n\n"
+            if done:
+                break
+
+    response = Response(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 if __name__ == '__main__':
+    # 后台定时检查账号健康状态，列表接口只读缓存结果
+    get_account_scheduler().start()
+    # 批量发布任务由固定大小的 worker 池从 tasks 表中领取执行
+    get_backend_task_pool().start()
+    # videoFile 目录索引，/getRecentUploads 直接查询索引表
+    get_file_catalog().start()
+    # 补探测升级前上传 / 服务中断时未完成探测的素材
+    get_probe_pool().resume_pending()
     app.run(host='127.0.0.1' ,port=5409)
@@ -1,4 +1,5 @@
 import { http } from '@/utils/request'
+import { uploadFileChunked } from '@/utils/chunkedUpload'
 
 // 素材管理API
 export const materialApi = {
@@ -12,6 +13,11 @@ export const materialApi = {
     // 使用http.upload方法，它已经配置了正确的Content-Type
     return http.upload('/uploadSave', formData)
   },
+
+  // 分片断点续传上传素材（大文件、网络中断后可续传）
+  uploadMaterialChunked: (file, options) => {
+    return uploadFileChunked(file, options)
+  },
   
   // 删除素材
   deleteMaterial: (id) => {
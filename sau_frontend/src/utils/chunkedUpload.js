@@ -0,0 +1,94 @@
+import { http } from '@/utils/request'
+
+// 分片断点续传客户端，对应后端 /uploads 接口
+const CHUNK_SIZE = 8 * 1024 * 1024
+// 同时上传的分片数
+const PARALLEL_CHUNKS = 4
+// 单个分片失败后的重试次数
+const CHUNK_RETRIES = 3
+const STORAGE_PREFIX = 'sau-upload:'
+// 不超过该大小的文件先计算整个文件的 SHA-256，服务端已有相同内容时秒传（更大的文件整块读入内存代价太高）
+const INSTANT_UPLOAD_MAX_SIZE = 256 * 1024 * 1024
+
+const sha256Hex = async (blob) => {
+  const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer())
+  return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('')
+}
+
+const storageKey = (file) => `${STORAGE_PREFIX}${file.name}:${file.size}:${file.lastModified}`
+
+// 同一个文件上次未完成的会话还在就继续用，否则新建
+const openSession = async (file, filename) => {
+  const key = storageKey(file)
+  const uploadId = localStorage.getItem(key)
+  if (uploadId) {
+    try {
+      const res = await http.get(`/uploads/${uploadId}`)
+      if (res.data.status === 'uploading') {
+        return res.data
+      }
+    } catch (error) {
+      console.warn('上传会话已失效，重新上传:', error)
+    }
+    localStorage.removeItem(key)
+  }
+  const checksum = file.size <= INSTANT_UPLOAD_MAX_SIZE ? await sha256Hex(file) : undefined
+  const res = await http.post('/uploads', {
+    filename: file.name, size: file.size, chunkSize: CHUNK_SIZE, checksum, customFilename: filename
+  })
+  if (res.data.status === 'uploading') {
+    localStorage.setItem(key, res.data.upload_id)
+  }
+  return res.data
+}
+
+const putChunk = async (session, file, index) => {
+  const start = index * session.chunk_size
+  const blob = file.slice(start, Math.min(start + session.chunk_size, file.size))
+  const checksum = await sha256Hex(blob)
+  for (let attempt = 1; ; attempt++) {
+    try {
+      return await http.put(`/uploads/${session.upload_id}/chunks/${index}`, blob, {
+        headers: { 'Content-Type': 'application/octet-stream', 'X-Chunk-Sha256': checksum }
+      })
+    } catch (error) {
+      if (attempt >= CHUNK_RETRIES) throw error
+      await new Promise(resolve => setTimeout(resolve, attempt * 1000))
+    }
+  }
+}
+
+/**
+ * 分片上传文件，返回 {filename, filepath}
+ * @param {File} file
+ * @param {Object} options filename: 自定义文件名（不含扩展名），onProgress: (percent) => void
+ */
+export const uploadFileChunked = async (file, { filename, onProgress } = {}) => {
+  const session = await openSession(file, filename)
+  if (session.status === 'completed') {
+    // 秒传
+    onProgress?.(100)
+    return { code: 200, data: { filename: session.filename, filepath: session.filepath } }
+  }
+  const received = new Set(session.received)
+  const pending = []
+  for (let index = 0; index < session.total_chunks; index++) {
+    if (!received.has(index)) pending.push(index)
+  }
+
+  let done = session.total_chunks - pending.length
+  onProgress?.(Math.round(done / session.total_chunks * 100))
+  const worker = async () => {
+    while (pending.length) {
+      const index = pending.shift()
+      await putChunk(session, file, index)
+      done += 1
+      onProgress?.(Math.round(done / session.total_chunks * 100))
+    }
+  }
+  await Promise.all(Array.from({ length: Math.min(PARALLEL_CHUNKS, pending.length) }, worker))
+
+  const res = await http.post(`/uploads/${session.upload_id}/complete`, { filename })
+  localStorage.removeItem(storageKey(file))
+  return res
+}
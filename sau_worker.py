@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# sau_worker.py - 独立的发布 worker 进程
+"""
+从 tasks 表领取 publish 任务（文件×账号），在本进程的事件循环中同时驱动 N 个浏览器上传。
+sau_backend 以 SAU_WORKER_MODE=external 启动时，批量发布只负责入队，浏览器全部在 worker 进程中运行；
+多开几个 worker 进程即可利用多核并行发布（同一台机器共享 db/database.db）。
+发布限流状态同样保存在数据库中，所有 worker 共享同一份账号 / 平台额度，被限流的任务延后重新入队。
+worker 进程常驻，同一账号的连续上传复用同一个浏览器上下文（空闲超时后关闭）。
+上传进度事件写入 publish 任务自己的 task_events，页面上传百分比同时写入任务进度。
+批量任务的最后一个子任务结束时，由 worker 写入汇总结果并结束父任务。
+
+用法:
+    python sau_worker.py --browsers 3
+"""
+import argparse
+import asyncio
+import os
+import socket
+
+from myUtils.publish_engine import PublishEngine, job_from_payload
+from myUtils.publish_tasks import PUBLISH_TASK, finalize_dispatched_batch, finalize_settled_batches
+from utils import task_queue
+from utils.account_sessions import session_scope, SESSION_MAX_CONTEXTS
+from utils.browser_adapter import close_adapter_session
+from utils.upload_progress import task_event_sink
+
+# 每个 worker 进程同时运行的浏览器（上传任务）数量
+WORKER_BROWSERS = 3
+
+
+class PublishWorker:
+    def __init__(self, browsers: int = WORKER_BROWSERS, lease_seconds: float = task_queue.TASK_LEASE_SECONDS,
+                 poll_interval: float = task_queue.TASK_POLL_INTERVAL):
+        self.browsers = browsers
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.prefix = f"{socket.gethostname()}-{os.getpid()}-worker"
+        self.engine = PublishEngine()
+        self._running = {}
+
+    async def run(self):
+        await asyncio.to_thread(task_queue.init_task_table)
+        await asyncio.to_thread(task_queue.recover_expired_tasks)
+        print(f"🧵 发布 worker 已启动: {self.prefix}，同时运行 {self.browsers} 个浏览器")
+        try:
+            # 常驻上下文不少于同时运行的浏览器数，避免上传排队等待会话
+            async with session_scope(max(self.browsers, SESSION_MAX_CONTEXTS)):
+                await asyncio.gather(
+                    *(self._slot(f"{self.prefix}-{index}") for index in range(self.browsers)),
+                    self._maintenance()
+                )
+        finally:
+            await close_adapter_session()
+
+    async def _slot(self, worker_id: str):
+        while True:
+            try:
+                task = await asyncio.to_thread(task_queue.claim, [PUBLISH_TASK], worker_id, self.lease_seconds)
+            except Exception as e:
+                print(f"⚠️ {worker_id} 领取任务失败: {e}")
+                task = None
+            if task is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            await self._execute(task, worker_id)
+
+    async def _execute(self, task: dict, worker_id: str):
+        task_id = task["id"]
+        self._running[task_id] = worker_id
+        finished = True
+        try:
+            job = job_from_payload(task["payload"]["job"])
+            on_event = task_event_sink(task_id, lambda _, percent: task_queue.update_progress(task_id, percent))
+            result = await self.engine.run_job(job, on_event)
+            if result.get("throttled"):
+                # 限流不是失败：放回队列，等额度恢复后再由任意 worker 领取
+                await asyncio.to_thread(task_queue.reschedule, task_id, result["retry_after"], result["error"])
+                finished = False
+            elif result["success"]:
+                await asyncio.to_thread(task_queue.complete, task_id, result, "上传成功")
+            else:
+                await asyncio.to_thread(task_queue.update_progress, task_id, None, None, result)
+                await asyncio.to_thread(task_queue.fail, task_id, result["error"] or "上传失败", False, 0, "上传失败")
+        except Exception as e:
+            print(f"❌ 任务 {task_id} 执行异常: {e}")
+            await asyncio.to_thread(task_queue.fail, task_id, str(e))
+        finally:
+            self._running.pop(task_id, None)
+        if finished and task.get("parent_id"):
+            # 最后一个子任务结束时由 worker 写入批量任务的汇总结果
+            try:
+                await asyncio.to_thread(finalize_dispatched_batch, task["parent_id"])
+            except Exception as e:
+                print(f"⚠️ 批量任务 {task['parent_id']} 汇总失败: {e}")
+
+    async def _maintenance(self):
+        """续约本进程正在执行的任务，并回收其他崩溃 worker 留下的任务"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            for task_id, worker_id in list(self._running.items()):
+                try:
+                    await asyncio.to_thread(task_queue.heartbeat, task_id, worker_id, self.lease_seconds)
+                except Exception as e:
+                    print(f"⚠️ 任务 {task_id} 续约失败: {e}")
+            try:
+                await asyncio.to_thread(task_queue.recover_expired_tasks)
+                await asyncio.to_thread(finalize_settled_batches)
+            except Exception as e:
+                print(f"⚠️ 回收任务失败: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish worker for social-auto-upload.")
+    parser.add_argument("--browsers", type=int, default=int(os.environ.get("SAU_WORKER_BROWSERS", WORKER_BROWSERS)),
+                        help="同时运行的浏览器（上传任务）数量")
+    parser.add_argument("--lease", type=float, default=task_queue.TASK_LEASE_SECONDS, help="任务租约时长（秒）")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(PublishWorker(args.browsers, args.lease).run())
+    except KeyboardInterrupt:
+        print("👋 worker 已退出，未完成的任务将在租约过期后由其他 worker 接管")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布限流测试：令牌桶突发 / 补充、平台与账号两级限额、每日配额
+使用临时数据库，不影响 db/database.db
+python test/test_rate_limiter.py
+"""
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils import database, rate_limiter
+from utils.rate_limiter import RateLimited, try_acquire, get_quota_usage
+
+PLATFORM = "test_platform"
+# 每秒补充 20 个令牌，测试中等待几十毫秒即可补满
+FAST_RATE = 20 * 3600
+
+
+class RateLimiterTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._db_path = database.DB_PATH
+        database.close_connection()
+        database.DB_PATH = Path(self._tmp.name) / "database.db"
+        rate_limiter._table_ready = False
+        self.set_limits(platform={"per_hour": FAST_RATE, "burst": 10},
+                        account={"per_hour": FAST_RATE, "burst": 2, "daily_quota": None})
+
+    def tearDown(self):
+        rate_limiter.PLATFORM_RATE_LIMITS.pop(PLATFORM, None)
+        rate_limiter.ACCOUNT_RATE_LIMITS.pop(PLATFORM, None)
+        database.close_connection()
+        database.DB_PATH = self._db_path
+        rate_limiter._table_ready = False
+        self._tmp.cleanup()
+
+    def set_limits(self, platform: dict, account: dict):
+        rate_limiter.PLATFORM_RATE_LIMITS[PLATFORM] = platform
+        rate_limiter.ACCOUNT_RATE_LIMITS[PLATFORM] = account
+
+    def test_burst_then_throttled(self):
+        self.assertEqual(try_acquire(PLATFORM, "a"), 0)
+        self.assertEqual(try_acquire(PLATFORM, "a"), 0)
+        with self.assertRaises(RateLimited) as ctx:
+            try_acquire(PLATFORM, "a")
+        # 令牌不足 1 个，按补充速率计算等待时间
+        self.assertGreater(ctx.exception.retry_after, 0)
+        self.assertLessEqual(ctx.exception.retry_after, 3600 / FAST_RATE)
+
+    def test_tokens_refill(self):
+        try_acquire(PLATFORM, "a")
+        try_acquire(PLATFORM, "a")
+        with self.assertRaises(RateLimited) as ctx:
+            try_acquire(PLATFORM, "a")
+        time.sleep(ctx.exception.retry_after + 0.02)
+        self.assertEqual(try_acquire(PLATFORM, "a"), 0)
+
+    def test_accounts_have_separate_buckets(self):
+        try_acquire(PLATFORM, "a")
+        try_acquire(PLATFORM, "a")
+        with self.assertRaises(RateLimited):
+            try_acquire(PLATFORM, "a")
+        self.assertEqual(try_acquire(PLATFORM, "b"), 0)
+
+    def test_platform_bucket_is_shared(self):
+        self.set_limits(platform={"per_hour": 1, "burst": 2},
+                        account={"per_hour": FAST_RATE, "burst": 5, "daily_quota": None})
+        try_acquire(PLATFORM, "a")
+        try_acquire(PLATFORM, "b")
+        with self.assertRaises(RateLimited) as ctx:
+            try_acquire(PLATFORM, "c")
+        self.assertEqual(ctx.exception.reason, "平台发布过于频繁")
+
+    def test_throttled_attempt_consumes_nothing(self):
+        self.set_limits(platform={"per_hour": 1, "burst": 1},
+                        account={"per_hour": 1, "burst": 2, "daily_quota": 10})
+        try_acquire(PLATFORM, "a")
+        # 账号还剩 1 个令牌，但平台桶已空：整体拒绝，账号令牌和配额都不扣减
+        with self.assertRaises(RateLimited):
+            try_acquire(PLATFORM, "a")
+        self.assertEqual(get_quota_usage(PLATFORM, "a")["used"], 1)
+        self.set_limits(platform={"per_hour": FAST_RATE, "burst": 1},
+                        account={"per_hour": 1, "burst": 2, "daily_quota": 10})
+        time.sleep(0.1)
+        self.assertEqual(try_acquire(PLATFORM, "a"), 0)
+        self.assertEqual(get_quota_usage(PLATFORM, "a")["used"], 2)
+
+    def test_daily_quota(self):
+        self.set_limits(platform={"per_hour": FAST_RATE, "burst": 10},
+                        account={"per_hour": FAST_RATE, "burst": 10, "daily_quota": 2})
+        try_acquire(PLATFORM, "a")
+        try_acquire(PLATFORM, "a")
+        with self.assertRaises(RateLimited) as ctx:
+            try_acquire(PLATFORM, "a")
+        # 配额用完要等到第二天
+        self.assertGreater(ctx.exception.retry_after, 0)
+        self.assertLessEqual(ctx.exception.retry_after, 24 * 3600)
+        self.assertEqual(get_quota_usage(PLATFORM, "a"), {"used": 2, "quota": 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务队列测试：租约过期回收、续约、限流延后重新排队
+使用临时数据库，不影响 db/database.db
+python test/test_task_queue.py
+"""
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils import database, task_queue
+from utils.task_queue import (TASK_PENDING, TASK_RUNNING, TASK_FAILED, enqueue, claim, heartbeat, reschedule,
+                              recover_expired_tasks, get_task)
+
+KIND = "test"
+
+
+class TaskQueueTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self._db_path = database.DB_PATH
+        database.close_connection()
+        database.DB_PATH = Path(self._tmp.name) / "database.db"
+        task_queue._table_ready = False
+
+    def tearDown(self):
+        database.close_connection()
+        database.DB_PATH = self._db_path
+        task_queue._table_ready = False
+        self._tmp.cleanup()
+
+    def test_claim_is_exclusive(self):
+        task_id = enqueue(KIND, {"n": 1})
+        task = claim([KIND], "worker-a")
+        self.assertEqual(task["id"], task_id)
+        self.assertEqual(task["status"], TASK_RUNNING)
+        self.assertEqual(task["attempts"], 1)
+        self.assertIsNone(claim([KIND], "worker-b"))
+
+    def test_heartbeat_extends_lease(self):
+        task_id = enqueue(KIND, {})
+        claim([KIND], "worker-a", lease_seconds=0.2)
+        time.sleep(0.1)
+        self.assertTrue(heartbeat(task_id, "worker-a", lease_seconds=60))
+        time.sleep(0.2)
+        self.assertEqual(recover_expired_tasks(), 0)
+        self.assertEqual(get_task(task_id)["status"], TASK_RUNNING)
+
+    def test_expired_lease_is_recovered(self):
+        task_id = enqueue(KIND, {})
+        claim([KIND], "worker-a", lease_seconds=0.05)
+        time.sleep(0.1)
+        self.assertEqual(recover_expired_tasks(), 1)
+        task = get_task(task_id)
+        self.assertEqual(task["status"], TASK_PENDING)
+        self.assertIsNone(task["worker_id"])
+        # 原 worker 已失去任务，续约失败；其他 worker 可以重新领取
+        self.assertFalse(heartbeat(task_id, "worker-a"))
+        task = claim([KIND], "worker-b")
+        self.assertEqual(task["id"], task_id)
+        self.assertEqual(task["attempts"], 2)
+
+    def test_expired_lease_fails_after_max_attempts(self):
+        task_id = enqueue(KIND, {}, max_attempts=1)
+        claim([KIND], "worker-a", lease_seconds=0.05)
+        time.sleep(0.1)
+        self.assertEqual(recover_expired_tasks(), 1)
+        self.assertEqual(get_task(task_id)["status"], TASK_FAILED)
+        self.assertIsNone(claim([KIND], "worker-b"))
+
+    def test_reschedule_delays_without_counting_attempt(self):
+        task_id = enqueue(KIND, {}, max_attempts=1)
+        claim([KIND], "worker-a")
+        reschedule(task_id, 60, "限流")
+        task = get_task(task_id)
+        self.assertEqual(task["status"], TASK_PENDING)
+        self.assertEqual(task["attempts"], 0)
+        self.assertEqual(task["message"], "限流")
+        self.assertIsNone(task["worker_id"])
+        # 延后期间不会被领取
+        self.assertIsNone(claim([KIND], "worker-b"))
+
+    def test_rescheduled_task_is_claimed_when_due(self):
+        task_id = enqueue(KIND, {}, max_attempts=1)
+        claim([KIND], "worker-a")
+        reschedule(task_id, 0.05)
+        time.sleep(0.1)
+        task = claim([KIND], "worker-b")
+        self.assertEqual(task["id"], task_id)
+        self.assertEqual(task["worker_id"], "worker-b")
+        self.assertEqual(task["attempts"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -70,7 +70,7 @@ async def test_wechat_account_info():
         
         # 使用项目根目录作为 base_dir
         base_dir = str(project_root)
-        account_info = adapter.get_account_info_with_avatar(tab_id, platform, base_dir)
+        account_info = await adapter.get_account_info_with_avatar(tab_id, platform, base_dir)
         print(account_info)
         if account_info:
             print("✅ 账号信息提取成功！")
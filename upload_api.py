@@ -3,19 +3,21 @@
 
 import os
 import json
-import asyncio
 import subprocess
 import tempfile
 import uuid
 from datetime import datetime
 from pathlib import Path
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from werkzeug.utils import secure_filename
-import threading
 import time
 from utils.video_utils import is_video_file
-import sqlite3
+from utils import database
+from utils.task_queue import TaskWorkerPool, RescheduleTask, enqueue, get_task, list_tasks
+from utils.rate_limiter import acquire, RateLimited, THROTTLE_MAX_WAIT
 from utils.files_times import get_title_and_hashtags
+from utils.upload_progress import UploadProgress, task_event_sink, sse_events
+from utils.browser_adapter import run_with_adapter_session
 # 导入现有的上传模块
 from cli_main import main as cli_main
 import sys
@@ -39,165 +41,183 @@ app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 # 确保上传目录存在
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# 任务状态存储（生产环境建议用Redis）
-task_status = {}
+# 上传任务持久化在 tasks 表中，由固定大小的 worker 池执行
+UPLOAD_TASK = "upload"
+UPLOAD_WORKER_COUNT = 2
 
 def allowed_file(filename):
     return is_video_file(filename)
 
-class UploadTask:
-    def __init__(self, task_id, platform, account, video_file, title, description, publish_type=0, schedule=None):
-        self.task_id = task_id
-        self.platform = platform
-        self.account = account
-        self.video_file = video_file
-        self.title = title
-        self.description = description
-        self.publish_type = publish_type
-        self.schedule = schedule
-        self.status = 'pending'
-        self.progress = 0
-        self.message = ''
-        self.error = None
-        self.created_at = datetime.now()
-        self.started_at = None
-        self.completed_at = None
-
-    def to_dict(self):
-        return {
-            'task_id': self.task_id,
-            'platform': self.platform,
-            'account': self.account,
-            'status': self.status,
-            'progress': self.progress,
-            'message': self.message,
-            'error': self.error,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'started_at': self.started_at.isoformat() if self.started_at else None,
-            'completed_at': self.completed_at.isoformat() if self.completed_at else None
-        }
-
-async def run_upload_task(task):
-    """异步执行上传任务 - 直接调用上传逻辑"""
+def create_upload_task(platform, account, video_file, title, description, publish_type=0, schedule=None, task_id=None):
+    """创建上传任务并入队，返回任务ID"""
+    return enqueue(UPLOAD_TASK, {
+        'platform': platform,
+        'account': account,
+        'video_file': video_file,
+        'title': title,
+        'description': description,
+        'publish_type': publish_type,
+        'schedule': schedule
+    }, task_id=task_id)
+
+def task_to_dict(task):
+    payload = task['payload']
+    return {
+        'task_id': task['id'],
+        'platform': payload['platform'],
+        'account': payload['account'],
+        'status': task['status'],
+        'progress': task['progress'],
+        'message': task['message'],
+        'error': task['error'],
+        'attempts': task['attempts'],
+        'created_at': task['created_at'],
+        'started_at': task['started_at'],
+        'completed_at': task['completed_at']
+    }
+
+async def run_uploader(uploader, task, account_file, ctx):
+    """执行上传器：上传事件写入任务事件表，页面上传百分比映射为 60-95 的任务进度"""
+    def on_percent(_, percent):
+        ctx.update(round(60 + percent * 0.35, 1), f'视频上传中 {percent:.0f}%')
+
+    uploader.progress = UploadProgress(task['platform'], account_file.name, Path(task['video_file']).name,
+                                       task_event_sink(ctx.task_id, on_percent))
+    error = None
     try:
-        task.status = 'running'
-        task.started_at = datetime.now()
-        task.message = '开始上传...'
-        task.progress = 10
-        
-        # 验证文件存在
-        if not os.path.exists(task.video_file):
-            raise FileNotFoundError(f"视频文件不存在: {task.video_file}")
-        
-        # 验证文件格式
-        video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.webm', '.m4v', '.3gp', '.3g2'}
-        file_ext = Path(task.video_file).suffix.lower()
-        if file_ext not in video_extensions:
-            print(f"警告：{file_ext} 可能不是支持的视频格式")
-        
-        task.message = '获取账号信息...'
-        task.progress = 20
-        
-        # 获取账号文件路径
-        account_file = get_account_file_from_db_api(task.platform, task.account)
-        if not account_file.exists():
-            raise FileNotFoundError(f"未找到平台 {task.platform} 账号 {task.account} 的有效cookie文件")
-        
-        task.message = '解析标题和标签...'
-        task.progress = 30
-        
-        # 获取标题和标签
-        title, tags = get_title_and_hashtags(task.video_file, task.title, task.description)
-        
-        # 处理发布时间
-        if task.publish_type == 0:
-            publish_date = 0  # 立即发布
-        else:
-            if task.schedule:
-                publish_date = datetime.strptime(task.schedule, '%Y-%m-%d %H:%M')
-            else:
-                publish_date = 0
-        
-        task.message = '初始化上传器...'
-        task.progress = 40
-        
-        # 根据平台选择对应的上传器
-        if task.platform == 'douyin':
-            from uploader.douyin_uploader.main import douyin_setup, DouYinVideo
-            
-            task.message = '设置抖音环境...'
-            await douyin_setup(str(account_file), handle=False)
-            
-            task.message = '开始上传到抖音...'
-            task.progress = 60
-            
-            app = DouYinVideo(title, task.video_file, tags, publish_date, str(account_file))
-            await app.main()
-            
-        elif task.platform == 'tencent':
-            from uploader.tencent_uploader.main import weixin_setup, TencentVideo
-            from utils.constant import TencentZoneTypes
-            
-            task.message = '设置微信视频号环境...'
-            await weixin_setup(str(account_file), handle=True)
-            
-            task.message = '开始上传到微信视频号...'
-            task.progress = 60
-            
-            category = TencentZoneTypes.LIFESTYLE.value
-            app = TencentVideo(title, task.video_file, tags, publish_date, str(account_file), category)
-            await app.main()
-            
-        elif task.platform == 'tiktok':
-            from uploader.tk_uploader.main_chrome import tiktok_setup, TiktokVideo
-            
-            task.message = '设置TikTok环境...'
-            await tiktok_setup(str(account_file), handle=True)
-            
-            task.message = '开始上传到TikTok...'
-            task.progress = 60
-            
-            app = TiktokVideo(title, task.video_file, tags, publish_date, str(account_file))
-            await app.main()
-            
-        elif task.platform == 'kuaishou':
-            from uploader.ks_uploader.main import ks_setup, KSVideo
-            
-            task.message = '设置快手环境...'
-            await ks_setup(str(account_file), handle=True)
-            
-            task.message = '开始上传到快手...'
-            task.progress = 60
-            
-            app = KSVideo(title, task.video_file, tags, publish_date, str(account_file))
-            await app.main()
-            
+        await uploader.main()
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        uploader.progress.finish(error)
+
+async def run_upload_task(task, ctx):
+    """异步执行上传任务 - 直接调用上传逻辑"""
+    ctx.update(10, '开始上传...')
+
+    # 验证文件存在
+    if not os.path.exists(task['video_file']):
+        raise FileNotFoundError(f"视频文件不存在: {task['video_file']}")
+
+    # 验证文件格式
+    video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv', '.webm', '.m4v', '.3gp', '.3g2'}
+    file_ext = Path(task['video_file']).suffix.lower()
+    if file_ext not in video_extensions:
+        print(f"警告：{file_ext} 可能不是支持的视频格式")
+
+    ctx.update(20, '获取账号信息...')
+
+    # 获取账号文件路径
+    account_file = get_account_file_from_db_api(task['platform'], task['account'])
+    if not account_file.exists():
+        raise FileNotFoundError(f"未找到平台 {task['platform']} 账号 {task['account']} 的有效cookie文件")
+
+    ctx.update(30, '解析标题和标签...')
+
+    # 获取标题和标签
+    title, tags = get_title_and_hashtags(task['video_file'], task['title'], task['description'])
+
+    # 处理发布时间
+    if task['publish_type'] == 0:
+        publish_date = 0  # 立即发布
+    else:
+        if task['schedule']:
+            publish_date = datetime.strptime(task['schedule'], '%Y-%m-%d %H:%M')
         else:
-            raise ValueError(f"不支持的平台: {task.platform}")
-        
-        task.status = 'completed'
-        task.progress = 100
-        task.message = '上传成功'
-        task.completed_at = datetime.now()
-        
+            publish_date = 0
+
+    # 发布限流：短时间等待，超过 THROTTLE_MAX_WAIT 则延后重新调度
+    ctx.update(35, '检查发布限额...')
+    try:
+        await acquire(task['platform'], account_file.name, THROTTLE_MAX_WAIT)
+    except RateLimited as e:
+        raise RescheduleTask(e.retry_after, f"发布限流: {e}")
+
+    ctx.update(40, '初始化上传器...')
+
+    # 根据平台选择对应的上传器
+    if task['platform'] == 'douyin':
+        from uploader.douyin_uploader.main import douyin_setup, DouYinVideo
+
+        ctx.update(message='设置抖音环境...')
+        await douyin_setup(str(account_file), handle=False)
+
+        ctx.update(60, '开始上传到抖音...')
+
+        uploader = DouYinVideo(title, task['video_file'], tags, publish_date, str(account_file))
+        await run_uploader(uploader, task, account_file, ctx)
+
+    elif task['platform'] == 'tencent':
+        from uploader.tencent_uploader.main import weixin_setup, TencentVideo
+        from utils.constant import TencentZoneTypes
+
+        ctx.update(message='设置微信视频号环境...')
+        await weixin_setup(str(account_file), handle=True)
+
+        ctx.update(60, '开始上传到微信视频号...')
+
+        category = TencentZoneTypes.LIFESTYLE.value
+        uploader = TencentVideo(title, task['video_file'], tags, publish_date, str(account_file), category)
+        await run_uploader(uploader, task, account_file, ctx)
+
+    elif task['platform'] == 'tiktok':
+        from uploader.tk_uploader.main_chrome import tiktok_setup, TiktokVideo
+
+        ctx.update(message='设置TikTok环境...')
+        await tiktok_setup(str(account_file), handle=True)
+
+        ctx.update(60, '开始上传到TikTok...')
+
+        uploader = TiktokVideo(title, task['video_file'], tags, publish_date, str(account_file))
+        await run_uploader(uploader, task, account_file, ctx)
+
+    elif task['platform'] == 'kuaishou':
+        from uploader.ks_uploader.main import ks_setup, KSVideo
+
+        ctx.update(message='设置快手环境...')
+        await ks_setup(str(account_file), handle=True)
+
+        ctx.update(60, '开始上传到快手...')
+
+        uploader = KSVideo(title, task['video_file'], tags, publish_date, str(account_file))
+        await run_uploader(uploader, task, account_file, ctx)
+
+    else:
+        raise ValueError(f"不支持的平台: {task['platform']}")
+
+def handle_upload_task(task, ctx):
+    """worker 池的任务处理函数"""
+    payload = task['payload']
+    # 只有限流延后的任务会重新执行，需要保留临时文件；失败的任务由 worker 池标记为 failed，不再执行
+    requeued = False
+    try:
+        run_with_adapter_session(run_upload_task(payload, ctx))
+        ctx.update(message='上传成功')
+    except RescheduleTask:
+        requeued = True
+        raise
     except Exception as e:
-        task.status = 'failed'
-        task.error = f"上传失败: {str(e)}"
-        task.message = '上传失败'
-        task.completed_at = datetime.now()
         print(f"任务执行异常: {e}")
-        import traceback
-        traceback.print_exc()
-    
+        ctx.update(message='上传失败')
+        raise Exception(f"上传失败: {str(e)}")
     finally:
-        # 清理临时文件（只清理上传的临时文件，不清理用户指定的文件）
+        # 任务不再重新执行时清理临时文件（只清理上传的临时文件，不清理用户指定的文件）
         try:
-            if task.video_file.startswith(app.config['UPLOAD_FOLDER']):
-                if os.path.exists(task.video_file):
-                    os.remove(task.video_file)
+            if not requeued and payload['video_file'].startswith(app.config['UPLOAD_FOLDER']):
+                if os.path.exists(payload['video_file']):
+                    os.remove(payload['video_file'])
         except:
             pass
 
+_pool = None
+
+def get_upload_task_pool():
+    global _pool
+    if _pool is None:
+        _pool = TaskWorkerPool({UPLOAD_TASK: handle_upload_task}, size=UPLOAD_WORKER_COUNT, name="upload_api")
+    return _pool
+
 def get_account_file_from_db_api(platform, account_name):
     """API版本的获取账号文件函数"""
     platform_map = {
@@ -216,26 +236,11 @@ def get_account_file_from_db_api(platform, account_name):
     # 导入BASE_DIR
     from conf import BASE_DIR
     
-    with sqlite3.connect(Path(BASE_DIR / "db" / "database.db")) as conn:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT filePath FROM user_info 
-            WHERE type = ? AND userName = ? AND status = 1
-        ''', (platform_map[platform], account_name))
-        
-        result = cursor.fetchone()
-        if result:
-            return Path(BASE_DIR / "cookiesFile" / result[0])
-        else:
-            raise FileNotFoundError(f"未找到平台 {platform} 账号 {account_name} 的有效cookie文件")
-def run_task_in_thread(task):
-    """在新线程中运行异步任务"""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        loop.run_until_complete(run_upload_task(task))
-    finally:
-        loop.close()
+    file_path = database.find_valid_account_file(platform_map[platform], account_name)
+    if file_path:
+        return Path(BASE_DIR / "cookiesFile" / file_path)
+    else:
+        raise FileNotFoundError(f"未找到平台 {platform} 账号 {account_name} 的有效cookie文件")
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -288,25 +293,18 @@ def upload_video():
         if not title:
             title = os.path.splitext(filename)[0]
         
-        # 创建任务
-        task = UploadTask(
-            task_id=task_id,
+        # 创建任务（由 worker 池在后台执行）
+        create_upload_task(
             platform=platform,
             account=account,
             video_file=file_path,
             title=title,
             description=description,
             publish_type=publish_type,
-            schedule=schedule
+            schedule=schedule,
+            task_id=task_id
         )
         
-        task_status[task_id] = task
-        
-        # 在后台线程中执行任务
-        thread = threading.Thread(target=run_task_in_thread, args=(task,))
-        thread.daemon = True
-        thread.start()
-        
         return jsonify({
             'success': True,
             'task_id': task_id,
@@ -339,9 +337,7 @@ def simple_upload():
             return jsonify({'success': False, 'error': '视频文件不存在'}), 400
         
         # 创建任务
-        task_id = str(uuid.uuid4())
-        task = UploadTask(
-            task_id=task_id,
+        task_id = create_upload_task(
             platform=platform,
             account=account,
             video_file=video_file,
@@ -351,18 +347,11 @@ def simple_upload():
             schedule=schedule
         )
         
-        task_status[task_id] = task
-        
-        # 在后台线程中执行任务
-        thread = threading.Thread(target=run_task_in_thread, args=(task,))
-        thread.daemon = True
-        thread.start()
-        
         return jsonify({
             'success': True,
             'task_id': task_id,
             'message': '上传任务已创建',
-            'status': task.to_dict()
+            'status': task_to_dict(get_task(task_id))
         })
         
     except Exception as e:
@@ -371,19 +360,35 @@ def simple_upload():
 @app.route('/api/task/<task_id>', methods=['GET'])
 def get_task_status(task_id):
     """获取任务状态"""
-    task = task_status.get(task_id)
+    task = get_task(task_id, UPLOAD_TASK)
     if not task:
         return jsonify({'success': False, 'error': '任务不存在'}), 404
     
     return jsonify({
         'success': True,
-        'task': task.to_dict()
+        'task': task_to_dict(task)
     })
 
+@app.route('/api/task/<task_id>/events', methods=['GET'])
+def stream_task_events(task_id):
+    """SSE 推送任务的上传事件（阶段、上传百分比、字节数、重试），任务结束后关闭；支持 Last-Event-ID 续传"""
+    if not get_task(task_id, UPLOAD_TASK):
+        return jsonify({'success': False, 'error': '任务不存在'}), 404
+    after_id = request.headers.get('Last-Event-ID', request.args.get('after', 0, type=int), type=int)
+
+    def is_finished():
+        return get_task(task_id)['status'] in ('completed', 'failed')
+
+    response = Response(sse_events(lambda: [task_id], after_id, is_finished), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/api/tasks', methods=['GET'])
-def list_tasks():
+def list_all_tasks():
     """获取所有任务列表"""
-    tasks = [task.to_dict() for task in task_status.values()]
+    limit = request.args.get('limit', 100, type=int)
+    tasks = [task_to_dict(task) for task in list_tasks(UPLOAD_TASK, limit=limit)]
     return jsonify({
         'success': True,
         'tasks': tasks,
@@ -417,4 +422,5 @@ if __name__ == '__main__':
     print("  -H 'Content-Type: application/json' \\")
     print("  -d '{\"platform\":\"douyin\",\"account\":\"endian\",\"video_file\":\"./videos/demo.mp4\",\"title\":\"测试视频\"}'")
     
+    get_upload_task_pool().start()
     app.run(host='127.0.0.1', port=5001, debug=True)
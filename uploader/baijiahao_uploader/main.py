@@ -8,9 +8,12 @@ import time
 import asyncio
 
 from conf import LOCAL_CHROME_PATH
-from utils.base_social_media import set_init_script
+from utils.base_social_media import set_init_script, SOCIAL_MEDIA_BAIJIAHAO
 from utils.log import baijiahao_logger
 from utils.network import async_retry
+from utils.route_policy import apply_route_policy
+from utils.launch_profile import launch_browser
+from utils.upload_progress import UploadProgress, watch_page
 
 
 async def baijiahao_cookie_gen(account_file):
@@ -72,6 +75,8 @@ class BaiJiaHaoVideo(object):
         self.date_format = '%Y年%m月%d日 %H:%M'
         self.local_executable_path = LOCAL_CHROME_PATH
         self.proxy_setting = proxy_setting
+        # 上传进度钩子，发布引擎会替换为带上报目标的实例
+        self.progress = UploadProgress(SOCIAL_MEDIA_BAIJIAHAO)
 
     async def set_schedule_time(self, page, publish_date):
         """
@@ -118,15 +123,18 @@ class BaiJiaHaoVideo(object):
         print("视频出错了，重新上传中")
 
     async def upload(self, playwright: Playwright) -> None:
+        self.progress.phase("launch")
         # 使用 Chromium 浏览器启动一个浏览器实例
-        browser = await playwright.chromium.launch(headless=False, executable_path=self.local_executable_path, proxy=self.proxy_setting)
+        browser = await launch_browser(playwright, SOCIAL_MEDIA_BAIJIAHAO, self.local_executable_path, proxy=self.proxy_setting)
         # 创建一个浏览器上下文，使用指定的 cookie 文件
         context = await browser.new_context(storage_state=f"{self.account_file}", user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0.4324.150 Safari/537.36')
         # context = await set_init_script(context)
+        context = await apply_route_policy(context, SOCIAL_MEDIA_BAIJIAHAO)
         await context.grant_permissions(['geolocation'])
 
         # 创建一个新的页面
         page = await context.new_page()
+        await watch_page(page, self.progress)
         # 访问指定的 URL
         await page.goto("https://baijiahao.baidu.com/builder/rc/edit?type=videoV2", timeout=60000)
         baijiahao_logger.info(f"正在上传-------{self.title}.mp4")
@@ -135,6 +143,7 @@ class BaiJiaHaoVideo(object):
         await page.wait_for_url("https://baijiahao.baidu.com/builder/rc/edit?type=videoV2", timeout=60000)
 
         # 点击 "上传视频" 按钮
+        self.progress.phase("upload")
         await page.locator("div[class^='video-main-container'] input").set_input_files(self.file_path)
 
         # 等待页面跳转到指定的 URL
@@ -157,6 +166,8 @@ class BaiJiaHaoVideo(object):
         if not upload_status:
             baijiahao_logger.error(f"发现上传出错了... 文件:{self.file_path}")
             raise
+        self.progress.percent(100)
+        self.progress.phase("fill")
 
         # 判断视频封面图是否生成成功
         while True:
@@ -168,6 +179,7 @@ class BaiJiaHaoVideo(object):
                 baijiahao_logger.info("等待封面生成...")
                 await asyncio.sleep(3)
 
+        self.progress.phase("publish")
         await self.publish_video(page, self.publish_date)
         await page.wait_for_timeout(2000)
         if await page.locator('div.passMod_dialog-container >> text=百度安全验证:visible').count():
@@ -252,7 +264,7 @@ class BaiJiaHaoVideo(object):
     # 使用 AI成片 功能
     async def ai2video(self, playwright: Playwright) -> None:
         # 使用 Chromium 浏览器启动一个浏览器实例
-        browser = await playwright.chromium.launch(headless=False, executable_path=self.local_executable_path, proxy=self.proxy_setting)
+        browser = await launch_browser(playwright, SOCIAL_MEDIA_BAIJIAHAO, self.local_executable_path, proxy=self.proxy_setting)
         # 创建一个浏览器上下文，使用指定的 cookie 文件
         context = await browser.new_context(
             viewport={"width": 1600, "height": 900},
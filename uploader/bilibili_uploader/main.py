@@ -1,9 +1,18 @@
+import asyncio
 import json
 import pathlib
 import random
+import time
+import uuid
+from datetime import datetime
+
 from biliup.plugins.bili_webup import BiliBili, Data
 
+from uploader.bilibili_uploader.upload_tuning import probe_line, get_upload_bandwidth
+from utils.base_social_media import SOCIAL_MEDIA_BILIBILI
+from utils.constant import VideoZoneTypes
 from utils.log import bilibili_logger
+from utils.upload_progress import UploadProgress
 
 
 def extract_keys_from_json(data):
@@ -41,9 +50,10 @@ def random_emoji():
 
 class BilibiliUploader(object):
     def __init__(self, cookie_data, file: pathlib.Path, title, desc, tid, tags, dtime):
-        self.upload_thread_num = 3
+        # 分片线程数和上传线路：None 时由共享带宽预算分配线程、按探测结果选择线路
+        self.upload_thread_num = None
         self.copyright = 1
-        self.lines = 'AUTO'
+        self.lines = None
         self.cookie_data = cookie_data
         self.file = file
         self.title = title
@@ -51,6 +61,8 @@ class BilibiliUploader(object):
         self.tid = tid
         self.tags = tags
         self.dtime = dtime
+        # 上传进度钩子：biliup 没有分片回调，只能上报阶段耗时和整体吞吐量
+        self.progress = UploadProgress(SOCIAL_MEDIA_BILIBILI)
         self._init_data()
 
     def _init_data(self):
@@ -64,12 +76,36 @@ class BilibiliUploader(object):
 
     def upload(self):
         with BiliBili(self.data) as bili:
+            self.progress.phase("login")
             bili.login_by_cookies(self.cookie_data)
             bili.access_token = self.cookie_data.get('access_token')
-            video_part = bili.upload_file(str(self.file), lines=self.lines,
-                                          tasks=self.upload_thread_num)  # 上传视频，默认线路AUTO自动选择，线程数量3。
+            bandwidth = get_upload_bandwidth()
+            lines = self.lines
+            if not lines:
+                probe = probe_line(self.cookie_data)
+                lines = probe["line"]
+                # 还没有完成过上传时，用探测吞吐作为单连接吞吐的初始估计
+                if bandwidth.per_connection is None:
+                    bandwidth.observe(probe["throughput"])
+            lease = uuid.uuid4().hex
+            tasks = self.upload_thread_num or bandwidth.lease(lease)
+            self.progress.phase("upload")
+            size = pathlib.Path(self.file).stat().st_size
+            self.progress.add_bytes(0, size)
+            bilibili_logger.info(f'[+] {pathlib.Path(self.file).name} 线路 {lines}，分片线程 {tasks}')
+            started = time.monotonic()
+            sent = 0
+            try:
+                video_part = bili.upload_file(str(self.file), lines=lines, tasks=tasks)
+                sent = size
+            finally:
+                if not self.upload_thread_num:
+                    bandwidth.release(lease, sent, time.monotonic() - started)
+            self.progress.add_bytes(size)
+            self.progress.percent(100)
             video_part['title'] = self.title
             self.data.append(video_part)
+            self.progress.phase("publish")
             ret = bili.submit()  # 提交视频
             if ret.get('code') == 0:
                 bilibili_logger.success(f'[+] {self.file.name}上传 成功')
@@ -77,3 +113,35 @@ class BilibiliUploader(object):
             else:
                 bilibili_logger.error(f'[-] {self.file.name}上传 失败, error messge: {ret.get("message")}')
                 return False
+
+
+class BilibiliVideo(object):
+    """发布引擎使用的 B 站上传器：读取账号 cookie 文件，在线程中执行 BilibiliUploader（不启动浏览器）"""
+
+    def __init__(self, title, file_path, tags, publish_date: datetime, account_file, tid=None):
+        self.title = title
+        self.file_path = file_path
+        self.tags = tags or []
+        self.publish_date = publish_date
+        self.account_file = account_file
+        self.tid = tid or VideoZoneTypes.LIFE_DAILY.value
+        # 上传进度钩子，发布引擎会替换为带上报目标的实例
+        self.progress = UploadProgress(SOCIAL_MEDIA_BILIBILI)
+
+    async def main(self):
+        cookie_data = extract_keys_from_json(read_cookie_json_file(self.account_file))
+        dtime = int(self.publish_date.timestamp()) if self.publish_date != 0 else 0
+        uploader = BilibiliUploader(cookie_data, pathlib.Path(self.file_path), self.title, self.title, self.tid,
+                                    self.tags, dtime)
+        uploader.progress = self.progress
+        # 上传在线程中执行，进度事件转回事件循环线程交给上报目标
+        sink = self.progress.sink
+        if sink is not None:
+            loop = asyncio.get_running_loop()
+            self.progress.sink = lambda event: loop.call_soon_threadsafe(sink, event)
+        try:
+            success = await asyncio.to_thread(uploader.upload)
+        finally:
+            self.progress.sink = sink
+        if not success:
+            raise Exception("B站投稿提交失败")
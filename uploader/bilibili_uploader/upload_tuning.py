@@ -0,0 +1,164 @@
+# uploader/bilibili_uploader/upload_tuning.py
+"""
+B 站上传调优 - 线路探测 + 分片并发数随带宽调整 + 并发任务共享带宽预算
+- probe_line：向 preupload?r=probe 返回的各上传线路发送一段探测数据，选择吞吐最高的线路（结果缓存 LINE_PROBE_TTL 秒，
+  所有账号、所有任务共用）；探测失败时使用 biliup 的 AUTO
+- UploadBandwidth：同一进程内所有 B 站上传共享一个连接预算。总连接数 = 带宽预算 / 单连接吞吐，
+  每个任务开始时租用 min(总连接数 / 并发上传数, 剩余连接数) 个分片线程（没有剩余时等待），
+  结束时归还，并用实际吞吐更新单连接吞吐估计
+带宽预算由 conf.py 的 BILIBILI_UPLOAD_BANDWIDTH（字节/秒）指定；不指定时总连接数为 MAX_TOTAL_THREADS
+biliup 的线程数在一次 upload_file 中固定，新的份额只对之后开始的任务生效
+"""
+import math
+import threading
+import time
+from urllib.parse import parse_qs
+
+import requests
+
+import conf
+
+# preupload 探测接口
+PROBE_URL = "https://member.bilibili.com/preupload?r=probe"
+# biliup upload_file(lines=...) 支持的线路名（与探测结果 query 中的 upcdn 对应）
+SUPPORTED_LINES = ["bda2", "ws", "qn", "bldsa", "tx", "txa"]
+# 每条线路发送的探测数据大小（字节）
+PROBE_BYTES = 1024 * 1024
+# 探测结果缓存时间（秒）
+LINE_PROBE_TTL = 1800
+PROBE_TIMEOUT = 15
+
+BILIBILI_UPLOAD_BANDWIDTH = getattr(conf, "BILIBILI_UPLOAD_BANDWIDTH", None)
+# 同时进行的 B 站上传数（发布引擎中 B 站的平台并发上限），每个上传的份额 = 总连接数 / 该值
+CONCURRENT_UPLOADS = 3
+# 单个任务的分片线程数上限 / 所有任务合计的上限
+MAX_THREADS_PER_UPLOAD = 8
+MAX_TOTAL_THREADS = getattr(conf, "BILIBILI_MAX_UPLOAD_THREADS", 12)
+# 单连接吞吐的指数平均系数（新样本权重）
+THROUGHPUT_SMOOTHING = 0.3
+
+_probe_lock = threading.Lock()
+_probe_result = None
+
+
+def _probe_lines(cookies: dict) -> dict:
+    session = requests.Session()
+    session.cookies.update(cookies or {})
+    ret = session.get(PROBE_URL, timeout=PROBE_TIMEOUT).json()
+    use_get = bool(ret.get("probe", {}).get("get"))
+    payload = None if use_get else bytes(PROBE_BYTES)
+    best = None
+    for line in ret.get("lines", []):
+        name = parse_qs(line.get("query", "")).get("upcdn", [None])[0]
+        if name not in SUPPORTED_LINES:
+            continue
+        started = time.perf_counter()
+        try:
+            response = session.request("GET" if use_get else "POST", f"https:{line['probe_url']}", data=payload,
+                                       timeout=PROBE_TIMEOUT)
+        except requests.RequestException:
+            continue
+        cost = time.perf_counter() - started
+        if response.status_code != 200:
+            continue
+        # GET 探测只有延迟，没有吞吐
+        throughput = PROBE_BYTES / max(cost, 0.001) if payload else None
+        print(f"📡 B站线路 {name}: {cost * 1000:.0f}ms")
+        if best is None or cost < best["cost"]:
+            best = {"line": name, "cost": cost, "throughput": throughput}
+    if best is None:
+        raise RuntimeError("没有可用的上传线路")
+    return best
+
+
+def probe_line(cookies: dict = None) -> dict:
+    """
+    选择上传线路：返回 {"line", "cost", "throughput", "probed_at"}；探测失败时 line 为 AUTO（交给 biliup 自己探测）
+    并发调用时只探测一次，其余调用等待并复用结果
+    """
+    global _probe_result
+    with _probe_lock:
+        if _probe_result is not None and time.monotonic() - _probe_result["probed_at"] < LINE_PROBE_TTL:
+            return _probe_result
+        try:
+            result = _probe_lines(cookies)
+            print(f"📡 B站上传线路: {result['line']}")
+        except Exception as e:
+            print(f"⚠️ B站线路探测失败，使用 AUTO: {e}")
+            result = {"line": "AUTO", "cost": None, "throughput": None}
+        result["probed_at"] = time.monotonic()
+        _probe_result = result
+        return result
+
+
+class UploadBandwidth:
+    """进程内 B 站上传共享的带宽 / 连接预算"""
+
+    def __init__(self, budget: float = BILIBILI_UPLOAD_BANDWIDTH, max_total: int = MAX_TOTAL_THREADS,
+                 max_per_upload: int = MAX_THREADS_PER_UPLOAD, slots: int = CONCURRENT_UPLOADS):
+        self.budget = budget
+        self.slots = slots
+        self.max_total = max_total
+        self.max_per_upload = max_per_upload
+        # 单连接吞吐估计（字节/秒），来自线路探测和已完成的上传
+        self.per_connection = None
+        self._leases = {}
+        self._changed = threading.Condition()
+
+    def total_connections(self) -> int:
+        if not self.budget or not self.per_connection:
+            return self.max_total
+        return max(1, min(self.max_total, math.ceil(self.budget / self.per_connection)))
+
+    def observe(self, throughput: float):
+        """更新单连接吞吐估计"""
+        if not throughput:
+            return
+        with self._changed:
+            if self.per_connection is None:
+                self.per_connection = throughput
+            else:
+                self.per_connection += THROUGHPUT_SMOOTHING * (throughput - self.per_connection)
+
+    def lease(self, key) -> int:
+        """为一次上传租用分片线程数：不超过份额和剩余连接，没有剩余连接时等待"""
+        with self._changed:
+            while True:
+                total = self.total_connections()
+                free = total - sum(self._leases.values())
+                if free >= 1:
+                    share = math.ceil(total / self.slots)
+                    threads = min(free, share, self.max_per_upload)
+                    self._leases[key] = threads
+                    return threads
+                self._changed.wait()
+
+    def release(self, key, sent_bytes: int = 0, elapsed: float = 0):
+        """归还线程；上传成功时用 实际吞吐 / 线程数 更新单连接吞吐"""
+        with self._changed:
+            threads = self._leases.pop(key, 0)
+            self._changed.notify_all()
+        if threads and sent_bytes and elapsed > 0:
+            self.observe(sent_bytes / elapsed / threads)
+
+    def stats(self) -> dict:
+        with self._changed:
+            return {
+                "budget": self.budget,
+                "per_connection": round(self.per_connection) if self.per_connection else None,
+                "total_connections": self.total_connections(),
+                "active_uploads": len(self._leases),
+                "leased_threads": sum(self._leases.values()),
+            }
+
+
+_bandwidth = None
+_bandwidth_lock = threading.Lock()
+
+
+def get_upload_bandwidth() -> UploadBandwidth:
+    global _bandwidth
+    with _bandwidth_lock:
+        if _bandwidth is None:
+            _bandwidth = UploadBandwidth()
+        return _bandwidth
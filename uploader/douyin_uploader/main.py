@@ -1,13 +1,18 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
 
-from playwright.async_api import Playwright, async_playwright, Page
+from playwright.async_api import async_playwright, Page
 import os
 import asyncio
 
 from conf import LOCAL_CHROME_PATH
-from utils.base_social_media import set_init_script
+from utils.account_sessions import account_page
+from utils.base_social_media import set_init_script, SOCIAL_MEDIA_DOUYIN
+from utils.cover_cache import resolve_cover
 from utils.log import douyin_logger
+from utils.upload_progress import UploadProgress, watch_page
+from utils.page_waits import wait_first, click_until, click_if_present, on_url, on_selector, Deadline, \
+    PAGE_READY_TIMEOUT, VIDEO_UPLOAD_TIMEOUT
 
 
 async def cookie_auth(account_file):
@@ -73,6 +78,8 @@ class DouYinVideo(object):
         self.date_format = '%Y年%m月%d日 %H:%M'
         self.local_executable_path = LOCAL_CHROME_PATH
         self.thumbnail_path = thumbnail_path
+        # 上传进度钩子，发布引擎会替换为带上报目标的实例
+        self.progress = UploadProgress(SOCIAL_MEDIA_DOUYIN)
 
     async def set_schedule_time_douyin(self, page, publish_date):
         # 选择包含特定文本内容的 label 元素
@@ -92,20 +99,13 @@ class DouYinVideo(object):
 
     async def handle_upload_error(self, page):
         douyin_logger.info('视频出错了，重新上传中')
+        self.progress.retry("视频上传失败")
         await page.locator('div.progress-div [class^="upload-btn-input"]').set_input_files(self.file_path)
 
-    async def upload(self, playwright: Playwright) -> None:
-        # 使用 Chromium 浏览器启动一个浏览器实例
-        if self.local_executable_path:
-            browser = await playwright.chromium.launch(headless=False, executable_path=self.local_executable_path)
-        else:
-            browser = await playwright.chromium.launch(headless=False)
-        # 创建一个浏览器上下文，使用指定的 cookie 文件
-        context = await browser.new_context(storage_state=f"{self.account_file}")
-        context = await set_init_script(context)
-
-        # 创建一个新的页面
-        page = await context.new_page()
+    async def upload(self, page: Page) -> None:
+        # 未指定封面时从缓存取封面，与上传视频并行生成
+        cover_task = asyncio.create_task(resolve_cover(self.file_path, SOCIAL_MEDIA_DOUYIN, self.thumbnail_path))
+        await watch_page(page, self.progress)
         # 访问指定的 URL
         await page.goto("https://creator.douyin.com/creator-micro/content/publish?enter_from=publish_page")
         douyin_logger.info(f'[+]正在上传-------{self.title}.mp4')
@@ -113,35 +113,21 @@ class DouYinVideo(object):
         douyin_logger.info(f'[-] 正在打开主页...')
         await page.wait_for_url("https://creator.douyin.com/creator-micro/content/publish?enter_from=publish_page")
         # 点击 "上传视频" 按钮
+        self.progress.phase("upload")
         try:
             await page.locator('input[type="file"][accept*="video"]').first.set_input_files(self.file_path)
         except:
             # 备选：通用文件输入框的第一个
             await page.locator('input[type="file"]').first.set_input_files(self.file_path)
         # 等待页面跳转到指定的 URL 2025.01.08修改在原有基础上兼容两种页面
-        while True:
-            try:
-                # 尝试等待第一个 URL
-                await page.wait_for_url(
-                    "https://creator.douyin.com/creator-micro/content/publish?enter_from=publish_page", timeout=3000)
-                douyin_logger.info("[+] 成功进入version_1发布页面!")
-                break  # 成功进入页面后跳出循环
-            except Exception:
-                try:
-                    # 如果第一个 URL 超时，再尝试等待第二个 URL
-                    await page.wait_for_url(
-                        "https://creator.douyin.com/creator-micro/content/post/video?enter_from=publish_page",
-                        timeout=3000)
-                    douyin_logger.info("[+] 成功进入version_2发布页面!")
-
-                    break  # 成功进入页面后跳出循环
-                except:
-                    print("  [-] 超时未进入视频发布页面，重新尝试...")
-                    await asyncio.sleep(0.5)  # 等待 0.5 秒后重新尝试
+        version = await wait_first({
+            "version_1": on_url(page, "https://creator.douyin.com/creator-micro/content/publish?enter_from=publish_page"),
+            "version_2": on_url(page, "https://creator.douyin.com/creator-micro/content/post/video?enter_from=publish_page"),
+        }, PAGE_READY_TIMEOUT)
+        douyin_logger.info(f"[+] 成功进入{version}发布页面!")
         # 填充标题和话题
         # 检查是否存在包含输入框的元素
         # 这里为了避免页面变化，故使用相对位置定位：作品标题父级右侧第一个元素的input子元素
-        await asyncio.sleep(1)
         douyin_logger.info(f'  [-] 正在填充标题和话题...')
         #title_container = page.get_by_text('作品标题').locator("..").locator("xpath=following-sibling::div[1]").locator("input")
         await page.wait_for_selector('input[placeholder="填写作品标题，为作品获得更多流量"]', 
@@ -177,27 +163,28 @@ class DouYinVideo(object):
             await page.press(css_selector, "Space")
         douyin_logger.info(f'总共添加{len(self.tags)}个话题')
 
+        # 出现"重新上传"代表视频上传完毕，出现"上传失败"则重新上传
+        failed_selector = 'div.progress-div > div:has-text("上传失败")'
+        deadline = Deadline(VIDEO_UPLOAD_TIMEOUT)
         while True:
-            # 判断重新上传按钮是否存在，如果不存在，代表视频正在上传，则等待
-            try:
-                #  新版：定位重新上传
-                number = await page.locator('[class^="long-card"] div:has-text("重新上传")').count()
-                if number > 0:
-                    douyin_logger.success("  [-]视频上传完毕")
-                    break
-                else:
-                    douyin_logger.info("  [-] 正在上传视频中...")
-                    await asyncio.sleep(2)
-
-                    if await page.locator('div.progress-div > div:has-text("上传失败")').count():
-                        douyin_logger.error("  [-] 发现上传出错了... 准备重试")
-                        await self.handle_upload_error(page)
-            except:
-                douyin_logger.info("  [-] 正在上传视频中...")
-                await asyncio.sleep(2)
+            state = await wait_first({
+                "done": on_selector(page, '[class^="long-card"] div:has-text("重新上传")', state="attached"),
+                "failed": on_selector(page, failed_selector, state="attached"),
+            }, deadline.remaining(), progress=lambda elapsed: douyin_logger.info("  [-] 正在上传视频中..."))
+            if state == "done":
+                douyin_logger.success("  [-]视频上传完毕")
+                self.progress.percent(100)
+                break
+            douyin_logger.error("  [-] 发现上传出错了... 准备重试")
+            await self.handle_upload_error(page)
+            await page.locator(failed_selector).first.wait_for(state="detached", timeout=max(deadline.remaining(), 1) * 1000)
         
-        #上传视频封面
-        await self.set_thumbnail(page, self.thumbnail_path)
+        #上传视频封面，设置失败时保留平台默认封面
+        self.progress.phase("fill")
+        try:
+            await self.set_thumbnail(page, await cover_task)
+        except Exception as e:
+            douyin_logger.warning(f"  [-] 设置封面失败，使用默认封面: {e}")
 
         # 更换可见元素
         await self.set_location(page, "杭州市")
@@ -213,28 +200,14 @@ class DouYinVideo(object):
         if self.publish_date != 0:
             await self.set_schedule_time_douyin(page, self.publish_date)
 
-        # 判断视频是否发布成功
-        while True:
-            # 判断视频是否发布成功
-            try:
-                publish_button = page.get_by_role('button', name="发布", exact=True)
-                if await publish_button.count():
-                    await publish_button.click()
-                await page.wait_for_url("https://creator.douyin.com/creator-micro/content/manage**",
-                                        timeout=3000)  # 如果自动跳转到作品页面，则代表发布成功
-                douyin_logger.success("  [-]视频发布成功")
-                break
-            except:
-                douyin_logger.info("  [-] 视频正在发布中...")
-                await page.screenshot(full_page=True)
-                await asyncio.sleep(0.5)
-
-        await context.storage_state(path=self.account_file)  # 保存cookie
-        douyin_logger.success('  [-]cookie更新完毕！')
-        await asyncio.sleep(2)  # 这里延迟是为了方便眼睛直观的观看
-        # 关闭浏览器上下文和浏览器实例
-        await context.close()
-        await browser.close()
+        # 判断视频是否发布成功：自动跳转到作品页面即发布成功，未跳转时重新点击发布
+        self.progress.phase("publish")
+        await click_until(
+            lambda: click_if_present(page.get_by_role('button', name="发布", exact=True)),
+            {"published": on_url(page, "https://creator.douyin.com/creator-micro/content/manage**")},
+            on_retry=lambda: self.progress.retry("重新点击发布"),
+        )
+        douyin_logger.success("  [-]视频发布成功")
     
     async def set_thumbnail(self, page: Page, thumbnail_path: str):
         if thumbnail_path:
@@ -263,7 +236,9 @@ class DouYinVideo(object):
         await page.locator('div[role="listbox"] [role="option"]').first.click()
 
     async def main(self):
-        async with async_playwright() as playwright:
-            await self.upload(playwright)
+        self.progress.phase("launch")
+        # 发布引擎内同一账号的连续上传复用常驻浏览器上下文，cookie 由会话定期保存
+        async with account_page(self.account_file, SOCIAL_MEDIA_DOUYIN, self.local_executable_path) as page:
+            await self.upload(page)
 
 
@@ -1,14 +1,18 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
 
-from playwright.async_api import Playwright, async_playwright
+from playwright.async_api import async_playwright, Page
 import os
 import asyncio
 
 from conf import LOCAL_CHROME_PATH
-from utils.base_social_media import set_init_script
+from utils.account_sessions import account_page
+from utils.base_social_media import set_init_script, SOCIAL_MEDIA_KUAISHOU
 from utils.files_times import get_absolute_path
 from utils.log import kuaishou_logger
+from utils.upload_progress import UploadProgress, watch_page
+from utils.page_waits import wait_first, click_until, click_if_present, on_url, on_selector, PageWaitTimeout, \
+    VIDEO_UPLOAD_TIMEOUT, PUBLISH_RETRY_INTERVAL
 
 
 async def cookie_auth(account_file):
@@ -70,27 +74,16 @@ class KSVideo(object):
         self.account_file = account_file
         self.date_format = '%Y-%m-%d %H:%M'
         self.local_executable_path = LOCAL_CHROME_PATH
+        # 上传进度钩子，发布引擎会替换为带上报目标的实例
+        self.progress = UploadProgress(SOCIAL_MEDIA_KUAISHOU)
 
     async def handle_upload_error(self, page):
         kuaishou_logger.error("视频出错了，重新上传中")
+        self.progress.retry("视频上传失败")
         await page.locator('div.progress-div [class^="upload-btn-input"]').set_input_files(self.file_path)
 
-    async def upload(self, playwright: Playwright) -> None:
-        # 使用 Chromium 浏览器启动一个浏览器实例
-        print(self.local_executable_path)
-        if self.local_executable_path:
-            browser = await playwright.chromium.launch(
-                headless=False,
-                executable_path=self.local_executable_path,
-            )
-        else:
-            browser = await playwright.chromium.launch(
-                headless=False
-            )  # 创建一个浏览器上下文，使用指定的 cookie 文件
-        context = await browser.new_context(storage_state=f"{self.account_file}")
-        context = await set_init_script(context)
-        # 创建一个新的页面
-        page = await context.new_page()
+    async def upload(self, page: Page) -> None:
+        await watch_page(page, self.progress)
         # 访问指定的 URL
         await page.goto("https://cp.kuaishou.com/article/publish/video")
         kuaishou_logger.info('正在上传-------{}.mp4'.format(self.title))
@@ -101,6 +94,7 @@ class KSVideo(object):
         upload_button = page.locator("button[class^='_upload-btn']")
         await upload_button.wait_for(state='visible')  # 确保按钮可见
 
+        self.progress.phase("upload")
         async with page.expect_file_chooser() as fc_info:
             await upload_button.click()
         file_chooser = await fc_info.value
@@ -134,67 +128,40 @@ class KSVideo(object):
             await page.keyboard.type(f"#{tag} ")
             await asyncio.sleep(2)
 
-        max_retries = 60  # 设置最大重试次数,最大等待时间为 2 分钟
-        retry_count = 0
-
-        while retry_count < max_retries:
-            try:
-                # 获取包含 '上传中' 文本的元素数量
-                number = await page.locator("text=上传中").count()
-
-                if number == 0:
-                    kuaishou_logger.success("视频上传完毕")
-                    break
-                else:
-                    if retry_count % 5 == 0:
-                        kuaishou_logger.info("正在上传视频中...")
-                    await asyncio.sleep(2)
-            except Exception as e:
-                kuaishou_logger.error(f"检查上传状态时发生错误: {e}")
-                await asyncio.sleep(2)  # 等待 2 秒后重试
-            retry_count += 1
-
-        if retry_count == max_retries:
-            kuaishou_logger.warning("超过最大重试次数，视频上传可能未完成。")
+        # 等待"上传中"标识消失
+        try:
+            await wait_first({"uploaded": on_selector(page, "text=上传中", state="detached")},
+                             VIDEO_UPLOAD_TIMEOUT, progress=lambda elapsed: kuaishou_logger.info("正在上传视频中..."))
+            kuaishou_logger.success("视频上传完毕")
+            self.progress.percent(100)
+        except PageWaitTimeout:
+            kuaishou_logger.warning("等待上传超时，视频上传可能未完成。")
 
         # 定时任务
+        self.progress.phase("fill")
         if self.publish_date != 0:
             await self.set_schedule_time(page, self.publish_date)
 
-        # 判断视频是否发布成功
-        while True:
-            try:
-                publish_button = page.get_by_text("发布", exact=True)
-                if await publish_button.count() > 0:
-                    await publish_button.click()
-
-                await asyncio.sleep(1)
-                confirm_button = page.get_by_text("确认发布")
-                if await confirm_button.count() > 0:
-                    await confirm_button.click()
-
-                # 等待页面跳转，确认发布成功
-                await page.wait_for_url(
-                    "https://cp.kuaishou.com/article/manage/video?status=2&from=publish",
-                    timeout=5000,
-                )
-                kuaishou_logger.success("视频发布成功")
-                break
-            except Exception as e:
-                kuaishou_logger.info(f"视频正在发布中... 错误: {e}")
-                await page.screenshot(full_page=True)
-                await asyncio.sleep(1)
-
-        await context.storage_state(path=self.account_file)  # 保存cookie
-        kuaishou_logger.info('cookie更新完毕！')
-        await asyncio.sleep(2)  # 这里延迟是为了方便眼睛直观的观看
-        # 关闭浏览器上下文和浏览器实例
-        await context.close()
-        await browser.close()
+        # 判断视频是否发布成功：点击发布并确认，跳转到作品管理页面即成功
+        async def click_publish():
+            await click_if_present(page.get_by_text("发布", exact=True))
+            confirm_button = page.get_by_text("确认发布")
+            await confirm_button.first.wait_for(state="visible", timeout=PUBLISH_RETRY_INTERVAL * 1000)
+            await confirm_button.first.click()
+
+        self.progress.phase("publish")
+        await click_until(
+            click_publish,
+            {"published": on_url(page, "https://cp.kuaishou.com/article/manage/video?status=2&from=publish")},
+            on_retry=lambda: self.progress.retry("重新点击发布"),
+        )
+        kuaishou_logger.success("视频发布成功")
 
     async def main(self):
-        async with async_playwright() as playwright:
-            await self.upload(playwright)
+        self.progress.phase("launch")
+        # 发布引擎内同一账号的连续上传复用常驻浏览器上下文，cookie 由会话定期保存
+        async with account_page(self.account_file, SOCIAL_MEDIA_KUAISHOU, self.local_executable_path) as page:
+            await self.upload(page)
 
     async def set_schedule_time(self, page, publish_date):
         kuaishou_logger.info("click schedule")
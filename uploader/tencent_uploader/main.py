@@ -4,10 +4,16 @@ import asyncio
 from datetime import datetime
 from pathlib import Path
 
+from utils.base_social_media import SOCIAL_MEDIA_TENCENT
 from utils.browser_adapter import MultiAccountBrowserAdapter
 from utils.common import get_account_info_from_db
+from utils.file_handoff import register_file
+from utils.upload_progress import UploadProgress
 from conf import BASE_DIR
 
+# 浏览器端完整上传流程（上传 + 填写 + 发布）的最长等待时间（秒）
+UPLOAD_TIMEOUT = 1800
+
 
 class TencentVideo:
     def __init__(self, title, file_path, tags, publish_date, account_file, category=None):
@@ -17,14 +23,26 @@ class TencentVideo:
         self.publish_date = publish_date
         self.account_file = account_file
         self.category = category
+        # 上传进度钩子：页面在 multi-account-browser 中，只能上报阶段耗时
+        self.progress = UploadProgress(SOCIAL_MEDIA_TENCENT)
 
     async def main(self):
         """简化的主流程 - 大部分逻辑代理给浏览器"""
         # 🔥 检查 cookie 有效性，如果失效则提示用户重新登录
+        self.progress.phase("check_cookie")
         if not await self._check_cookie_validity():
             raise Exception("Cookie 失效，请重新添加账号")
         
         adapter = MultiAccountBrowserAdapter()
+        self.progress.phase("launch")
+        tab_id = await self._get_or_create_tab(adapter)
+        self.progress.phase("upload")
+        if not await self._upload_via_automation_engine(adapter, tab_id):
+            raise Exception(f"视频号上传失败: {Path(self.file_path).name}")
+
+    async def _check_cookie_validity(self) -> bool:
+        from myUtils.auth import check_cookie
+        return await check_cookie(2, Path(self.account_file).name)
 
     async def _get_or_create_tab(self, adapter) -> str:
         """获取或创建标签页 - 使用通用方法"""
@@ -38,17 +56,19 @@ class TencentVideo:
     async def _upload_via_automation_engine(self, adapter, tab_id: str) -> bool:
         """调用浏览器端自动化引擎"""
         try:
+            handle = await asyncio.to_thread(register_file, self.file_path)
             result = await adapter._make_request('POST', '/automation/upload-video-complete', {
                 "tabId": tab_id,
                 "platform": "wechat",
-                "filePath": str(self.file_path),
+                "filePath": handle["path"],
+                "fileHandle": handle,
                 "title": self.title,
                 "tags": self.tags,
                 "publishDate": self.publish_date.isoformat() if self.publish_date else None,
                 "enableOriginal": True,
                 "addToCollection": True,
                 "category": self.category
-            })
+            }, timeout=UPLOAD_TIMEOUT, retries=0)
             return result.get("success", False)
         except Exception as e:
             print(f"❌ 自动化引擎调用失败: {e}")
@@ -7,9 +7,13 @@ import os
 import asyncio
 
 from conf import LOCAL_CHROME_PATH
-from utils.base_social_media import set_init_script
+from utils.base_social_media import set_init_script, SOCIAL_MEDIA_TENCENT
+from utils.file_handoff import resolve_video_path
 from utils.files_times import get_absolute_path
 from utils.log import tencent_logger
+from utils.route_policy import apply_route_policy
+from utils.launch_profile import launch_browser
+from utils.page_waits import wait_first, on_locator, on_selector, PAGE_READY_TIMEOUT
 
 
 def format_str_for_short_title(origin_title: str) -> str:
@@ -139,21 +143,10 @@ class TencentVideo(object):
         await page.wait_for_selector('wujie-app', timeout=30000)
         await asyncio.sleep(0.1)
         
-        # 处理文件路径
-        actual_file_path = self.file_path
-        if not os.path.exists(self.file_path):
-            import glob
-            original_filename = os.path.basename(self.file_path)
-            video_dir = os.path.dirname(self.file_path)
-            pattern = os.path.join(video_dir, f"*_{original_filename}")
-            matching_files = glob.glob(pattern)
-            
-            if matching_files:
-                matching_files.sort(key=os.path.getmtime, reverse=True)
-                actual_file_path = matching_files[0]
-                tencent_logger.info(f"找到实际文件: {original_filename} -> {os.path.basename(actual_file_path)}")
-            else:
-                raise FileNotFoundError(f"找不到文件: {self.file_path}")
+        # 处理文件路径（按素材库记录确定，不扫描目录）
+        actual_file_path = str(resolve_video_path(self.file_path))
+        if actual_file_path != str(self.file_path):
+            tencent_logger.info(f"找到实际文件: {os.path.basename(self.file_path)} -> {os.path.basename(actual_file_path)}")
         
         tencent_logger.info(f"准备上传文件: {actual_file_path}")
         
@@ -338,10 +331,11 @@ class TencentVideo(object):
         
         file_size_mb = os.path.getsize(self.file_path) / (1024 * 1024)
         tencent_logger.info(f"视频文件大小: {file_size_mb:.2f}MB")
-        browser = await playwright.chromium.launch(headless=False, executable_path=self.local_executable_path)
+        browser = await launch_browser(playwright, SOCIAL_MEDIA_TENCENT, self.local_executable_path)
         try:
             context = await browser.new_context(storage_state=f"{self.account_file}")
             context = await set_init_script(context)
+            context = await apply_route_policy(context, SOCIAL_MEDIA_TENCENT)
             page = await context.new_page()
             
             # 网络监控
@@ -366,7 +360,7 @@ class TencentVideo(object):
             
             # 步骤3: 等待视频处理完成
             tencent_logger.info("等待视频处理完成...")
-            await asyncio.sleep(10)  # 给视频处理一些时间
+            await wait_first({"editor": on_selector(page, "div.input-editor")}, PAGE_READY_TIMEOUT)
             
             # 步骤4: 添加标题和标签
             await self.add_title_tags(page)
@@ -414,33 +408,13 @@ class TencentVideo(object):
                 pass
 
     async def detect_upload_status_no_timeout(self, page):
-        """无超时版本 - 持续等待直到上传完成"""
-        start_time = asyncio.get_event_loop().time()
-        
+        """无超时版本 - 持续等待直到上传完成（"发表"按钮不再是禁用状态）"""
         tencent_logger.info("开始检测上传状态（无超时限制）")
-        
-        while True:
-            try:
-                elapsed = asyncio.get_event_loop().time() - start_time
-                
-                # 检查发布按钮状态
-                button = page.get_by_role("button", name="发表")
-                button_class = await button.get_attribute('class')
-                
-                if "weui-desktop-btn_disabled" not in button_class:
-                    tencent_logger.success("✅ 上传完成!")
-                    break
-                
-                # 每5分钟报告一次进度
-                if int(elapsed) % 300 == 0 and elapsed > 0:
-                    tencent_logger.info(f"⏳ 上传中... ({elapsed/60:.1f}分钟)")
-                
-                await asyncio.sleep(15)  # 每15秒检查一次
-                
-            except Exception as e:
-                tencent_logger.warning(f"状态检测异常: {e}")
-                await asyncio.sleep(15)
-        
+        publish_button = page.get_by_role("button", name="发表").and_(
+            page.locator("button:not(.weui-desktop-btn_disabled)"))
+        await wait_first({"uploaded": on_locator(publish_button)},
+                         progress=lambda elapsed: tencent_logger.info(f"⏳ 上传中... ({elapsed / 60:.1f}分钟)"))
+        tencent_logger.success("✅ 上传完成!")
         tencent_logger.info("上传检测完成")
 
     async def add_title_tags(self, page):
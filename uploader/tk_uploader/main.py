@@ -6,9 +6,14 @@ from playwright.async_api import Playwright, async_playwright
 import os
 import asyncio
 from uploader.tk_uploader.tk_config import Tk_Locator
-from utils.base_social_media import set_init_script
+from utils.base_social_media import set_init_script, SOCIAL_MEDIA_TIKTOK
 from utils.files_times import get_absolute_path
 from utils.log import tiktok_logger
+from utils.upload_progress import UploadProgress, watch_page
+from utils.route_policy import apply_route_policy
+from utils.launch_profile import launch_browser
+from utils.page_waits import wait_first, click_until, click_if_present, on_selector, Deadline, \
+    VIDEO_UPLOAD_TIMEOUT
 
 
 async def cookie_auth(account_file):
@@ -76,6 +81,8 @@ class TiktokVideo(object):
         self.publish_date = publish_date
         self.account_file = account_file
         self.locator_base = None
+        # 上传进度钩子，发布引擎会替换为带上报目标的实例
+        self.progress = UploadProgress(SOCIAL_MEDIA_TIKTOK)
 
 
     async def set_schedule_time(self, page, publish_date):
@@ -133,6 +140,7 @@ class TiktokVideo(object):
 
     async def handle_upload_error(self, page):
         tiktok_logger.info("video upload error retrying.")
+        self.progress.retry("视频上传失败")
         select_file_button = self.locator_base.locator('button[aria-label="Select file"]')
         async with page.expect_file_chooser() as fc_info:
             await select_file_button.click()
@@ -140,10 +148,13 @@ class TiktokVideo(object):
         await file_chooser.set_files(self.file_path)
 
     async def upload(self, playwright: Playwright) -> None:
-        browser = await playwright.firefox.launch(headless=False)
+        self.progress.phase("launch")
+        browser = await launch_browser(playwright, SOCIAL_MEDIA_TIKTOK, browser_type="firefox")
         context = await browser.new_context(storage_state=f"{self.account_file}")
         context = await set_init_script(context)
+        context = await apply_route_policy(context, SOCIAL_MEDIA_TIKTOK)
         page = await context.new_page()
+        await watch_page(page, self.progress)
 
         await page.goto("https://www.tiktok.com/creator-center/upload")
         tiktok_logger.info(f'[+]Uploading-------{self.title}.mp4')
@@ -162,6 +173,7 @@ class TiktokVideo(object):
             'button:has-text("Select video"):visible')
         await upload_button.wait_for(state='visible')  # 确保按钮可见
 
+        self.progress.phase("upload")
         async with page.expect_file_chooser() as fc_info:
             await upload_button.click()
         file_chooser = await fc_info.value
@@ -170,9 +182,11 @@ class TiktokVideo(object):
         await self.add_title_tags(page)
         # detact upload status
         await self.detect_upload_status(page)
+        self.progress.phase("fill")
         if self.publish_date != 0:
             await self.set_schedule_time(page, self.publish_date)
 
+        self.progress.phase("publish")
         await self.click_publish(page)
 
         await context.storage_state(path=f"{self.account_file}")  # save cookie
@@ -217,40 +231,30 @@ class TiktokVideo(object):
 
     async def click_publish(self, page):
         success_flag_div = '#\\:r9\\:'
-        while True:
-            try:
-                publish_button = self.locator_base.locator('div.btn-post')
-                if await publish_button.count():
-                    await publish_button.click()
-
-                await self.locator_base.locator(success_flag_div).wait_for(state="visible", timeout=3000)
-                tiktok_logger.success("  [-] video published success")
-                break
-            except Exception as e:
-                if await self.locator_base.locator(success_flag_div).count():
-                    tiktok_logger.success("  [-]video published success")
-                    break
-                else:
-                    tiktok_logger.exception(f"  [-] Exception: {e}")
-                    tiktok_logger.info("  [-] video publishing")
-                    await page.screenshot(full_page=True)
-                    await asyncio.sleep(0.5)
+        await click_until(
+            lambda: click_if_present(self.locator_base.locator('div.btn-post')),
+            {"published": on_selector(self.locator_base, success_flag_div)},
+            on_retry=lambda: self.progress.retry("重新点击发布"),
+        )
+        tiktok_logger.success("  [-] video published success")
 
     async def detect_upload_status(self, page):
+        # Post 按钮可点击代表上传完成；出现 Select file 按钮代表上传出错，重新选择文件
+        error_selector = 'button[aria-label="Select file"]'
+        deadline = Deadline(VIDEO_UPLOAD_TIMEOUT)
         while True:
-            try:
-                if await self.locator_base.locator('div.btn-post > button').get_attribute("disabled") is None:
-                    tiktok_logger.info("  [-]video uploaded.")
-                    break
-                else:
-                    tiktok_logger.info("  [-] video uploading...")
-                    await asyncio.sleep(2)
-                    if await self.locator_base.locator('button[aria-label="Select file"]').count():
-                        tiktok_logger.info("  [-] found some error while uploading now retry...")
-                        await self.handle_upload_error(page)
-            except:
-                tiktok_logger.info("  [-] video uploading...")
-                await asyncio.sleep(2)
+            state = await wait_first({
+                "uploaded": on_selector(self.locator_base, 'div.btn-post > button:not([disabled])'),
+                "failed": on_selector(self.locator_base, error_selector),
+            }, deadline.remaining(), progress=lambda elapsed: tiktok_logger.info("  [-] video uploading..."))
+            if state == "uploaded":
+                tiktok_logger.info("  [-]video uploaded.")
+                self.progress.percent(100)
+                break
+            tiktok_logger.info("  [-] found some error while uploading now retry...")
+            await self.handle_upload_error(page)
+            await self.locator_base.locator(error_selector).first.wait_for(
+                state="hidden", timeout=max(deadline.remaining(), 1) * 1000)
 
     async def choose_base_locator(self, page):
         # await page.wait_for_selector('div.upload-container')
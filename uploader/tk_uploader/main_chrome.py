@@ -2,15 +2,20 @@
 import re
 from datetime import datetime
 
-from playwright.async_api import Playwright, async_playwright
+from playwright.async_api import async_playwright
 import os
 import asyncio
 
 from conf import LOCAL_CHROME_PATH
 from uploader.tk_uploader.tk_config import Tk_Locator
-from utils.base_social_media import set_init_script
+from utils.account_sessions import account_page
+from utils.base_social_media import set_init_script, SOCIAL_MEDIA_TIKTOK
+from utils.cover_cache import resolve_cover
 from utils.files_times import get_absolute_path
 from utils.log import tiktok_logger
+from utils.upload_progress import UploadProgress, watch_page
+from utils.page_waits import wait_first, click_until, click_if_present, on_url, on_selector, Deadline, \
+    VIDEO_UPLOAD_TIMEOUT
 
 
 async def cookie_auth(account_file):
@@ -80,6 +85,8 @@ class TiktokVideo(object):
         self.account_file = account_file
         self.local_executable_path = LOCAL_CHROME_PATH
         self.locator_base = None
+        # 上传进度钩子，发布引擎会替换为带上报目标的实例
+        self.progress = UploadProgress(SOCIAL_MEDIA_TIKTOK)
 
     async def set_schedule_time(self, page, publish_date):
         schedule_input_element = self.locator_base.get_by_label('Schedule')
@@ -139,17 +146,17 @@ class TiktokVideo(object):
 
     async def handle_upload_error(self, page):
         tiktok_logger.info("video upload error retrying.")
+        self.progress.retry("视频上传失败")
         select_file_button = self.locator_base.locator('button[aria-label="Select file"]')
         async with page.expect_file_chooser() as fc_info:
             await select_file_button.click()
         file_chooser = await fc_info.value
         await file_chooser.set_files(self.file_path)
 
-    async def upload(self, playwright: Playwright) -> None:
-        browser = await playwright.chromium.launch(headless=False, executable_path=self.local_executable_path)
-        context = await browser.new_context(storage_state=f"{self.account_file}")
-        # context = await set_init_script(context)
-        page = await context.new_page()
+    async def upload(self, page) -> None:
+        # 未指定封面时从缓存取封面，与上传视频并行生成
+        cover_task = asyncio.create_task(resolve_cover(self.file_path, SOCIAL_MEDIA_TIKTOK, self.thumbnail_path))
+        await watch_page(page, self.progress)
 
         # change language to eng first
         await self.change_language(page)
@@ -170,6 +177,7 @@ class TiktokVideo(object):
             'button:has-text("Select video"):visible')
         await upload_button.wait_for(state='visible')  # 确保按钮可见
 
+        self.progress.phase("upload")
         async with page.expect_file_chooser() as fc_info:
             await upload_button.click()
         file_chooser = await fc_info.value
@@ -178,23 +186,23 @@ class TiktokVideo(object):
         await self.add_title_tags(page)
         # detect upload status
         await self.detect_upload_status(page)
+        self.progress.phase("fill")
+        self.thumbnail_path = await cover_task
         if self.thumbnail_path:
             tiktok_logger.info(f'[+] Uploading thumbnail file {self.title}.png')
-            await self.upload_thumbnails(page)
+            # keep the default cover if the cover editor fails
+            try:
+                await self.upload_thumbnails(page)
+            except Exception as e:
+                tiktok_logger.warning(f'[-] Failed to upload thumbnail, using default cover: {e}')
 
         if self.publish_date != 0:
             await self.set_schedule_time(page, self.publish_date)
 
+        self.progress.phase("publish")
         await self.click_publish(page)
         tiktok_logger.success(f"video_id: {await self.get_last_video_id(page)}")
 
-        await context.storage_state(path=f"{self.account_file}")  # save cookie
-        tiktok_logger.info('  [-] update cookie！')
-        await asyncio.sleep(2)  # close delay for look the video status
-        # close all
-        await context.close()
-        await browser.close()
-
     async def add_title_tags(self, page):
 
         editor_locator = self.locator_base.locator('div.public-DraftEditor-content')
@@ -253,20 +261,12 @@ class TiktokVideo(object):
         await page.locator('#creator-tools-selection-menu-header >> text=English (US)').click()
 
     async def click_publish(self, page):
-        success_flag_div = 'div.common-modal-confirm-modal'
-        while True:
-            try:
-                publish_button = self.locator_base.locator('div.button-group button').nth(0)
-                if await publish_button.count():
-                    await publish_button.click()
-
-                await page.wait_for_url("https://www.tiktok.com/tiktokstudio/content",  timeout=3000)
-                tiktok_logger.success("  [-] video published success")
-                break
-            except Exception as e:
-                tiktok_logger.exception(f"  [-] Exception: {e}")
-                tiktok_logger.info("  [-] video publishing")
-                await asyncio.sleep(0.5)
+        await click_until(
+            lambda: click_if_present(self.locator_base.locator('div.button-group button').nth(0)),
+            {"published": on_url(page, "https://www.tiktok.com/tiktokstudio/content")},
+            on_retry=lambda: self.progress.retry("重新点击发布"),
+        )
+        tiktok_logger.success("  [-] video published success")
 
     async def get_last_video_id(self, page):
         await page.wait_for_selector('div[data-tt="components_PostTable_Container"]')
@@ -278,23 +278,22 @@ class TiktokVideo(object):
 
 
     async def detect_upload_status(self, page):
+        # Post 按钮可点击代表上传完成；出现 Select file 按钮代表上传出错，重新选择文件
+        error_selector = 'button[aria-label="Select file"]'
+        deadline = Deadline(VIDEO_UPLOAD_TIMEOUT)
         while True:
-            try:
-                # if await self.locator_base.locator('div.btn-post > button').get_attribute("disabled") is None:
-                if await self.locator_base.locator(
-                        'div.button-group > button >> text=Post').get_attribute("disabled") is None:
-                    tiktok_logger.info("  [-]video uploaded.")
-                    break
-                else:
-                    tiktok_logger.info("  [-] video uploading...")
-                    await asyncio.sleep(2)
-                    if await self.locator_base.locator(
-                            'button[aria-label="Select file"]').count():
-                        tiktok_logger.info("  [-] found some error while uploading now retry...")
-                        await self.handle_upload_error(page)
-            except:
-                tiktok_logger.info("  [-] video uploading...")
-                await asyncio.sleep(2)
+            state = await wait_first({
+                "uploaded": on_selector(self.locator_base, 'div.button-group > button:not([disabled]):has-text("Post")'),
+                "failed": on_selector(self.locator_base, error_selector),
+            }, deadline.remaining(), progress=lambda elapsed: tiktok_logger.info("  [-] video uploading..."))
+            if state == "uploaded":
+                tiktok_logger.info("  [-]video uploaded.")
+                self.progress.percent(100)
+                break
+            tiktok_logger.info("  [-] found some error while uploading now retry...")
+            await self.handle_upload_error(page)
+            await self.locator_base.locator(error_selector).first.wait_for(
+                state="hidden", timeout=max(deadline.remaining(), 1) * 1000)
 
     async def choose_base_locator(self, page):
         # await page.wait_for_selector('div.upload-container')
@@ -304,5 +303,8 @@ class TiktokVideo(object):
             self.locator_base = page.locator(Tk_Locator.default) 
 
     async def main(self):
-        async with async_playwright() as playwright:
-            await self.upload(playwright)
+        self.progress.phase("launch")
+        # 发布引擎内同一账号的连续上传复用常驻浏览器上下文，cookie 由会话定期保存
+        async with account_page(self.account_file, SOCIAL_MEDIA_TIKTOK, self.local_executable_path,
+                                stealth=False) as page:
+            await self.upload(page)
@@ -0,0 +1,134 @@
+# uploader/xhs_uploader/api_publisher.py
+"""
+小红书接口发布 - 通过 XhsClient 直接调用创作者接口发布视频笔记，不启动浏览器
+- 复用账号的 cookie 文件（浏览器登录保存的 storage_state），同一账号复用同一个 XhsClient
+- 请求签名走常驻签名服务（进程内 sign_local，或 XHS_SIGN_BACKEND = "remote" 时走 XHS_SERVER 的 /sign）
+- 话题联想结果按标签缓存 TOPIC_CACHE_TTL 秒，批量发布时同一标签只查询一次
+与 XiaoHongShuVideo 接口一致（main() / progress），由发布引擎按任务的 uploader 字段选用
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import conf
+from uploader.xhs_uploader.main import sign, sign_local
+from utils.base_social_media import SOCIAL_MEDIA_XIAOHONGSHU
+from utils.cover_cache import resolve_cover
+from utils.log import xhs_logger
+from utils.upload_progress import UploadProgress
+
+# 签名后端：local 使用进程内常驻签名服务，remote 使用 XHS_SERVER 上的签名服务
+XHS_SIGN_BACKEND = getattr(conf, "XHS_SIGN_BACKEND", "local")
+# XhsClient 单次请求超时（秒），视频上传请求也受此限制
+XHS_API_TIMEOUT = 120
+# 话题联想缓存时间（秒）
+TOPIC_CACHE_TTL = 24 * 3600
+# 每条笔记最多关联的话题数
+MAX_TOPICS = 3
+# 小红书标题长度上限
+TITLE_MAX_LENGTH = 20
+
+_topic_cache = {}
+_topic_lock = threading.Lock()
+# 账号文件 -> (文件修改时间, XhsClient)
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def cookie_string(account_file) -> str:
+    """把 storage_state 中小红书域名下的 cookie 转换为 XhsClient 使用的 cookie 字符串"""
+    with open(account_file, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    cookies = {}
+    for cookie in state.get("cookies", []):
+        if cookie.get("domain", "").lstrip(".").endswith("xiaohongshu.com"):
+            cookies[cookie["name"]] = cookie["value"]
+    if "a1" not in cookies or "web_session" not in cookies:
+        raise ValueError(f"cookie 文件缺少 a1 / web_session，请重新登录: {Path(account_file).name}")
+    return "; ".join(f"{name}={value}" for name, value in cookies.items())
+
+
+def get_client(account_file):
+    """同一账号复用 XhsClient（连接池、cookie）；cookie 文件被重新登录更新后重建"""
+    from xhs import XhsClient
+
+    key = str(Path(account_file).resolve())
+    mtime = os.path.getmtime(account_file)
+    with _clients_lock:
+        cached = _clients.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        client = XhsClient(cookie_string(account_file), sign=sign if XHS_SIGN_BACKEND == "remote" else sign_local,
+                           timeout=XHS_API_TIMEOUT)
+        _clients[key] = (mtime, client)
+        return client
+
+
+def suggest_topic(client, tag: str):
+    """标签对应的官方话题（第一条联想结果），按标签缓存；没有联想结果时返回 None"""
+    now = time.monotonic()
+    with _topic_lock:
+        cached = _topic_cache.get(tag)
+        if cached is not None and now - cached[0] < TOPIC_CACHE_TTL:
+            return cached[1]
+    topics = client.get_suggest_topic(tag)
+    topic = None
+    if topics:
+        topic = dict(topics[0])
+        topic["type"] = "topic"
+    with _topic_lock:
+        _topic_cache[tag] = (now, topic)
+    return topic
+
+
+class XhsApiVideo(object):
+    def __init__(self, title, file_path, tags, publish_date: datetime, account_file, thumbnail_path=None):
+        self.title = title
+        self.file_path = file_path
+        self.tags = tags or []
+        self.publish_date = publish_date
+        self.account_file = account_file
+        self.thumbnail_path = thumbnail_path
+        # 上传进度钩子，发布引擎会替换为带上报目标的实例
+        self.progress = UploadProgress(SOCIAL_MEDIA_XIAOHONGSHU)
+
+    def build_topics(self, client):
+        topics = []
+        for tag in list(dict.fromkeys(self.tags))[:MAX_TOPICS]:
+            try:
+                topic = suggest_topic(client, tag)
+            except Exception as e:
+                xhs_logger.warning(f"  [-] 话题联想失败 {tag}: {e}")
+                continue
+            if topic:
+                topics.append(topic)
+        return topics
+
+    def build_desc(self, topics) -> str:
+        tags_str = ' '.join(['#' + tag for tag in self.tags])
+        hash_tags_str = ' '.join(['#' + topic['name'] + '[话题]#' for topic in topics])
+        return ' '.join(part for part in (self.title, tags_str, hash_tags_str) if part)
+
+    async def main(self):
+        xhs_logger.info(f'[+]接口发布-------{self.title}')
+        # XhsClient 是同步接口，网络请求放到线程中执行，进度事件仍在事件循环线程中发出
+        client = await asyncio.to_thread(get_client, self.account_file)
+        self.progress.phase("fill")
+        cover_path = await resolve_cover(self.file_path, SOCIAL_MEDIA_XIAOHONGSHU, self.thumbnail_path)
+        topics = await asyncio.to_thread(self.build_topics, client)
+        post_time = self.publish_date.strftime("%Y-%m-%d %H:%M:%S") if self.publish_date != 0 else None
+        size = os.path.getsize(self.file_path)
+        self.progress.phase("upload")
+        self.progress.add_bytes(0, size)
+        note = await asyncio.to_thread(
+            client.create_video_note, title=self.title[:TITLE_MAX_LENGTH], video_path=str(self.file_path),
+            desc=self.build_desc(topics), cover_path=cover_path, topics=topics, is_private=False,
+            post_time=post_time)
+        self.progress.add_bytes(size)
+        self.progress.percent(100)
+        xhs_logger.success(f'  [-]视频笔记已发布: {note.get("id") if isinstance(note, dict) else note}')
+        return note
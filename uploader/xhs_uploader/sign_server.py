@@ -0,0 +1,36 @@
+# uploader/xhs_uploader/sign_server.py
+"""
+小红书签名 HTTP 服务 - 在 XHS_SERVER 上提供 sign() 使用的 /sign 接口，背后是常驻签名服务
+python -m uploader.xhs_uploader.sign_server
+请求: POST /sign {"uri", "data", "a1", "web_session"}，返回 {"x-s", "x-t"}
+GET /health 返回签名页面数、排队数、平均耗时等
+"""
+from urllib.parse import urlsplit
+
+from flask import Flask, request, jsonify
+
+from conf import XHS_SERVER
+from uploader.xhs_uploader.sign_service import sign_sync, sign_stats, warm_up_sync
+
+app = Flask(__name__)
+
+
+@app.route('/sign', methods=['POST'])
+def sign():
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(sign_sync(data.get("uri"), data.get("data"), data.get("a1", ""), data.get("web_session", "")))
+    except Exception as e:
+        return jsonify({"code": 500, "msg": str(e), "data": None}), 500
+
+
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify({"code": 200, "msg": "success", "data": sign_stats()}), 200
+
+
+if __name__ == '__main__':
+    address = urlsplit(XHS_SERVER)
+    # 启动时先打开签名页面，第一次签名不用等待浏览器启动
+    warm_up_sync()
+    app.run(host=address.hostname or '127.0.0.1', port=address.port or 11901, threaded=True)
@@ -0,0 +1,286 @@
+# uploader/xhs_uploader/sign_service.py
+"""
+小红书常驻签名服务 - 替代每次签名都启动一个 Chromium 的 sign_local
+- 一个常驻无头浏览器 + 最多 XHS_SIGN_PAGES 个预热好的签名页面（每个页面独立上下文，绑定一个 a1 cookie）
+- 签名请求优先使用已绑定相同 a1 的空闲页面，直接调用 window._webmsxyw，耗时为毫秒级；
+  没有时换绑最久未用的空闲页面（写入 a1 后重新加载，等待签名函数就绪，不固定 sleep）
+- 页面都在忙时请求排队等待；签名失败的页面丢弃重建，换一个页面重试
+- 后台定期检查空闲页面的签名函数是否可用，浏览器断开时整体重建
+进程内通过 sign_sync() / sign_async() 调用；sign_server.py 在 XHS_SERVER 上提供同样的 /sign 接口
+"""
+import asyncio
+import time
+from collections import Counter
+
+import conf
+from utils.background_loop import run_in_background, run_sync
+from utils.base_social_media import SOCIAL_MEDIA_XIAOHONGSHU, set_init_script
+from utils.launch_profile import launch_browser, LAUNCH_MODE_HEADLESS
+from utils.route_policy import RoutePolicy, LEAN_PAGES
+
+# 签名服务所在的后台事件循环名称
+XHS_SIGN_LOOP = "xhs_sign"
+XHS_HOME_URL = "https://www.xiaohongshu.com"
+# 签名页面数量（同时进行的签名数），可用 XHS_SIGN_PAGES 覆盖
+XHS_SIGN_PAGES = getattr(conf, "XHS_SIGN_PAGES", 2)
+# 打开 / 换绑页面后等待签名函数就绪的上限（秒）
+XHS_SIGN_READY_TIMEOUT = 20
+# 单次签名最多尝试的页面数
+XHS_SIGN_ATTEMPTS = 3
+# 同步调用等待签名结果的上限（秒），包括排队时间
+XHS_SIGN_TIMEOUT = 60
+# 排队请求被其他 a1 的请求让过多少次后，不再避让、直接换绑页面（防止饿死）
+XHS_SIGN_MAX_YIELDS = 3
+# 空闲页面健康检查间隔（秒）
+XHS_SIGN_HEALTH_INTERVAL = 60
+
+SIGN_READY_JS = "typeof window._webmsxyw === 'function'"
+SIGN_JS = "([url, data]) => window._webmsxyw(url, data)"
+
+
+class SignPage:
+    def __init__(self):
+        self.context = None
+        self.page = None
+        self.a1 = None
+        self.busy = True
+        self.last_used = time.monotonic()
+
+
+class XhsSignService:
+    def __init__(self, max_pages: int = XHS_SIGN_PAGES):
+        self.max_pages = max_pages
+        self._pages = []
+        self._changed = asyncio.Condition()
+        self._browser_lock = asyncio.Lock()
+        self._playwright = None
+        self._browser = None
+        self._health = None
+        # 排队中的请求按 a1 计数，换绑时避开排队请求正在等的页面
+        self._waiting = Counter()
+        self.pending = 0
+        self.signed = 0
+        self.failed = 0
+        self.total_ms = 0.0
+
+    async def _ensure_browser(self):
+        async with self._browser_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            if self._playwright is None:
+                from playwright.async_api import async_playwright
+                self._playwright = await async_playwright().start()
+            # 旧浏览器断开后，它的页面全部失效
+            for sign_page in self._pages:
+                sign_page.context = sign_page.page = sign_page.a1 = None
+            self._browser = await launch_browser(self._playwright, SOCIAL_MEDIA_XIAOHONGSHU, mode=LAUNCH_MODE_HEADLESS)
+            print("🌐 小红书签名服务: 已启动浏览器")
+            if self._health is None:
+                self._health = asyncio.create_task(self._health_check())
+            return self._browser
+
+    async def _open(self, sign_page: SignPage):
+        browser = await self._ensure_browser()
+        context = await browser.new_context()
+        context = await set_init_script(context)
+        if LEAN_PAGES:
+            # 签名页只需要脚本，图片 / 字体 / 音视频一律不加载
+            await context.route("**/*", RoutePolicy(SOCIAL_MEDIA_XIAOHONGSHU).handle)
+        sign_page.context = context
+        sign_page.page = await context.new_page()
+        sign_page.a1 = None
+        await sign_page.page.goto(XHS_HOME_URL)
+        await sign_page.page.wait_for_function(SIGN_READY_JS, timeout=XHS_SIGN_READY_TIMEOUT * 1000)
+
+    async def _bind(self, sign_page: SignPage, a1: str):
+        """写入 a1 cookie 并重新加载，签名函数就绪后返回"""
+        await sign_page.context.add_cookies([
+            {'name': 'a1', 'value': a1, 'domain': ".xiaohongshu.com", 'path': "/"}
+        ])
+        await sign_page.page.reload()
+        await sign_page.page.wait_for_function(SIGN_READY_JS, timeout=XHS_SIGN_READY_TIMEOUT * 1000)
+        sign_page.a1 = a1
+
+    async def _discard(self, sign_page: SignPage):
+        context = sign_page.context
+        sign_page.context = sign_page.page = sign_page.a1 = None
+        if context is not None:
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+    async def _acquire(self, a1: str) -> SignPage:
+        """
+        取得一个空闲页面：优先已绑定该 a1 的，其次新建，再次最久未用且没有其他排队请求在等的；都没有时排队
+        """
+        async with self._changed:
+            self.pending += 1
+            self._waiting[a1] += 1
+            yields = 0
+            try:
+                while True:
+                    idle = [item for item in self._pages if not item.busy]
+                    # 没有 a1 的请求（扫码登录等）任意已打开的页面都可以签
+                    sign_page = next((item for item in idle if item.page is not None and (item.a1 == a1 or not a1)),
+                                     None)
+                    if sign_page is None and len(self._pages) < self.max_pages:
+                        sign_page = SignPage()
+                        self._pages.append(sign_page)
+                    if sign_page is None:
+                        spare = [item for item in idle if not (item.a1 and self._waiting[item.a1])]
+                        if not spare and yields >= XHS_SIGN_MAX_YIELDS:
+                            spare = idle
+                        if spare:
+                            sign_page = min(spare, key=lambda item: item.last_used)
+                    if sign_page is not None:
+                        sign_page.busy = True
+                        return sign_page
+                    if idle:
+                        yields += 1
+                    await self._changed.wait()
+            finally:
+                self.pending -= 1
+                self._waiting[a1] -= 1
+                if not self._waiting[a1]:
+                    del self._waiting[a1]
+
+    async def _release(self, sign_page: SignPage):
+        async with self._changed:
+            sign_page.busy = False
+            sign_page.last_used = time.monotonic()
+            self._changed.notify_all()
+
+    async def sign(self, uri, data=None, a1="", web_session=""):
+        started = time.monotonic()
+        last_error = None
+        for _ in range(XHS_SIGN_ATTEMPTS):
+            sign_page = await self._acquire(a1)
+            try:
+                if sign_page.page is None:
+                    await self._open(sign_page)
+                if a1 and sign_page.a1 != a1:
+                    await self._bind(sign_page, a1)
+                encrypt_params = await sign_page.page.evaluate(SIGN_JS, [uri, data])
+                self.signed += 1
+                self.total_ms += (time.monotonic() - started) * 1000
+                return {
+                    "x-s": encrypt_params["X-s"],
+                    "x-t": str(encrypt_params["X-t"])
+                }
+            except Exception as e:
+                # window._webmsxyw is not a function / 页面跳转 / 浏览器崩溃：丢弃该页面，换一个重试
+                last_error = e
+                await self._discard(sign_page)
+            finally:
+                await self._release(sign_page)
+        self.failed += 1
+        raise Exception(f"小红书签名失败: {last_error}")
+
+    async def warm_up(self, a1_list=()):
+        """预先打开全部签名页面（可按 a1 列表预先绑定），服务启动时调用"""
+        a1_list = list(a1_list)[:self.max_pages]
+        a1_list += [None] * (self.max_pages - len(a1_list))
+        pages = [await self._acquire(a1) for a1 in a1_list]
+        try:
+            for sign_page, a1 in zip(pages, a1_list):
+                try:
+                    if sign_page.page is None:
+                        await self._open(sign_page)
+                    if a1 and sign_page.a1 != a1:
+                        await self._bind(sign_page, a1)
+                except Exception as e:
+                    print(f"⚠️ 小红书签名服务: 预热页面失败: {e}")
+                    await self._discard(sign_page)
+        finally:
+            for sign_page in pages:
+                await self._release(sign_page)
+
+    async def _health_check(self):
+        while True:
+            await asyncio.sleep(XHS_SIGN_HEALTH_INTERVAL)
+            if self._browser is not None and not self._browser.is_connected():
+                print("⚠️ 小红书签名服务: 浏览器已断开，下次签名时重建")
+                continue
+            for sign_page in list(self._pages):
+                if sign_page.busy or sign_page.page is None:
+                    continue
+                sign_page.busy = True
+                try:
+                    if not await sign_page.page.evaluate(SIGN_READY_JS):
+                        raise RuntimeError("签名函数不可用")
+                except Exception as e:
+                    print(f"⚠️ 小红书签名服务: 页面失效，已丢弃: {e}")
+                    await self._discard(sign_page)
+                finally:
+                    await self._release(sign_page)
+
+    def stats(self) -> dict:
+        return {
+            "pages": len([item for item in self._pages if item.page is not None]),
+            "busy": len([item for item in self._pages if item.busy]),
+            "pending": self.pending,
+            "bound_a1": len({item.a1 for item in self._pages if item.a1}),
+            "signed": self.signed,
+            "failed": self.failed,
+            "avg_ms": round(self.total_ms / self.signed, 1) if self.signed else None,
+            "browser_connected": self._browser is not None and self._browser.is_connected(),
+        }
+
+    async def close(self):
+        if self._health is not None:
+            self._health.cancel()
+            self._health = None
+        for sign_page in self._pages:
+            await self._discard(sign_page)
+        self._pages.clear()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+_service = None
+
+
+def get_sign_service() -> XhsSignService:
+    """获取全局签名服务（只能在签名服务的后台事件循环中使用）"""
+    global _service
+    if _service is None:
+        _service = XhsSignService()
+    return _service
+
+
+async def _sign(uri, data, a1, web_session):
+    return await get_sign_service().sign(uri, data, a1, web_session)
+
+
+async def _warm_up(a1_list):
+    await get_sign_service().warm_up(a1_list)
+
+
+async def _stats():
+    return get_sign_service().stats()
+
+
+def sign_sync(uri, data=None, a1="", web_session=""):
+    """同步签名（XhsClient 的 sign 回调），可以在任意线程中调用"""
+    return run_sync(_sign(uri, data, a1, web_session), XHS_SIGN_LOOP, XHS_SIGN_TIMEOUT)
+
+
+async def sign_async(uri, data=None, a1="", web_session=""):
+    """在任意事件循环中签名"""
+    return await run_in_background(_sign(uri, data, a1, web_session), XHS_SIGN_LOOP)
+
+
+def warm_up_sync(a1_list=()):
+    run_sync(_warm_up(a1_list), XHS_SIGN_LOOP)
+
+
+def sign_stats() -> dict:
+    return run_sync(_stats(), XHS_SIGN_LOOP, XHS_SIGN_TIMEOUT)
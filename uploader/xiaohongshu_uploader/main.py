@@ -1,13 +1,16 @@
 # -*- coding: utf-8 -*-
 from datetime import datetime
 
-from playwright.async_api import Playwright, async_playwright, Page
+from playwright.async_api import async_playwright, Page
 import os
 import asyncio
 
 from conf import LOCAL_CHROME_PATH
-from utils.base_social_media import set_init_script
+from utils.account_sessions import account_page
+from utils.base_social_media import set_init_script, SOCIAL_MEDIA_XIAOHONGSHU
 from utils.log import xiaohongshu_logger
+from utils.upload_progress import UploadProgress, watch_page
+from utils.page_waits import wait_first, click_until, click_if_present, on_url, on_selector, VIDEO_UPLOAD_TIMEOUT
 
 
 async def cookie_auth(account_file):
@@ -73,6 +76,8 @@ class XiaoHongShuVideo(object):
         self.date_format = '%Y年%m月%d日 %H:%M'
         self.local_executable_path = LOCAL_CHROME_PATH
         self.thumbnail_path = thumbnail_path
+        # 上传进度钩子，发布引擎会替换为带上报目标的实例
+        self.progress = UploadProgress(SOCIAL_MEDIA_XIAOHONGSHU)
 
     async def set_schedule_time_xiaohongshu(self, page, publish_date):
         print("  [-] 正在设置定时发布时间...")
@@ -103,23 +108,11 @@ class XiaoHongShuVideo(object):
 
     async def handle_upload_error(self, page):
         xiaohongshu_logger.info('视频出错了，重新上传中')
+        self.progress.retry("视频上传失败")
         await page.locator('div.progress-div [class^="upload-btn-input"]').set_input_files(self.file_path)
 
-    async def upload(self, playwright: Playwright) -> None:
-        # 使用 Chromium 浏览器启动一个浏览器实例
-        if self.local_executable_path:
-            browser = await playwright.chromium.launch(headless=False, executable_path=self.local_executable_path)
-        else:
-            browser = await playwright.chromium.launch(headless=False)
-        # 创建一个浏览器上下文，使用指定的 cookie 文件
-        context = await browser.new_context(
-            viewport={"width": 1600, "height": 900},
-            storage_state=f"{self.account_file}"
-        )
-        context = await set_init_script(context)
-
-        # 创建一个新的页面
-        page = await context.new_page()
+    async def upload(self, page: Page) -> None:
+        await watch_page(page, self.progress)
         # 访问指定的 URL
         await page.goto("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=video")
         xiaohongshu_logger.info(f'[+]正在上传-------{self.title}.mp4')
@@ -127,41 +120,21 @@ class XiaoHongShuVideo(object):
         xiaohongshu_logger.info(f'[-] 正在打开主页...')
         await page.wait_for_url("https://creator.xiaohongshu.com/publish/publish?from=homepage&target=video")
         # 点击 "上传视频" 按钮
+        self.progress.phase("upload")
         await page.locator("div[class^='upload-content'] input[class='upload-input']").set_input_files(self.file_path)
 
-        # 等待页面跳转到指定的 URL 2025.01.08修改在原有基础上兼容两种页面
-        while True:
-            try:
-                # 等待upload-input元素出现
-                upload_input = await page.wait_for_selector('input.upload-input', timeout=3000)
-                # 获取下一个兄弟元素
-                preview_new = await upload_input.query_selector(
-                    'xpath=following-sibling::div[contains(@class, "preview-new")]')
-                if preview_new:
-                    # 在preview-new元素中查找包含"上传成功"的stage元素
-                    stage_elements = await preview_new.query_selector_all('div.stage')
-                    upload_success = False
-                    for stage in stage_elements:
-                        text_content = await page.evaluate('(element) => element.textContent', stage)
-                        if '上传成功' in text_content:
-                            upload_success = True
-                            break
-                    if upload_success:
-                        xiaohongshu_logger.info("[+] 检测到上传成功标识!")
-                        break  # 成功检测到上传成功后跳出循环
-                    else:
-                        print("  [-] 未找到上传成功标识，继续等待...")
-                else:
-                    print("  [-] 未找到预览元素，继续等待...")
-                    await asyncio.sleep(1)
-            except Exception as e:
-                print(f"  [-] 检测过程出错: {str(e)}，重新尝试...")
-                await asyncio.sleep(0.5)  # 等待0.5秒后重新尝试
+        # 等待上传预览中出现"上传成功"标识
+        await wait_first({
+            "uploaded": on_selector(page, 'input.upload-input ~ div[class*="preview-new"] div.stage:has-text("上传成功")',
+                                    state="attached"),
+        }, VIDEO_UPLOAD_TIMEOUT, progress=lambda elapsed: xiaohongshu_logger.info("  [-] 正在上传视频中..."))
+        xiaohongshu_logger.info("[+] 检测到上传成功标识!")
+        self.progress.percent(100)
+        self.progress.phase("fill")
 
         # 填充标题和话题
         # 检查是否存在包含输入框的元素
         # 这里为了避免页面变化，故使用相对位置定位：作品标题父级右侧第一个元素的input子元素
-        await asyncio.sleep(1)
         xiaohongshu_logger.info(f'  [-] 正在填充标题和话题...')
         title_container = page.locator('div.input.titleInput').locator('input.d-text')
         if await title_container.count():
@@ -216,31 +189,15 @@ class XiaoHongShuVideo(object):
         if self.publish_date != 0:
             await self.set_schedule_time_xiaohongshu(page, self.publish_date)
 
-        # 判断视频是否发布成功
-        while True:
-            try:
-                # 等待包含"定时发布"文本的button元素出现并点击
-                if self.publish_date != 0:
-                    await page.locator('button:has-text("定时发布")').click()
-                else:
-                    await page.locator('button:has-text("发布")').click()
-                await page.wait_for_url(
-                    "https://creator.xiaohongshu.com/publish/success?**",
-                    timeout=3000
-                )  # 如果自动跳转到作品页面，则代表发布成功
-                xiaohongshu_logger.success("  [-]视频发布成功")
-                break
-            except:
-                xiaohongshu_logger.info("  [-] 视频正在发布中...")
-                await page.screenshot(full_page=True)
-                await asyncio.sleep(0.5)
-
-        await context.storage_state(path=self.account_file)  # 保存cookie
-        xiaohongshu_logger.success('  [-]cookie更新完毕！')
-        await asyncio.sleep(2)  # 这里延迟是为了方便眼睛直观的观看
-        # 关闭浏览器上下文和浏览器实例
-        await context.close()
-        await browser.close()
+        # 判断视频是否发布成功：跳转到发布成功页面即成功，未跳转时重新点击发布
+        publish_text = "定时发布" if self.publish_date != 0 else "发布"
+        self.progress.phase("publish")
+        await click_until(
+            lambda: click_if_present(page.locator(f'button:has-text("{publish_text}")')),
+            {"published": on_url(page, "https://creator.xiaohongshu.com/publish/success?**")},
+            on_retry=lambda: self.progress.retry("重新点击发布"),
+        )
+        xiaohongshu_logger.success("  [-]视频发布成功")
     
     async def set_thumbnail(self, page: Page, thumbnail_path: str):
         if thumbnail_path:
@@ -361,7 +318,10 @@ class XiaoHongShuVideo(object):
             return False
 
     async def main(self):
-        async with async_playwright() as playwright:
-            await self.upload(playwright)
+        self.progress.phase("launch")
+        # 发布引擎内同一账号的连续上传复用常驻浏览器上下文，cookie 由会话定期保存
+        async with account_page(self.account_file, SOCIAL_MEDIA_XIAOHONGSHU, self.local_executable_path,
+                                viewport={"width": 1600, "height": 900}) as page:
+            await self.upload(page)
 
 
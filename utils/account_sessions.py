@@ -0,0 +1,307 @@
+# utils/account_sessions.py
+"""
+账号会话复用 - 同一账号的连续上传共用一个常驻的持久化浏览器上下文
+- 每个账号一个 launch_persistent_context，配置目录为 browser_profiles/<平台>/<账号文件名>，
+  页面缓存、localStorage 保存在配置目录中，连续上传不再冷启动浏览器、重新加载创作者平台的静态资源
+- 每次上传租用一个新页面，用完只关闭页面；同一账号同时只出租一个页面
+- 空闲超过 SESSION_IDLE_TIMEOUT 的会话自动关闭；常驻上下文不超过 SESSION_MAX_CONTEXTS 个，
+  满了先关闭最久未使用的空闲会话，没有空闲会话时排队等待
+- cookie 每 SESSION_SAVE_INTERVAL 秒和会话关闭时写回账号文件，不再每次上传结束都写；
+  账号文件被重新登录更新后，下次租用时重新加载 cookie
+会话复用只在 session_scope() 内生效（发布引擎、sau_worker）；CLI、示例脚本等其他调用方仍按次启动浏览器
+在 conf.py 中设置 ACCOUNT_SESSIONS = False 可整体关闭
+"""
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from playwright.async_api import async_playwright
+
+import conf
+from conf import BASE_DIR
+from utils.base_social_media import set_init_script
+from utils.launch_profile import launch_browser, launch_persistent_context
+from utils.route_policy import apply_route_policy, block_page_requests
+
+PROFILE_DIR = Path(BASE_DIR / "browser_profiles")
+ACCOUNT_SESSIONS = getattr(conf, "ACCOUNT_SESSIONS", True)
+# 同时常驻的账号上下文数量上限（每个持久化上下文是一个独立的浏览器进程），可用 ACCOUNT_SESSION_MAX_CONTEXTS 覆盖
+SESSION_MAX_CONTEXTS = getattr(conf, "ACCOUNT_SESSION_MAX_CONTEXTS", 4)
+# 会话空闲多久后关闭（秒）
+SESSION_IDLE_TIMEOUT = 600
+# cookie 写回账号文件的间隔（秒）
+SESSION_SAVE_INTERVAL = 300
+# 后台检查空闲 / 保存 cookie 的间隔（秒）
+SESSION_SWEEP_INTERVAL = 30
+
+# 只补充配置目录中还没有的 localStorage 项，不覆盖页面后来写入的值
+SEED_LOCAL_STORAGE_JS = '''
+(origins) => {
+    for (const origin of origins) {
+        if (origin.origin !== location.origin) continue;
+        for (const item of origin.localStorage || []) {
+            if (localStorage.getItem(item.name) === null) localStorage.setItem(item.name, item.value);
+        }
+    }
+}
+'''
+
+
+def _mtime(path) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0
+
+
+def _read_storage_state(account_file) -> dict:
+    try:
+        with open(account_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class AccountSession:
+    def __init__(self, key: str, account_file, context):
+        self.key = key
+        self.account_file = str(account_file)
+        self.context = context
+        self.lock = asyncio.Lock()
+        # 已分配但尚未归还的租约数（包括排队等待页面的），大于 0 时不会被回收
+        self.leases = 0
+        self.last_used = time.monotonic()
+        self.last_saved = time.monotonic()
+        self.cookies_mtime = 0
+        self.closed = False
+        context.on("close", lambda _: setattr(self, "closed", True))
+
+    async def load_cookies(self):
+        """从账号文件加载 cookie（账号文件在上次加载 / 保存之后没有变化时跳过）"""
+        mtime = _mtime(self.account_file)
+        if mtime == self.cookies_mtime:
+            return
+        state = _read_storage_state(self.account_file)
+        await self.context.clear_cookies()
+        if state.get("cookies"):
+            await self.context.add_cookies(state["cookies"])
+        self.cookies_mtime = mtime
+
+    async def save_cookies(self):
+        try:
+            await self.context.storage_state(path=self.account_file)
+            self.cookies_mtime = _mtime(self.account_file)
+            self.last_saved = time.monotonic()
+        except Exception as e:
+            print(f"⚠️ 账号会话: 保存 cookie 失败 {Path(self.account_file).name}: {e}")
+
+
+class AccountSessionManager:
+    def __init__(self, max_contexts: int = SESSION_MAX_CONTEXTS, idle_timeout: float = SESSION_IDLE_TIMEOUT,
+                 save_interval: float = SESSION_SAVE_INTERVAL):
+        self.max_contexts = max_contexts
+        self.idle_timeout = idle_timeout
+        self.save_interval = save_interval
+        self._sessions = {}
+        # 正在启动 / 正在关闭的账号：启动中的占用常驻名额；同一账号在启动或关闭完成前不会再启动第二个上下文
+        self._launching = set()
+        self._closing = set()
+        self._changed = asyncio.Condition()
+        self._playwright = None
+        self._sweeper = None
+
+    async def _launch(self, account_file, platform: str, executable_path=None, viewport=None, stealth=True):
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        profile = PROFILE_DIR / platform / Path(account_file).stem
+        profile.mkdir(parents=True, exist_ok=True)
+        context = await launch_persistent_context(self._playwright, profile, platform, executable_path,
+                                                  viewport=viewport)
+        if stealth:
+            context = await set_init_script(context)
+        origins = _read_storage_state(account_file).get("origins")
+        if origins:
+            await context.add_init_script(f"({SEED_LOCAL_STORAGE_JS})({json.dumps(origins)})")
+        print(f"🌐 账号会话: 已启动 [{platform}] {Path(account_file).name}（常驻 {len(self._sessions) + len(self._launching)} 个）")
+        return context
+
+    async def _checkout(self, account_file, platform: str, **options) -> AccountSession:
+        """
+        取得账号会话并占用一个租约；没有时启动，达到上限时回收最久未用的空闲会话或等待
+        锁内只预留名额，启动 / 关闭浏览器都在锁外进行，不同账号的冷启动互不阻塞
+        """
+        key = str(Path(account_file).resolve())
+        evicted = None
+        async with self._changed:
+            while True:
+                session = self._sessions.get(key)
+                if session is not None and not session.closed:
+                    session.leases += 1
+                    return session
+                # 浏览器被关闭 / 崩溃的会话直接丢弃
+                self._sessions.pop(key, None)
+                if key not in self._launching and key not in self._closing:
+                    if len(self._sessions) + len(self._launching) < self.max_contexts:
+                        break
+                    idle = [item for item in self._sessions.values() if not item.leases]
+                    if idle:
+                        # 被回收会话的名额直接转给本次启动
+                        evicted = min(idle, key=lambda item: item.last_used)
+                        self._detach(evicted)
+                        break
+                await self._changed.wait()
+            self._launching.add(key)
+        try:
+            if evicted is not None:
+                await self._close_session(evicted)
+            context = await self._launch(account_file, platform, **options)
+        except BaseException:
+            async with self._changed:
+                self._launching.discard(key)
+                self._changed.notify_all()
+            raise
+        session = AccountSession(key, account_file, context)
+        async with self._changed:
+            self._launching.discard(key)
+            session.leases += 1
+            self._sessions[key] = session
+            self._changed.notify_all()
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep())
+        return session
+
+    async def _checkin(self, session: AccountSession):
+        async with self._changed:
+            session.leases -= 1
+            session.last_used = time.monotonic()
+            self._changed.notify_all()
+
+    @asynccontextmanager
+    async def page(self, account_file, platform: str, executable_path=None, viewport=None, stealth=True):
+        """租用账号会话中的一个新页面，退出时关闭页面、保留上下文"""
+        session = await self._checkout(account_file, platform, executable_path=executable_path,
+                                       viewport=viewport, stealth=stealth)
+        try:
+            async with session.lock:
+                await session.load_cookies()
+                page = await session.context.new_page()
+                # 常驻上下文不用 context.route（会关闭 HTTP 缓存），在页面上用 CDP 拦截统计上报
+                await block_page_requests(session.context, page, platform)
+                try:
+                    yield page
+                finally:
+                    try:
+                        await page.close()
+                    except Exception:
+                        pass
+        finally:
+            await self._checkin(session)
+
+    def _detach(self, session: AccountSession):
+        """（持有锁时调用）把会话移出常驻列表并标记为关闭中，随后在锁外调用 _close_session"""
+        self._sessions.pop(session.key, None)
+        self._closing.add(session.key)
+
+    async def _close_session(self, session: AccountSession):
+        """保存 cookie 并关闭已 _detach 的会话，完成后同一账号才能重新启动"""
+        try:
+            if not session.closed:
+                await session.save_cookies()
+                try:
+                    await session.context.close()
+                except Exception as e:
+                    print(f"⚠️ 账号会话: 关闭上下文失败: {e}")
+            print(f"🔒 账号会话: 已关闭 {Path(session.account_file).name}")
+        finally:
+            async with self._changed:
+                self._closing.discard(session.key)
+                self._changed.notify_all()
+
+    async def _sweep(self):
+        """定期保存 cookie，关闭空闲超时的会话"""
+        while True:
+            await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+            now = time.monotonic()
+            async with self._changed:
+                expired = []
+                for session in list(self._sessions.values()):
+                    if session.closed:
+                        self._sessions.pop(session.key, None)
+                    elif not session.leases and now - session.last_used > self.idle_timeout:
+                        self._detach(session)
+                        expired.append(session)
+                if expired:
+                    self._changed.notify_all()
+            for session in expired:
+                try:
+                    await self._close_session(session)
+                except Exception as e:
+                    print(f"⚠️ 账号会话: 维护失败: {e}")
+            for session in list(self._sessions.values()):
+                if not session.closed and now - session.last_saved > self.save_interval:
+                    await session.save_cookies()
+
+    async def close(self):
+        """保存全部会话的 cookie 并关闭浏览器"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+        async with self._changed:
+            sessions = list(self._sessions.values())
+            for session in sessions:
+                self._detach(session)
+        for session in sessions:
+            await self._close_session(session)
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+# 事件循环 -> 会话管理器；Playwright 对象只能在创建它的事件循环中使用
+_managers = {}
+
+
+@asynccontextmanager
+async def session_scope(max_contexts: int = SESSION_MAX_CONTEXTS):
+    """在当前事件循环中启用账号会话复用，退出时保存 cookie 并关闭全部会话（嵌套调用时由最外层负责关闭）"""
+    loop = asyncio.get_running_loop()
+    if not ACCOUNT_SESSIONS or loop in _managers:
+        yield _managers.get(loop)
+        return
+    manager = _managers[loop] = AccountSessionManager(max_contexts)
+    try:
+        yield manager
+    finally:
+        _managers.pop(loop, None)
+        await manager.close()
+
+
+@asynccontextmanager
+async def account_page(account_file, platform: str, executable_path=None, viewport=None, stealth=True):
+    """
+    上传器使用的页面：在 session_scope() 内从账号会话中租用，
+    否则按次启动浏览器、创建上下文，上传成功后保存 cookie 并关闭浏览器
+    """
+    manager = _managers.get(asyncio.get_running_loop())
+    if manager is not None:
+        async with manager.page(account_file, platform, executable_path, viewport, stealth) as page:
+            yield page
+        return
+
+    async with async_playwright() as playwright:
+        browser = await launch_browser(playwright, platform, executable_path)
+        options = {"viewport": viewport} if viewport else {}
+        context = await browser.new_context(storage_state=str(account_file), **options)
+        if stealth:
+            context = await set_init_script(context)
+        context = await apply_route_policy(context, platform)
+        try:
+            yield await context.new_page()
+            await context.storage_state(path=str(account_file))
+        finally:
+            await context.close()
+            await browser.close()
@@ -0,0 +1,44 @@
+# utils/background_loop.py
+"""
+后台常驻事件循环 - 每个循环运行在独立的守护线程中
+浏览器池、登录、调度等长生命周期的异步组件共享这些循环，不随单次请求的事件循环销毁
+"""
+import asyncio
+import threading
+
+_loops = {}
+_lock = threading.Lock()
+
+
+def get_background_loop(name: str = "default") -> asyncio.AbstractEventLoop:
+    """获取（必要时启动）指定名称的后台事件循环"""
+    with _lock:
+        loop = _loops.get(name)
+        if loop is None or loop.is_closed():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name=f"sau-loop-{name}", daemon=True)
+            thread.start()
+            _loops[name] = loop
+        return loop
+
+
+def submit(coro, name: str = "default"):
+    """把协程提交到后台循环，返回 concurrent.futures.Future"""
+    return asyncio.run_coroutine_threadsafe(coro, get_background_loop(name))
+
+
+async def run_in_background(coro, name: str = "default"):
+    """在任意事件循环中等待后台循环上执行的协程结果"""
+    loop = get_background_loop(name)
+    try:
+        current_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        current_loop = None
+    if current_loop is loop:
+        return await coro
+    return await asyncio.wrap_future(submit(coro, name))
+
+
+def run_sync(coro, name: str = "default", timeout: float = None):
+    """在同步代码中阻塞等待后台循环上的协程结果"""
+    return submit(coro, name).result(timeout)
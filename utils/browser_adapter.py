@@ -1,146 +1,197 @@
 # utils/browser_adapter.py
-import requests
-from typing import Optional, Dict, Any
+"""
+multi-account-browser HTTP API 客户端
+基于 aiohttp 的异步实现：同一个事件循环内的所有适配器共享连接池（keep-alive），
+每次调用单独设置超时，连接失败 / 5xx 网关错误按指数退避重试（非幂等的 POST 默认只在连接未建立时重试），
+长轮询（如 wait_for_url_change）不会再阻塞整个事件循环，一个循环可以同时驱动多个标签页
+"""
+import asyncio
 import os
 from pathlib import Path
+from typing import Optional, Dict, Any
 from urllib.parse import urlparse
-#import hashlib
+
+import aiohttp
+
+from utils.file_handoff import register_file
+
+# 每个事件循环共享的连接池上限
+ADAPTER_POOL_LIMIT = 32
+# 默认重试次数与退避基数（秒）
+ADAPTER_RETRIES = 2
+ADAPTER_BACKOFF = 0.5
+# 可重试的网关类状态码
+RETRY_STATUSES = {502, 503, 504}
+AVATAR_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# 共享的 ClientSession 保存在事件循环对象上（aiohttp 会话不能跨事件循环使用），随循环一起释放，
+# 不放在模块级字典里：会话引用着自己的循环，按 loop 做键的弱引用字典永远不会过期
+_SESSION_ATTR = "_sau_adapter_session"
+
+
+def _get_session() -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    session = getattr(loop, _SESSION_ATTR, None)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=ADAPTER_POOL_LIMIT, keepalive_timeout=60)
+        session = aiohttp.ClientSession(connector=connector)
+        setattr(loop, _SESSION_ATTR, session)
+    return session
+
+
+async def close_adapter_session():
+    """关闭当前事件循环的共享会话（短生命周期的事件循环结束前调用）"""
+    loop = asyncio.get_running_loop()
+    session = getattr(loop, _SESSION_ATTR, None)
+    setattr(loop, _SESSION_ATTR, None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def run_with_adapter_session(main):
+    """asyncio.run(main) 的替代：循环结束前关闭该循环的共享会话，按次 asyncio.run 的入口使用"""
+    async def _run():
+        try:
+            return await main
+        finally:
+            await close_adapter_session()
+    return asyncio.run(_run())
 
 
 class MultiAccountBrowserAdapter:
     
-    def __init__(self, api_base_url: str = "http://localhost:3000/api"):
+    def __init__(self, api_base_url: str = "http://localhost:3000/api", retries: int = ADAPTER_RETRIES, backoff: float = ADAPTER_BACKOFF):
         self.api_base_url = api_base_url
-        self.session = requests.Session()
-        self.session.headers.update({'Content-Type': 'application/json'})
+        self.retries = retries
+        self.backoff = backoff
 
-    def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None, timeout: int = 60) -> Dict[str, Any]:
-        """统一的API请求方法"""
+    async def _make_request(self, method: str, endpoint: str, data: Optional[Dict] = None, timeout: int = 60, retries: int = None) -> Dict[str, Any]:
+        """
+        统一的API请求方法
+        GET 默认按 self.retries 重试；POST 可能不是幂等的（创建标签页、保存 cookie 等），默认不重试，
+        只读的 POST 由调用方传 retries 显式开启。连接尚未建立就失败时请求没有发出，任何方法都按 self.retries 重试
+        """
         url = f"{self.api_base_url}{endpoint}"
-        
-        try:
-            if method.upper() == 'GET':
-                response = self.session.get(url, timeout=timeout)
-            else:
-                response = self.session.post(url, json=data, timeout=timeout)
-            
-            response.raise_for_status()
-            return response.json()
-            
-        except requests.exceptions.ConnectionError as e:
-            raise Exception(f"连接失败: 请确保 multi-account-browser 正在运行")
-        except requests.exceptions.Timeout as e:
-            raise Exception(f"请求超时: {e}")
-        except requests.exceptions.RequestException as e:
-            raise Exception(f"API请求失败: {e}")
+        if retries is None:
+            retries = self.retries if method.upper() == 'GET' else 0
+        connect_retries = max(retries, self.retries)
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
+
+        for attempt in range(connect_retries + 1):
+            try:
+                session = _get_session()
+                if method.upper() == 'GET':
+                    request = session.get(url, timeout=client_timeout)
+                else:
+                    request = session.post(url, json=data, timeout=client_timeout)
+
+                async with request as response:
+                    if response.status in RETRY_STATUSES and attempt < retries:
+                        await asyncio.sleep(self.backoff * (2 ** attempt))
+                        continue
+                    response.raise_for_status()
+                    return await response.json(content_type=None)
+
+            except aiohttp.ClientConnectorError:
+                # 没有建立连接，请求未发出
+                if attempt < connect_retries:
+                    await asyncio.sleep(self.backoff * (2 ** attempt))
+                    continue
+                raise Exception(f"连接失败: 请确保 multi-account-browser 正在运行")
+            except aiohttp.ClientConnectionError as e:
+                # 请求可能已经发出（如 ServerDisconnected），只有允许重试的请求才重发
+                if attempt < retries:
+                    await asyncio.sleep(self.backoff * (2 ** attempt))
+                    continue
+                raise Exception(f"API连接中断: {url} ({e})")
+            except asyncio.TimeoutError:
+                raise Exception(f"请求超时: {url} ({timeout}s)")
+            except aiohttp.ClientError as e:
+                raise Exception(f"API请求失败: {e}")
     
     async def get_qr_code(self, tab_id: str, selector: str) -> Optional[str]:
         """获取页面中的二维码图片URL"""
-        result = self._make_request('POST', '/account/get-qrcode', {
+        result = await self._make_request('POST', '/account/get-qrcode', {
             "tabId": tab_id, "selector": selector
-        })
+        }, retries=self.retries)
         return result["data"]["qrUrl"] if result.get("success") else None
 
     async def wait_for_url_change(self, tab_id: str, timeout: int = 200000) -> bool:
-        """等待页面URL变化"""
-        result = self._make_request('POST', '/account/wait-url-change', {
+        """等待页面URL变化（长轮询，不阻塞事件循环）"""
+        result = await self._make_request('POST', '/account/wait-url-change', {
             "tabId": tab_id, "timeout": timeout
         }, timeout=timeout//1000 + 10)
         return result.get("data", {}).get("urlChanged", False)
     
-    def extract_page_elements(self, tab_id: str, selectors: dict) -> dict:
+    async def extract_page_elements(self, tab_id: str, selectors: dict) -> dict:
         """通用页面元素提取"""
-        result = self._make_request('POST', '/account/extract-elements', {
+        result = await self._make_request('POST', '/account/extract-elements', {
             "tabId": tab_id,
             "selectors": selectors
-        })
+        }, retries=self.retries)
         return result.get("data", {}) if result.get("success") else {}
 
-    def get_account_info(self, tab_id: str, platform: str) -> dict:
+    async def get_account_info(self, tab_id: str, platform: str) -> dict:
         """获取账号信息"""
-        result = self._make_request('POST', '/automation/get-account-info', {
+        result = await self._make_request('POST', '/automation/get-account-info', {
             "tabId": tab_id,
             "platform": platform
-        })
+        }, retries=self.retries)
         return result.get("data", {}) if result.get("success") else {}
 
-    def get_platform_selectors(self, platform: str) -> dict:
+    async def get_platform_selectors(self, platform: str) -> dict:
         """获取平台选择器配置（调试用）"""
-        result = self._make_request('GET', f'/account/platform-selectors/{platform}')
+        result = await self._make_request('GET', f'/account/platform-selectors/{platform}')
         return result.get("data", {}) if result.get("success") else {}
     
-    def download_avatar_with_curl(self, avatar_url: str, platform: str, account_name: str, account_id: str = None) -> str:
-        """使用curl下载头像"""
+    async def download_avatar(self, avatar_url: str, platform: str, account_name: str, account_id: str = None, base_dir: str = ".") -> str:
+        """下载用户头像到 base_dir 下的前端资源目录，失败时返回原始URL"""
+        if not avatar_url or not avatar_url.startswith('http'):
+            return None
+
         try:
-            import subprocess
-            import shlex
-            
-            # 创建目录
             safe_account_name = "".join(c for c in account_name if c.isalnum() or c in (' ', '-', '_')).strip()
             safe_account_id = "".join(c for c in (account_id or '')) if account_id else ''
-            
+
             if safe_account_id:
                 folder_name = f"{safe_account_name}_{safe_account_id}"
             else:
                 folder_name = safe_account_name
-                
-            avatar_dir = Path("sau_frontend/src/assets/avatar") / platform / folder_name
+
+            # 直接拼接绝对路径，不再 os.chdir（进程级状态，并发登录时会互相干扰）
+            avatar_dir = Path(base_dir) / "sau_frontend/src/assets/avatar" / platform / folder_name
             avatar_dir.mkdir(parents=True, exist_ok=True)
-            
-            # 生成文件名
-            from urllib.parse import urlparse
+
             parsed_url = urlparse(avatar_url)
             file_ext = os.path.splitext(parsed_url.path)[1] or '.jpg'
             avatar_filename = f"avatar{file_ext}"
             avatar_path = avatar_dir / avatar_filename
-            
-            # 使用curl下载
-            cmd = [
-                'curl', 
-                '-L',  # 跟随重定向
-                '-k',  # 忽略SSL证书错误
-                '--user-agent', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                '--max-time', '10',
-                '--output', str(avatar_path),
-                avatar_url
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
-            
-            if result.returncode == 0 and avatar_path.exists() and avatar_path.stat().st_size > 0:
+
+            async with _get_session().get(
+                avatar_url,
+                headers={'User-Agent': AVATAR_USER_AGENT},
+                timeout=aiohttp.ClientTimeout(total=10),
+                ssl=False
+            ) as response:
+                response.raise_for_status()
+                content = await response.read()
+
+            if content:
+                avatar_path.write_bytes(content)
                 relative_path = f"assets/avatar/{platform}/{folder_name}/{avatar_filename}"
-                print(f"✅ 头像已保存(curl): {relative_path}")
+                print(f"✅ 头像已保存: {relative_path}")
                 return relative_path
-            else:
-                print(f"❌ curl下载失败: {result.stderr}")
-                return None
-                
         except Exception as e:
-            print(f"❌ curl下载异常: {e}")
-            return None
+            print(f"❌ 头像下载失败: {e}")
 
-    def download_avatar(self, avatar_url: str, platform: str, account_name: str, account_id: str = None) -> str:
-        """下载用户头像到本地 - 多重备用方案"""
-        if not avatar_url or not avatar_url.startswith('http'):
-            return None
-        
-        # 方案1：尝试curl
-        try:
-            result = self.download_avatar_with_curl(avatar_url, platform, account_name, account_id)
-            if result:
-                return result
-        except:
-            pass
-        
-        # 方案2：返回原始URL
         print(f"⚠️ 无法下载头像文件，返回原始URL: {avatar_url}")
         return avatar_url
 
-    def get_account_info_with_avatar(self, tab_id: str, platform: str, base_dir: str) -> dict:
+    async def get_account_info_with_avatar(self, tab_id: str, platform: str, base_dir: str) -> dict:
         """🔥 获取账号信息并下载头像（仅数据获取，不保存数据库）"""
         try:
             # 获取账号信息
-            account_info = self.get_account_info(tab_id, platform)
+            account_info = await self.get_account_info(tab_id, platform)
             
             if not account_info or not account_info.get('accountName'):
                 print("⚠️ 未获取到账号信息")
@@ -149,21 +200,13 @@ class MultiAccountBrowserAdapter:
             # 下载头像
             avatar_url = account_info.get('avatar')
             if avatar_url:
-                original_cwd = os.getcwd()
-                try:
-                    os.chdir(base_dir)
-                    local_avatar_path = self.download_avatar(
-                        avatar_url, 
-                        platform, 
-                        account_info.get('accountName'),
-                        account_info.get('accountId')
-                    )
-                    account_info['localAvatar'] = local_avatar_path
-                except Exception as e:
-                    print(f"❌ 头像下载失败: {e}")
-                    account_info['localAvatar'] = None
-                finally:
-                    os.chdir(original_cwd)
+                account_info['localAvatar'] = await self.download_avatar(
+                    avatar_url,
+                    platform,
+                    account_info.get('accountName'),
+                    account_info.get('accountId'),
+                    base_dir
+                )
             else:
                 account_info['localAvatar'] = None
             
@@ -178,7 +221,7 @@ class MultiAccountBrowserAdapter:
         """创建账号标签页"""
         print(f"🚀 创建标签页: {account_name} ({platform}) -> {initial_url}")
         
-        result = self._make_request('POST', '/account/create', {
+        result = await self._make_request('POST', '/account/create', {
             "accountName": account_name,
             "platform": platform,
             "initialUrl": initial_url
@@ -191,22 +234,6 @@ class MultiAccountBrowserAdapter:
         else:
             raise Exception(f"创建标签页失败: {result.get('error')}")
 
-    async def get_or_create_tab(self, cookie_file: str, platform: str, initial_url: str, tab_name_prefix: str = None) -> str:
-        """
-        获取或创建标签页 - 通用方法
-        
-        Args:
-            cookie_file: Cookie文件路径/名称，用作标识符
-            platform: 平台名称 (xiaohongshu, wechat, douyin, kuaishou)
-            initial_url: 初始URL
-            tab_name_prefix: 标签页名称前缀，如 "视频号_", "抖音_"
-        
-        Returns:
-            str: 标签页ID
-        """
-        from utils.common import get_account_info_from_db  # 导入已有函数
-        
-
     async def get_or_create_tab(self, cookie_file: str, platform: str, initial_url: str, tab_name_prefix: str = None) -> str:
         """
         获取或创建标签页 - 通用方法
@@ -276,7 +303,7 @@ class MultiAccountBrowserAdapter:
 
     async def switch_to_tab(self, tab_id: str) -> bool:
         """切换到指定标签页"""
-        result = self._make_request('POST', '/account/switch', {"tabId": tab_id})
+        result = await self._make_request('POST', '/account/switch', {"tabId": tab_id})
         success = result.get("success", False)
         if success:
             print(f"🔄 切换到标签页: {tab_id}")
@@ -284,7 +311,7 @@ class MultiAccountBrowserAdapter:
 
     async def close_tab(self, tab_id: str) -> bool:
         """关闭标签页"""
-        result = self._make_request('POST', '/account/close', {"tabId": tab_id})
+        result = await self._make_request('POST', '/account/close', {"tabId": tab_id})
         success = result.get("success", False)
         if success:
             print(f"🗑️ 标签页已关闭: {tab_id}")
@@ -292,7 +319,7 @@ class MultiAccountBrowserAdapter:
 
     async def navigate_tab(self, tab_id: str, url: str) -> bool:
         """导航到指定URL"""
-        result = self._make_request('POST', '/account/navigate', {
+        result = await self._make_request('POST', '/account/navigate', {
             "tabId": tab_id,
             "url": url
         })
@@ -304,13 +331,13 @@ class MultiAccountBrowserAdapter:
 
     async def refresh_tab(self, tab_id: str) -> bool:
         """刷新页面"""
-        result = self._make_request('POST', '/account/refresh', {"tabId": tab_id})
+        result = await self._make_request('POST', '/account/refresh', {"tabId": tab_id})
         return result.get("success", False)
 
     # 脚本执行
     async def execute_script(self, tab_id: str, script: str) -> Any:
         """在指定标签页执行脚本"""
-        result = self._make_request('POST', '/account/execute', {
+        result = await self._make_request('POST', '/account/execute', {
             "tabId": tab_id, 
             "script": script
         })
@@ -324,7 +351,7 @@ class MultiAccountBrowserAdapter:
     # Cookie 管理
     async def load_cookies(self, tab_id: str, cookie_file: str) -> bool:
         """加载 cookies"""
-        result = self._make_request('POST', '/account/load-cookies', {
+        result = await self._make_request('POST', '/account/load-cookies', {
             "tabId": tab_id,
             "cookieFile": str(cookie_file)
         })
@@ -336,7 +363,7 @@ class MultiAccountBrowserAdapter:
 
     async def save_cookies(self, tab_id: str, cookie_file: str) -> bool:
         """保存 cookies"""
-        result = self._make_request('POST', '/account/save-cookies', {
+        result = await self._make_request('POST', '/account/save-cookies', {
             "tabId": tab_id,
             "cookieFile": str(cookie_file)
         })
@@ -348,11 +375,17 @@ class MultiAccountBrowserAdapter:
 
     # 文件上传
     async def upload_file(self, tab_id: str, selector: str, file_path: str, options: Optional[Dict] = None) -> bool:
-        """统一文件上传入口 - 使用流式上传"""
-        result = self._make_request('POST', '/account/set-files-streaming-v2', {
+        """
+        统一文件上传入口 - 使用流式上传
+        先登记文件句柄：浏览器端拿到确定的路径、大小和摘要，不必再 stat / 读取整个文件计算，
+        也可以通过 fileHandle.url 按 Range 并行拉取
+        """
+        handle = await asyncio.to_thread(register_file, file_path)
+        result = await self._make_request('POST', '/account/set-files-streaming-v2', {
             "tabId": tab_id,
             "selector": selector,
-            "filePath": str(file_path),
+            "filePath": handle["path"],
+            "fileHandle": handle,
             "options": options or {}
         })
         return result.get("success", False)
@@ -360,11 +393,11 @@ class MultiAccountBrowserAdapter:
     # 状态查询
     async def get_all_tabs(self) -> Dict:
         """获取所有标签页"""
-        return self._make_request('GET', '/accounts')
+        return await self._make_request('GET', '/accounts')
 
     async def get_tab_status(self, tab_id: str) -> Dict:
         """获取标签页状态"""
-        return self._make_request('GET', f'/account/{tab_id}/status')
+        return await self._make_request('GET', f'/account/{tab_id}/status')
 
     async def get_page_url(self, tab_id: str) -> str:
         """获取当前页面URL"""
@@ -0,0 +1,120 @@
+# utils/browser_pool.py
+"""
+常驻 Chromium 浏览器池 - 用于 cookie 校验
+一个热启动的无头浏览器为每次校验创建隔离的上下文（加载 storage_state），
+浏览器每服务 max_uses 个上下文后回收重建，避免长时间运行导致内存膨胀
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+
+from utils.background_loop import run_in_background
+from utils.base_social_media import set_init_script
+
+# 浏览器池所在的后台事件循环名称
+BROWSER_POOL_LOOP = "browser_pool"
+# 单个浏览器实例服务多少个上下文后回收
+BROWSER_POOL_MAX_USES = 50
+# 同时存在的上下文数量上限
+BROWSER_POOL_MAX_CONTEXTS = 8
+
+
+class BrowserPool:
+    def __init__(self, max_uses: int = BROWSER_POOL_MAX_USES, max_contexts: int = BROWSER_POOL_MAX_CONTEXTS, headless: bool = True):
+        self.max_uses = max_uses
+        self.headless = headless
+        self._semaphore = asyncio.Semaphore(max_contexts)
+        self._lock = asyncio.Lock()
+        self._playwright = None
+        self._browser = None
+        self._uses = 0
+        # 浏览器实例 -> 正在使用的上下文数量（包括已退役但尚未关闭的实例）
+        self._active = {}
+
+    async def _acquire_browser(self):
+        async with self._lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            if self._browser is not None and (self._uses >= self.max_uses or not self._browser.is_connected()):
+                await self._retire_current()
+            if self._browser is None:
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+                self._active[self._browser] = 0
+                self._uses = 0
+                print("🌐 浏览器池: 已启动新的 Chromium 实例")
+            self._uses += 1
+            self._active[self._browser] += 1
+            return self._browser
+
+    async def _retire_current(self):
+        """退役当前浏览器：没有在用的上下文就立即关闭，否则等最后一个上下文释放时关闭"""
+        browser = self._browser
+        self._browser = None
+        if self._active.get(browser, 0) == 0:
+            self._active.pop(browser, None)
+            await self._close_browser(browser)
+
+    async def _release_browser(self, browser):
+        self._active[browser] -= 1
+        if browser is not self._browser and self._active[browser] == 0:
+            self._active.pop(browser, None)
+            await self._close_browser(browser)
+
+    @staticmethod
+    async def _close_browser(browser):
+        try:
+            await browser.close()
+        except Exception as e:
+            print(f"⚠️ 浏览器池: 关闭浏览器失败: {e}")
+
+    @asynccontextmanager
+    async def context(self, storage_state=None, **kwargs):
+        """获取一个隔离的浏览器上下文，退出时自动关闭"""
+        async with self._semaphore:
+            browser = await self._acquire_browser()
+            context = None
+            try:
+                context = await browser.new_context(storage_state=storage_state, **kwargs)
+                context = await set_init_script(context)
+                yield context
+            finally:
+                if context is not None:
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+                await self._release_browser(browser)
+
+    async def close(self):
+        async with self._lock:
+            for browser in list(self._active):
+                await self._close_browser(browser)
+            self._active.clear()
+            self._browser = None
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+
+_pool = None
+
+
+def get_browser_pool() -> BrowserPool:
+    """获取全局浏览器池（只能在浏览器池的后台事件循环中使用）"""
+    global _pool
+    if _pool is None:
+        _pool = BrowserPool()
+    return _pool
+
+
+async def run_with_context(storage_state, func):
+    """
+    在浏览器池中打开一个隔离上下文并执行 func(context)
+    可以在任意事件循环中调用，实际执行发生在浏览器池的后台循环上
+    """
+    async def _run():
+        async with get_browser_pool().context(storage_state=storage_state) as context:
+            return await func(context)
+
+    return await run_in_background(_run(), BROWSER_POOL_LOOP)
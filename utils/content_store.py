@@ -0,0 +1,206 @@
+# utils/content_store.py
+"""
+内容寻址的视频存储 - videoFile/blobs/<sha256 前两位>/<sha256><扩展名>
+- 上传时边写入边计算 SHA-256，相同内容只保存一份 blob
+- file_records 通过 digest 引用 blob，blobs 表记录引用计数，最后一个引用删除时才删除磁盘文件
+- 已知 digest 的文件再次上传可以直接引用已有 blob（秒传）
+file_records.file_path 保存相对 videoFile/ 的路径（blobs/ab/abcd....mp4），发布流程无需改动
+"""
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from conf import BASE_DIR
+from utils import database
+
+VIDEO_DIR = Path(BASE_DIR / "videoFile")
+BLOB_DIR = VIDEO_DIR / "blobs"
+TMP_DIR = BLOB_DIR / ".tmp"
+# 流式写入 / 计算摘要的块大小
+HASH_BUFFER_SIZE = 1024 * 1024
+
+BLOB_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+)
+'''
+
+_table_ready = False
+_table_lock = threading.Lock()
+# 按 digest 组织的派生文件目录（转码结果、封面等），blob 删除时一并清理 <目录>/<digest>
+_derived_dirs = []
+
+
+def register_derived_dir(path: Path):
+    if path not in _derived_dirs:
+        _derived_dirs.append(path)
+
+
+def init_store():
+    """创建 blobs 表、给 file_records 补 digest 列（幂等）"""
+    global _table_ready
+    if _table_ready:
+        return
+    with _table_lock:
+        if _table_ready:
+            return
+        with database.transaction() as conn:
+            conn.execute(BLOB_TABLE_SQL)
+        database.ensure_columns('file_records', {'digest': 'TEXT'})
+        database.execute('CREATE INDEX IF NOT EXISTS idx_file_records_digest ON file_records(digest)')
+        TMP_DIR.mkdir(parents=True, exist_ok=True)
+        _table_ready = True
+
+
+def blob_relpath(digest: str, ext: str) -> str:
+    """blob 相对 videoFile/ 的路径"""
+    return f"blobs/{digest[:2]}/{digest}{ext.lower()}"
+
+
+def _ext(filename: str) -> str:
+    return Path(filename).suffix.lower()
+
+
+def get_blob(digest: str):
+    init_store()
+    return database.query_one("SELECT * FROM blobs WHERE digest = ?", (digest.lower(),))
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BUFFER_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def path_digest(path) -> str:
+    """素材库中的文件直接使用记录的 digest，其他文件现场计算（可能读取整个文件，异步调用方应放到线程中执行）"""
+    try:
+        relpath = Path(path).resolve().relative_to(VIDEO_DIR.resolve()).as_posix()
+        row = database.query_one("SELECT digest FROM file_records WHERE file_path = ? AND digest IS NOT NULL LIMIT 1",
+                                 (relpath,))
+        if row:
+            return row["digest"]
+    except ValueError:
+        pass
+    return file_digest(Path(path))
+
+
+def _commit_blob(tmp_path: Path, digest: str, size: int, filename: str, record: bool) -> dict:
+    """
+    把临时文件登记为 blob（内容已存在时丢弃临时文件），record=True 时在同一事务中写入素材库记录并增加引用计数
+    返回 {digest, size, path, id}
+    """
+    relpath = blob_relpath(digest, _ext(filename))
+    with database.transaction() as conn:
+        row = conn.execute("SELECT path FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if row is None:
+            target = VIDEO_DIR / relpath
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, target)
+            conn.execute('''
+                INSERT INTO blobs (digest, size, path, ref_count, created_at) VALUES (?, ?, ?, 0, ?)
+            ''', (digest, size, relpath, time.time()))
+        else:
+            relpath = row["path"]
+            existing = VIDEO_DIR / relpath
+            if existing.exists():
+                tmp_path.unlink(missing_ok=True)
+            else:
+                # 磁盘文件被手动删除过，用这次上传的内容补回
+                existing.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, existing)
+        file_id = _add_reference(conn, filename, digest, size, relpath) if record else None
+    return {"digest": digest, "size": size, "path": relpath, "id": file_id}
+
+
+def _add_reference(conn, filename: str, digest: str, size: int, relpath: str) -> int:
+    file_id = database.insert_file(filename, round(float(size) / (1024 * 1024), 2), relpath, digest)
+    conn.execute("UPDATE blobs SET ref_count = ref_count + 1 WHERE digest = ?", (digest,))
+    return file_id
+
+
+def store_stream(stream, filename: str, record: bool = True) -> dict:
+    """从流中读取文件，边写临时文件边计算 SHA-256，写完后登记为 blob，返回 {digest, size, path, id}"""
+    init_store()
+    tmp_path = TMP_DIR / uuid.uuid4().hex
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as f:
+            for block in iter(lambda: stream.read(HASH_BUFFER_SIZE), b""):
+                f.write(block)
+                digest.update(block)
+                size += len(block)
+        return _commit_blob(tmp_path, digest.hexdigest(), size, filename, record)
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def store_file(path: Path, filename: str, digest: str = None, record: bool = True) -> dict:
+    """把已经落盘的文件（如分片上传合并结果）移动进存储；digest 未知时读取一遍计算"""
+    init_store()
+    digest = (digest or file_digest(path)).lower()
+    return _commit_blob(Path(path), digest, os.path.getsize(path), filename, record)
+
+
+def add_file_record(filename: str, digest: str, size: int = None):
+    """
+    秒传：内容已存在时直接新增引用该 blob 的素材库记录，返回 {digest, size, path, id}
+    blob 不存在（或大小与 size 不一致）时返回 None
+    """
+    init_store()
+    digest = digest.lower()
+    with database.transaction() as conn:
+        blob = conn.execute("SELECT size, path FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        if blob is None or not (VIDEO_DIR / blob["path"]).exists():
+            return None
+        if size is not None and blob["size"] != size:
+            return None
+        file_id = _add_reference(conn, filename, digest, blob["size"], blob["path"])
+    return {"digest": digest, "size": blob["size"], "path": blob["path"], "id": file_id}
+
+
+def release_file_record(record: dict):
+    """
+    删除素材库记录；引用计数归零时删除 blob 和磁盘文件
+    没有 digest 的旧记录（uuid_文件名）在没有其他记录引用同一文件时直接删除磁盘文件
+    """
+    init_store()
+    unlink_path = None
+    with database.transaction() as conn:
+        conn.execute("DELETE FROM file_records WHERE id = ?", (record["id"],))
+        digest = record.get("digest")
+        if digest:
+            conn.execute("UPDATE blobs SET ref_count = ref_count - 1 WHERE digest = ?", (digest,))
+            blob = conn.execute("SELECT path, ref_count FROM blobs WHERE digest = ?", (digest,)).fetchone()
+            if blob and blob["ref_count"] <= 0:
+                conn.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+                unlink_path = blob["path"]
+        elif record.get("file_path"):
+            shared = conn.execute("SELECT 1 FROM file_records WHERE file_path = ? LIMIT 1",
+                                  (record["file_path"],)).fetchone()
+            if shared is None:
+                unlink_path = record["file_path"]
+
+    if unlink_path and digest:
+        for derived_dir in _derived_dirs:
+            shutil.rmtree(derived_dir / digest, ignore_errors=True)
+    if unlink_path:
+        target = (VIDEO_DIR / unlink_path).resolve()
+        if VIDEO_DIR.resolve() in target.parents:
+            try:
+                target.unlink(missing_ok=True)
+                print(f"🗑️ 已删除视频文件: {unlink_path}")
+            except OSError as e:
+                print(f"⚠️ 删除视频文件失败 {unlink_path}: {e}")
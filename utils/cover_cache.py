@@ -0,0 +1,183 @@
+# utils/cover_cache.py
+"""
+视频封面缓存 - 从视频关键帧中挑选有代表性的一帧，生成各平台尺寸的封面
+- 只解码关键帧（-skip_frame nokey），在整段视频上均匀抽取 COVER_SAMPLE_FRAMES 个关键帧，
+  由 ffmpeg thumbnail 滤镜按颜色直方图选出最接近平均画面的一帧（避开片头黑场、转场帧）
+- 结果按源文件 digest 缓存在 videoFile/.covers/<digest>/ 下：frame.jpg 为原尺寸代表帧，<宽>x<高>.jpg 为平台封面
+- 抽帧在有上限的线程池中执行，同一视频的并发请求共用一次抽帧
+- 调用方未指定封面时，抖音 / TikTok 上传器自动使用缓存封面；未安装 ffmpeg、抽帧失败或设置封面失败时保持平台默认封面
+- 只为 COVER_SIZES 中的平台生成封面（小红书上传器没有可用的封面设置流程，不在其中）
+"""
+import asyncio
+import os
+import shutil
+import subprocess
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, Future
+from pathlib import Path
+
+import conf
+from conf import BASE_DIR
+from utils import content_store
+from utils.base_social_media import SOCIAL_MEDIA_DOUYIN, SOCIAL_MEDIA_TIKTOK
+from utils.video_probe import get_video_metadata
+
+VIDEO_DIR = Path(BASE_DIR / "videoFile")
+COVER_DIR = VIDEO_DIR / ".covers"
+FFMPEG_PATH = getattr(conf, "FFMPEG_PATH", None) or "ffmpeg"
+# 调用方未指定封面时是否自动生成，可在 conf.py 中用 AUTO_COVER = False 关闭
+AUTO_COVER = getattr(conf, "AUTO_COVER", True)
+# 同时运行的抽帧 ffmpeg 进程数（只解码关键帧，开销很小）
+COVER_WORKERS = 2
+# 参与挑选的关键帧数量
+COVER_SAMPLE_FRAMES = 30
+# 跳过片头 / 片尾的比例
+COVER_EDGE_RATIO = 0.05
+# 单次抽帧超时（秒）
+COVER_TIMEOUT = 120
+
+# 平台封面尺寸（宽, 高），可用 COVER_SIZES 覆盖
+COVER_SIZES = {
+    SOCIAL_MEDIA_DOUYIN: (1080, 1440),  # 竖封面 3:4
+    SOCIAL_MEDIA_TIKTOK: (1080, 1920),  # 9:16
+}
+COVER_SIZES.update(getattr(conf, "COVER_SIZES", {}))
+
+# 源文件的 blob 删除时清理对应的封面
+content_store.register_derived_dir(COVER_DIR)
+
+
+class CoverError(Exception):
+    """ffmpeg 抽帧 / 生成封面失败"""
+
+
+_warned_missing = False
+
+
+def ffmpeg_available() -> bool:
+    global _warned_missing
+    if shutil.which(FFMPEG_PATH):
+        return True
+    if not _warned_missing:
+        print(f"⚠️ 未找到 ffmpeg（{FFMPEG_PATH}），跳过封面生成")
+        _warned_missing = True
+    return False
+
+
+def _run_ffmpeg(args: list):
+    try:
+        completed = subprocess.run([FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-y", *args],
+                                   capture_output=True, timeout=COVER_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        raise CoverError("抽帧超时")
+    if completed.returncode != 0:
+        message = completed.stderr.decode("utf-8", errors="replace").strip().splitlines()
+        raise CoverError(message[-1] if message else f"ffmpeg 退出码 {completed.returncode}")
+
+
+def _sample_command(source: Path, target: Path, duration) -> list:
+    """在 [片头, 片尾] 区间按固定间隔选取关键帧，thumbnail 滤镜从中挑出代表帧"""
+    start, interval = 0, 2
+    if duration:
+        start = duration * COVER_EDGE_RATIO
+        interval = max(duration * (1 - 2 * COVER_EDGE_RATIO) / COVER_SAMPLE_FRAMES, 0.04)
+    select = f"select='isnan(prev_selected_t)+gte(t-prev_selected_t\\,{interval:.3f})'"
+    return [
+        "-skip_frame", "nokey", "-ss", f"{start:.3f}", "-i", str(source),
+        "-vf", f"{select},thumbnail={COVER_SAMPLE_FRAMES}",
+        "-frames:v", "1", "-q:v", "2", str(target),
+    ]
+
+
+def _resize_command(frame: Path, target: Path, width: int, height: int) -> list:
+    """等比放大铺满目标尺寸后居中裁剪"""
+    return [
+        "-i", str(frame),
+        "-vf", f"scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height}",
+        "-frames:v", "1", "-q:v", "2", str(target),
+    ]
+
+
+def _write_atomic(target: Path, args_for):
+    """ffmpeg 先写临时文件再改名，其他进程不会读到半个文件"""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{uuid.uuid4().hex}.jpg")
+    try:
+        _run_ffmpeg(args_for(tmp))
+        if not tmp.exists() or tmp.stat().st_size == 0:
+            raise CoverError("没有抽取到视频帧")
+        os.replace(tmp, target)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+class CoverCache:
+    def __init__(self, workers: int = COVER_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sau-cover")
+        self._inflight = {}
+        # 可重入：生成很快结束时 done 回调会在 submit 所在线程里立即执行
+        self._lock = threading.RLock()
+
+    def cover_for(self, source, platform: str) -> Future:
+        """
+        返回 Future，结果为平台尺寸的封面路径（缓存中没有时抽帧生成）
+        需要计算源文件 digest，异步调用方应放到线程中执行
+        """
+        source = Path(source)
+        width, height = COVER_SIZES.get(platform, COVER_SIZES[SOCIAL_MEDIA_DOUYIN])
+        target = COVER_DIR / content_store.path_digest(source) / f"{width}x{height}.jpg"
+        if target.exists():
+            future = Future()
+            future.set_result(target)
+            return future
+        with self._lock:
+            inflight = self._inflight.get(target)
+            if inflight is None:
+                inflight = self._executor.submit(self._generate, source, target, width, height)
+                self._inflight[target] = inflight
+                inflight.add_done_callback(lambda _: self._forget(target))
+        return inflight
+
+    def _forget(self, target: Path):
+        with self._lock:
+            self._inflight.pop(target, None)
+
+    def _generate(self, source: Path, target: Path, width: int, height: int) -> Path:
+        if not ffmpeg_available():
+            raise CoverError(f"未找到 ffmpeg（{FFMPEG_PATH}）")
+        # 代表帧与平台无关，同一视频的不同尺寸共用；并发生成同一视频的不同尺寸时最多重复抽帧一次
+        frame = target.parent / "frame.jpg"
+        if not frame.exists():
+            metadata = get_video_metadata(source) or {}
+            _write_atomic(frame, lambda tmp: _sample_command(source, tmp, metadata.get("duration")))
+        _write_atomic(target, lambda tmp: _resize_command(frame, tmp, width, height))
+        print(f"🖼️ 封面已生成: {target.relative_to(VIDEO_DIR)}")
+        return target
+
+
+_cover_cache = None
+_cover_cache_lock = threading.Lock()
+
+
+def get_cover_cache() -> CoverCache:
+    global _cover_cache
+    with _cover_cache_lock:
+        if _cover_cache is None:
+            _cover_cache = CoverCache()
+    return _cover_cache
+
+
+async def resolve_cover(video, platform: str, thumbnail_path=None):
+    """
+    上传器使用的封面：调用方指定了 thumbnail_path 时原样返回，否则返回缓存封面；
+    关闭了 AUTO_COVER、平台不在 COVER_SIZES 中、未安装 ffmpeg 或生成失败时返回 None（使用平台默认封面）
+    """
+    if thumbnail_path or not AUTO_COVER or platform not in COVER_SIZES:
+        return thumbnail_path
+    try:
+        future = await asyncio.to_thread(get_cover_cache().cover_for, video, platform)
+        return str(await asyncio.wrap_future(future))
+    except Exception as e:
+        print(f"⚠️ 封面生成失败，使用平台默认封面 {Path(video).name}: {e}")
+        return None
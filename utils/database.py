@@ -0,0 +1,275 @@
+# utils/database.py
+"""
+SQLite 数据访问层
+- 每个线程复用一个连接（线程本地），不再每次请求重新 connect
+- WAL 日志模式 + busy_timeout，读写并发时不再出现 "database is locked"
+- user_info / account_groups / file_records 的常用查询封装，所有调用方统一走这里
+"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from conf import BASE_DIR
+
+DB_PATH = Path(BASE_DIR / "db" / "database.db")
+# 等待写锁的最长时间（毫秒）
+BUSY_TIMEOUT_MS = 10000
+
+_local = threading.local()
+
+
+def _connect() -> sqlite3.Connection:
+    # isolation_level=None：默认自动提交，读操作不持有锁；写操作通过 transaction() 显式开启事务
+    conn = sqlite3.connect(DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def get_connection() -> sqlite3.Connection:
+    """获取当前线程的数据库连接"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _connect()
+        _local.conn = conn
+        _local.depth = 0
+    return conn
+
+
+def close_connection():
+    """关闭当前线程的数据库连接（线程退出前可调用）"""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+@contextmanager
+def transaction():
+    """
+    写事务：BEGIN IMMEDIATE 提前拿到写锁，异常时回滚
+    支持嵌套，只有最外层负责提交
+    """
+    conn = get_connection()
+    if _local.depth == 0:
+        conn.execute("BEGIN IMMEDIATE")
+    _local.depth += 1
+    try:
+        yield conn
+    except Exception:
+        _local.depth -= 1
+        if _local.depth == 0:
+            conn.execute("ROLLBACK")
+        raise
+    else:
+        _local.depth -= 1
+        if _local.depth == 0:
+            conn.execute("COMMIT")
+
+
+def query(sql: str, params=()) -> list:
+    return get_connection().execute(sql, params).fetchall()
+
+
+def query_one(sql: str, params=()):
+    return get_connection().execute(sql, params).fetchone()
+
+
+def execute(sql: str, params=()) -> sqlite3.Cursor:
+    with transaction() as conn:
+        return conn.execute(sql, params)
+
+
+def executemany(sql: str, seq_of_params) -> sqlite3.Cursor:
+    with transaction() as conn:
+        return conn.executemany(sql, seq_of_params)
+
+
+def ensure_columns(table: str, columns: dict):
+    """缺失的列自动 ALTER TABLE 补齐（columns: 列名 -> 类型定义）"""
+    existing = {row[1] for row in query(f"PRAGMA table_info({table})")}
+    for column_name, column_type in columns.items():
+        if column_name not in existing:
+            try:
+                execute(f'ALTER TABLE {table} ADD COLUMN {column_name} {column_type}')
+            except sqlite3.OperationalError:
+                pass
+
+
+# ========================================
+# user_info
+# ========================================
+
+def list_accounts() -> list:
+    return query('''
+    SELECT id, type, filePath, userName, status, last_check_time, check_interval
+    FROM user_info''')
+
+
+def list_accounts_with_groups() -> list:
+    return query('''
+    SELECT u.id, u.type, u.filePath, u.userName, u.status, u.group_id,
+           u.last_check_time, u.check_interval,
+           g.name as group_name, g.color as group_color, g.icon as group_icon
+    FROM user_info u
+    LEFT JOIN account_groups g ON u.group_id = g.id
+    ''')
+
+
+def get_account(account_id):
+    return query_one("SELECT * FROM user_info WHERE id = ?", (account_id,))
+
+
+def get_account_by_file(cookie_filename: str):
+    return query_one('SELECT * FROM user_info WHERE filePath = ?', (cookie_filename,))
+
+
+def find_valid_account_file(platform_type: int, user_name: str):
+    """按平台和用户名查找状态正常账号的 cookie 文件名"""
+    row = query_one('''
+        SELECT filePath FROM user_info
+        WHERE type = ? AND userName = ? AND status = 1
+    ''', (platform_type, user_name))
+    return row["filePath"] if row else None
+
+
+def get_account_check_time(account_id):
+    row = query_one('SELECT last_check_time FROM user_info WHERE id = ?', (account_id,))
+    return row["last_check_time"] if row else None
+
+
+def update_account_statuses(updates: list):
+    """批量写回校验结果，updates 为 (status, last_check_time, id) 列表，在一个事务中完成"""
+    if updates:
+        executemany('''
+        UPDATE user_info
+        SET status = ?, last_check_time = ?
+        WHERE id = ?
+        ''', updates)
+
+
+def update_account(account_id, platform_type, user_name):
+    execute('''
+        UPDATE user_info
+        SET type     = ?,
+            userName = ?
+        WHERE id = ?;
+    ''', (platform_type, user_name, account_id))
+
+
+def set_account_group(account_id, group_id):
+    execute('UPDATE user_info SET group_id = ? WHERE id = ?', (group_id, account_id))
+
+
+def delete_account(account_id):
+    execute("DELETE FROM user_info WHERE id = ?", (account_id,))
+
+
+def insert_account(values: dict) -> int:
+    columns = ", ".join(values)
+    placeholders = ", ".join("?" for _ in values)
+    cursor = execute(f"INSERT INTO user_info ({columns}, updated_at) VALUES ({placeholders}, datetime('now'))",
+                     tuple(values.values()))
+    return cursor.lastrowid
+
+
+# ========================================
+# account_groups
+# ========================================
+
+def list_groups() -> list:
+    return query('''
+        SELECT
+            g.id,
+            g.name,
+            g.description,
+            g.color,
+            g.icon,
+            g.sort_order,
+            g.created_at,
+            g.updated_at,
+            COUNT(u.id) as account_count
+        FROM account_groups g
+        LEFT JOIN user_info u ON g.id = u.group_id
+        GROUP BY g.id, g.name, g.description, g.color, g.icon, g.sort_order, g.created_at, g.updated_at
+        ORDER BY g.sort_order ASC, g.id ASC
+    ''')
+
+
+def create_group(name, description, color, icon, sort_order) -> int:
+    cursor = execute('''
+        INSERT INTO account_groups (name, description, color, icon, sort_order, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, datetime('now'), datetime('now'))
+    ''', (name, description, color, icon, sort_order))
+    return cursor.lastrowid
+
+
+def update_group(group_id, name, description, color, icon, sort_order):
+    execute('''
+        UPDATE account_groups
+        SET name = ?, description = ?, color = ?, icon = ?, sort_order = ?, updated_at = datetime('now')
+        WHERE id = ?
+    ''', (name, description, color, icon, sort_order, group_id))
+
+
+def delete_group(group_id):
+    """删除分组，并把该分组的账号设为未分组"""
+    with transaction() as conn:
+        conn.execute('UPDATE user_info SET group_id = NULL WHERE group_id = ?', (group_id,))
+        conn.execute('DELETE FROM account_groups WHERE id = ?', (group_id,))
+
+
+# ========================================
+# file_records
+# ========================================
+
+def list_files() -> list:
+    return query("SELECT * FROM file_records")
+
+
+# 素材库允许的排序字段
+FILE_SORT_COLUMNS = {"upload_time": "upload_time", "filename": "filename", "filesize": "filesize", "id": "id"}
+
+
+def list_files_page(offset: int = 0, limit: int = None, sort: str = "upload_time", order: str = "desc",
+                    keyword: str = None):
+    """分页查询素材库，返回 (记录列表, 总数)"""
+    column = FILE_SORT_COLUMNS.get(sort, "upload_time")
+    direction = "ASC" if str(order).lower() == "asc" else "DESC"
+    where, params = "", []
+    if keyword:
+        where = "WHERE filename LIKE ?"
+        params.append(f"%{keyword}%")
+    total = query_one(f"SELECT COUNT(*) AS total FROM file_records {where}", params)["total"]
+    rows = query(f'''
+        SELECT * FROM file_records {where}
+        ORDER BY {column} {direction}, id {direction}
+        LIMIT ? OFFSET ?
+    ''', (*params, -1 if limit is None else limit, offset))
+    return rows, total
+
+
+def get_file(file_id):
+    return query_one("SELECT * FROM file_records WHERE id = ?", (file_id,))
+
+
+def insert_file(filename, filesize, file_path, digest=None) -> int:
+    if digest is None:
+        cursor = execute('''
+            INSERT INTO file_records (filename, filesize, file_path)
+            VALUES (?, ?, ?)
+        ''', (filename, filesize, file_path))
+    else:
+        # digest 列由 utils/content_store 初始化时补齐
+        cursor = execute('''
+            INSERT INTO file_records (filename, filesize, file_path, digest)
+            VALUES (?, ?, ?, ?)
+        ''', (filename, filesize, file_path, digest))
+    return cursor.lastrowid
+
+
+def delete_file(file_id):
+    execute("DELETE FROM file_records WHERE id = ?", (file_id,))
@@ -0,0 +1,211 @@
+# utils/file_catalog.py
+"""
+视频文件目录索引 - 把 videoFile/ 下的视频文件元数据保存到 video_catalog 表
+- 按目录 mtime 增量扫描：只有新增 / 删除过文件的目录才重新列目录，未变化的目录只 stat 一次
+- 后台线程定期刷新，查询前也会做一次节流的增量刷新；每隔一段时间完整扫描一次兜底
+- 查询走索引，支持分页、排序和按文件名过滤；ID 为表内自增主键，跨进程稳定
+"""
+import os
+import threading
+import time
+from pathlib import Path
+
+from conf import BASE_DIR
+from utils import database
+from utils.video_utils import is_video_file
+
+VIDEO_DIR = Path(BASE_DIR / "videoFile")
+# 后台增量刷新间隔（秒）
+CATALOG_SCAN_INTERVAL = 10
+# 查询前增量刷新的最小间隔（秒）
+CATALOG_REFRESH_MIN_INTERVAL = 1
+# 完整扫描间隔（秒），用于发现目录 mtime 不变但文件大小变化的情况
+CATALOG_FULL_SCAN_INTERVAL = 300
+
+# 允许的排序字段 -> 列名
+CATALOG_SORT_COLUMNS = {
+    "upload_time": "mtime",
+    "filename": "filename",
+    "filesize": "size",
+}
+
+CATALOG_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS video_catalog (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL UNIQUE,
+    dir TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+)
+'''
+CATALOG_INDEX_SQL = [
+    'CREATE INDEX IF NOT EXISTS idx_video_catalog_mtime ON video_catalog(mtime)',
+    'CREATE INDEX IF NOT EXISTS idx_video_catalog_filename ON video_catalog(filename)',
+    'CREATE INDEX IF NOT EXISTS idx_video_catalog_size ON video_catalog(size)',
+    'CREATE INDEX IF NOT EXISTS idx_video_catalog_dir ON video_catalog(dir)',
+    'CREATE INDEX IF NOT EXISTS idx_file_records_file_path ON file_records(file_path)',
+    'CREATE INDEX IF NOT EXISTS idx_file_records_upload_time ON file_records(upload_time)',
+]
+
+
+class FileCatalog:
+    def __init__(self, root: Path = VIDEO_DIR):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        self._dir_mtimes = {}
+        self._last_refresh = 0
+        self._last_full_scan = 0
+        self._ready = False
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def _init_table(self):
+        if self._ready:
+            return
+        with database.transaction() as conn:
+            conn.execute(CATALOG_TABLE_SQL)
+            for sql in CATALOG_INDEX_SQL:
+                conn.execute(sql)
+        self._ready = True
+
+    def refresh(self, force: bool = False) -> int:
+        """增量刷新，返回变化的文件数；force=True 时完整扫描"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._last_refresh < CATALOG_REFRESH_MIN_INTERVAL:
+                return 0
+            self._init_table()
+            full = force or now - self._last_full_scan > CATALOG_FULL_SCAN_INTERVAL
+            if full:
+                self._dir_mtimes.clear()
+                self._last_full_scan = now
+            self._last_refresh = now
+            if not self.root.exists():
+                return 0
+            return self._scan_dir("")
+
+    def _scan_dir(self, rel_dir: str) -> int:
+        """扫描一个目录（相对 videoFile/），目录 mtime 未变化时跳过列目录，只递归检查子目录"""
+        abs_dir = self.root / rel_dir if rel_dir else self.root
+        try:
+            dir_mtime = abs_dir.stat().st_mtime
+        except FileNotFoundError:
+            return self._drop_dir(rel_dir)
+
+        changed = 0
+        if self._dir_mtimes.get(rel_dir) != dir_mtime:
+            files, subdirs = {}, []
+            with os.scandir(abs_dir) as entries:
+                for entry in entries:
+                    # 跳过 .uploads（分片临时文件）/ .tmp 等隐藏目录
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.is_file() and is_video_file(entry.name):
+                        stat = entry.stat()
+                        files[entry.name] = (stat.st_size, stat.st_mtime)
+            changed += self._sync_files(rel_dir, files)
+            changed += self._sync_subdirs(rel_dir, subdirs)
+            self._dir_mtimes[rel_dir] = dir_mtime
+        for sub in [d for d in self._dir_mtimes if d and os.path.dirname(d) == rel_dir]:
+            changed += self._scan_dir(sub)
+        return changed
+
+    def _sync_subdirs(self, rel_dir: str, subdirs: list) -> int:
+        changed = 0
+        known = {d for d in self._dir_mtimes if d and os.path.dirname(d) == rel_dir}
+        for name in subdirs:
+            sub = f"{rel_dir}/{name}" if rel_dir else name
+            if sub not in known:
+                # 新目录：先登记再由 _scan_dir 的递归扫描
+                self._dir_mtimes[sub] = None
+        for sub in known - {f"{rel_dir}/{name}" if rel_dir else name for name in subdirs}:
+            changed += self._drop_dir(sub)
+        return changed
+
+    def _sync_files(self, rel_dir: str, files: dict) -> int:
+        existing = {row["path"]: (row["size"], row["mtime"])
+                    for row in database.query("SELECT path, size, mtime FROM video_catalog WHERE dir = ?", (rel_dir,))}
+        upserts, deletes = [], []
+        for name, (size, mtime) in files.items():
+            path = f"{rel_dir}/{name}" if rel_dir else name
+            if existing.get(path) != (size, mtime):
+                upserts.append((path, rel_dir, self._display_name(path, name), size, mtime))
+        for path in existing:
+            if os.path.basename(path) not in files:
+                deletes.append((path,))
+        if upserts or deletes:
+            with database.transaction() as conn:
+                conn.executemany('''
+                    INSERT INTO video_catalog (path, dir, filename, size, mtime) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(path) DO UPDATE SET filename = excluded.filename, size = excluded.size, mtime = excluded.mtime
+                ''', upserts)
+                conn.executemany("DELETE FROM video_catalog WHERE path = ?", deletes)
+        return len(upserts) + len(deletes)
+
+    def _drop_dir(self, rel_dir: str) -> int:
+        for d in [d for d in self._dir_mtimes if d == rel_dir or d.startswith(rel_dir + "/")]:
+            self._dir_mtimes.pop(d, None)
+        return database.execute("DELETE FROM video_catalog WHERE dir = ? OR dir LIKE ?",
+                                (rel_dir, rel_dir + "/%")).rowcount
+
+    @staticmethod
+    def _display_name(path: str, name: str) -> str:
+        """内容寻址存储中的文件显示素材库里的文件名"""
+        if not path.startswith("blobs/"):
+            return name
+        row = database.query_one("SELECT filename FROM file_records WHERE file_path = ? ORDER BY id DESC LIMIT 1",
+                                 (path,))
+        return row["filename"] if row else name
+
+    def query(self, offset: int = 0, limit: int = None, sort: str = "upload_time", order: str = "desc",
+              keyword: str = None):
+        """分页查询，返回 (记录列表, 总数)"""
+        self.refresh()
+        column = CATALOG_SORT_COLUMNS.get(sort, "mtime")
+        direction = "ASC" if str(order).lower() == "asc" else "DESC"
+        where, params = "", []
+        if keyword:
+            where = "WHERE filename LIKE ?"
+            params.append(f"%{keyword}%")
+        total = database.query_one(f"SELECT COUNT(*) AS total FROM video_catalog {where}", params)["total"]
+        rows = database.query(f'''
+            SELECT id, path, filename, size, mtime FROM video_catalog {where}
+            ORDER BY {column} {direction}, id {direction}
+            LIMIT ? OFFSET ?
+        ''', (*params, -1 if limit is None else limit, offset))
+        return rows, total
+
+    def start(self):
+        """启动后台刷新线程（重复调用无副作用）"""
+        if self._thread:
+            return self
+        self.refresh(force=True)
+        self._thread = threading.Thread(target=self._watch_loop, name="sau-file-catalog", daemon=True)
+        self._thread.start()
+        print(f"📂 文件目录索引已启动: {self.root}")
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def _watch_loop(self):
+        while not self._stopped.wait(CATALOG_SCAN_INTERVAL):
+            try:
+                changed = self.refresh()
+                if changed:
+                    print(f"📂 文件目录索引更新 {changed} 个文件")
+            except Exception as e:
+                print(f"⚠️ 文件目录索引刷新失败: {e}")
+
+
+_catalog = None
+
+
+def get_file_catalog() -> FileCatalog:
+    global _catalog
+    if _catalog is None:
+        _catalog = FileCatalog()
+    return _catalog
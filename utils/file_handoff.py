@@ -0,0 +1,144 @@
+# utils/file_handoff.py
+"""
+视频文件交接 - 把要上传的视频登记为文件句柄，交给 multi-account-browser
+- 句柄带预先确定的绝对路径、大小、mtime 和内容摘要（素材库文件直接用 file_records.digest，不重新读文件）
+- 浏览器端可以直接按路径读取，也可以通过 GET /files/handles/<id> 按 Range 并行拉取分段
+- 路径解析是确定的：已存在的路径 -> videoFile/ 下的相对路径 -> 素材库记录，不再 glob 扫描目录；
+  只接受 videoFile/ 之内的文件，库外路径（绝对路径、../ 等）一律拒绝，句柄不会暴露其他本地文件
+句柄在 HANDLE_TTL 内有效，文件大小或 mtime 变化后句柄失效
+"""
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import conf
+from conf import BASE_DIR
+from utils import database
+
+VIDEO_DIR = Path(BASE_DIR / "videoFile")
+# 句柄有效期（秒），覆盖最长的一次浏览器上传
+HANDLE_TTL = 24 * 3600
+# 浏览器端拉取分段使用的地址（sau_backend 监听地址）
+FILE_HANDOFF_BASE_URL = getattr(conf, "FILE_HANDOFF_BASE_URL", "http://127.0.0.1:5409")
+
+HANDLE_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS file_handles (
+    id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    digest TEXT,
+    expires_at REAL NOT NULL
+)
+'''
+
+_table_ready = False
+_table_lock = threading.Lock()
+
+
+def _init_table():
+    global _table_ready
+    if _table_ready:
+        return
+    with _table_lock:
+        if not _table_ready:
+            with database.transaction() as conn:
+                conn.execute(HANDLE_TABLE_SQL)
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_file_handles_path ON file_handles(path)')
+            _table_ready = True
+
+
+def _library_file(path: Path):
+    """解析为绝对路径，位于 videoFile/ 之内的普通文件返回该路径，否则返回 None"""
+    try:
+        path = path.resolve()
+        path.relative_to(VIDEO_DIR.resolve())
+    except (OSError, ValueError):
+        return None
+    return path if path.is_file() else None
+
+
+def resolve_video_path(file_path) -> Path:
+    """
+    把调用方传入的路径解析为 videoFile/ 之内的实际文件：
+    1. 路径本身存在；2. 相对 videoFile/ 的路径；3. 素材库记录（file_path 或原始文件名，取最新一条）
+    解析结果不在 videoFile/ 之内或都找不到时抛出 FileNotFoundError
+    """
+    path = Path(file_path)
+    resolved = _library_file(path)
+    if resolved is None and not path.is_absolute():
+        resolved = _library_file(VIDEO_DIR / path)
+    if resolved is not None:
+        return resolved
+    row = database.query_one('''
+        SELECT file_path FROM file_records WHERE file_path = ? OR filename = ?
+        ORDER BY file_path = ? DESC, id DESC LIMIT 1
+    ''', (path.name, path.name, path.name))
+    if row:
+        resolved = _library_file(VIDEO_DIR / row["file_path"])
+        if resolved is not None:
+            return resolved
+    raise FileNotFoundError(f"找不到文件: {file_path}")
+
+
+def _library_digest(path: Path):
+    """素材库中已记录的摘要；库外文件返回 None（不为交接整个读一遍大文件）"""
+    try:
+        relpath = path.relative_to(VIDEO_DIR.resolve()).as_posix()
+    except ValueError:
+        return None
+    row = database.query_one("SELECT digest FROM file_records WHERE file_path = ? AND digest IS NOT NULL LIMIT 1",
+                             (relpath,))
+    return row["digest"] if row else None
+
+
+def handle_url(handle_id: str) -> str:
+    return f"{FILE_HANDOFF_BASE_URL}/files/handles/{handle_id}"
+
+
+def _handle_info(row) -> dict:
+    return {
+        "id": row["id"],
+        "path": row["path"],
+        "size": row["size"],
+        "digest": row["digest"],
+        "url": handle_url(row["id"]),
+    }
+
+
+def register_file(file_path) -> dict:
+    """登记文件句柄，返回 {id, path, size, digest, url}；同一文件未变化时复用已有句柄"""
+    _init_table()
+    path = resolve_video_path(file_path)
+    stat = path.stat()
+    now = time.time()
+    with database.transaction() as conn:
+        conn.execute("DELETE FROM file_handles WHERE expires_at < ?", (now,))
+        row = conn.execute('''
+            SELECT * FROM file_handles WHERE path = ? AND size = ? AND mtime = ? LIMIT 1
+        ''', (str(path), stat.st_size, stat.st_mtime)).fetchone()
+        if row is not None:
+            conn.execute("UPDATE file_handles SET expires_at = ? WHERE id = ?", (now + HANDLE_TTL, row["id"]))
+            return _handle_info(row)
+        handle_id = uuid.uuid4().hex
+        conn.execute('''
+            INSERT INTO file_handles (id, path, size, mtime, digest, expires_at) VALUES (?, ?, ?, ?, ?, ?)
+        ''', (handle_id, str(path), stat.st_size, stat.st_mtime, _library_digest(path), now + HANDLE_TTL))
+        row = conn.execute("SELECT * FROM file_handles WHERE id = ?", (handle_id,)).fetchone()
+    return _handle_info(row)
+
+
+def open_handle(handle_id: str) -> dict:
+    """按句柄取文件信息；句柄不存在、已过期或文件已变化时抛出 FileNotFoundError"""
+    _init_table()
+    row = database.query_one("SELECT * FROM file_handles WHERE id = ? AND expires_at >= ?", (handle_id, time.time()))
+    if row is None:
+        raise FileNotFoundError("文件句柄不存在或已过期")
+    try:
+        stat = Path(row["path"]).stat()
+    except FileNotFoundError:
+        raise FileNotFoundError("文件已被删除")
+    if stat.st_size != row["size"] or stat.st_mtime != row["mtime"]:
+        raise FileNotFoundError("文件已变化，请重新登记")
+    return _handle_info(row)
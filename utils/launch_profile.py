@@ -0,0 +1,233 @@
+# utils/launch_profile.py
+"""
+浏览器启动配置 - 上传器统一从这里取启动参数，不再各自写死 headless=False
+- headless：Chromium 新版无头模式（channel="chromium"，与有头模式同一渲染路径），不需要显示器，CPU / 内存开销最小
+- xvfb：有头模式运行在进程内共享的 Xvfb 虚拟显示上，适合检测无头浏览器的平台，无需真实桌面
+- headed：有头模式运行在当前桌面（默认，保持原有行为）
+全局模式由 conf.py 的 LAUNCH_MODE 指定，PLATFORM_LAUNCH_MODES 可按平台覆盖（{"tencent": "xvfb"}）
+Linux 上没有 DISPLAY 时 headed 自动退回 xvfb，找不到 Xvfb 时退回 headless
+benchmark_launch_mode() 测量某个模式下打开平台发布页的耗时、内存和是否被平台拒绝，
+用于确定每个平台能接受的模式（examples/benchmark_launch_modes.py）
+"""
+import atexit
+import os
+import select
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import conf
+from utils.base_social_media import SOCIAL_MEDIA_DOUYIN, SOCIAL_MEDIA_TENCENT, SOCIAL_MEDIA_KUAISHOU, \
+    SOCIAL_MEDIA_XIAOHONGSHU, SOCIAL_MEDIA_TIKTOK, SOCIAL_MEDIA_BAIJIAHAO, set_init_script
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+LAUNCH_MODE_HEADLESS = "headless"
+LAUNCH_MODE_XVFB = "xvfb"
+LAUNCH_MODE_HEADED = "headed"
+LAUNCH_MODES = [LAUNCH_MODE_HEADLESS, LAUNCH_MODE_XVFB, LAUNCH_MODE_HEADED]
+
+LAUNCH_MODE = getattr(conf, "LAUNCH_MODE", LAUNCH_MODE_HEADED)
+PLATFORM_LAUNCH_MODES = getattr(conf, "PLATFORM_LAUNCH_MODES", {})
+XVFB_PATH = getattr(conf, "XVFB_PATH", "Xvfb")
+# 虚拟显示的分辨率和色深，需大于上传器使用的最大视口（1600x900）
+XVFB_SCREEN = "1920x1080x24"
+# 等待 Xvfb 分配显示编号的上限（秒）
+XVFB_START_TIMEOUT = 10
+
+# 基准测试打开的发布页，以及页面可用的标志（上传文件输入框出现）
+BENCHMARK_TARGETS = {
+    SOCIAL_MEDIA_DOUYIN: "https://creator.douyin.com/creator-micro/content/upload",
+    SOCIAL_MEDIA_KUAISHOU: "https://cp.kuaishou.com/article/publish/video",
+    SOCIAL_MEDIA_XIAOHONGSHU: "https://creator.xiaohongshu.com/publish/publish?from=homepage&target=video",
+    SOCIAL_MEDIA_TENCENT: "https://channels.weixin.qq.com/platform/post/create",
+    SOCIAL_MEDIA_TIKTOK: "https://www.tiktok.com/tiktokstudio/upload?lang=en",
+    SOCIAL_MEDIA_BAIJIAHAO: "https://baijiahao.baidu.com/builder/rc/edit?type=videoV2",
+}
+BENCHMARK_READY_SELECTOR = 'input[type="file"]'
+# 基准测试中等待发布页可用的上限（秒）
+BENCHMARK_READY_TIMEOUT = 30
+
+
+class VirtualDisplay:
+    """进程内共享的 Xvfb 虚拟显示，第一次需要时启动，进程退出时关闭"""
+
+    def __init__(self, xvfb_path: str = XVFB_PATH, screen: str = XVFB_SCREEN):
+        self.xvfb_path = xvfb_path
+        self.screen = screen
+        self.display = None
+        self._process = None
+        self._lock = threading.Lock()
+
+    def start(self) -> str:
+        """返回可用的 DISPLAY（如 ":99"）；Xvfb 退出后再次调用会重新启动"""
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                return self.display
+            read_fd, write_fd = os.pipe()
+            try:
+                # -displayfd：由 Xvfb 自己挑选空闲的显示编号并写回管道，避免多个进程抢同一个编号
+                self._process = subprocess.Popen(
+                    [self.xvfb_path, "-displayfd", str(write_fd), "-screen", "0", self.screen, "-nolisten", "tcp"],
+                    pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                )
+                os.close(write_fd)
+                write_fd = None
+                number = self._read_display_number(read_fd)
+            finally:
+                if write_fd is not None:
+                    os.close(write_fd)
+                os.close(read_fd)
+            if number is None:
+                self._process.kill()
+                self._process = None
+                raise RuntimeError("Xvfb 启动失败")
+            self.display = f":{number}"
+            print(f"🖥️ 虚拟显示已启动: DISPLAY={self.display}")
+            return self.display
+
+    def _read_display_number(self, read_fd):
+        deadline = time.monotonic() + XVFB_START_TIMEOUT
+        data = b""
+        while time.monotonic() < deadline and self._process.poll() is None:
+            ready, _, _ = select.select([read_fd], [], [], 0.1)
+            if not ready:
+                continue
+            chunk = os.read(read_fd, 16)
+            if not chunk:
+                break
+            data += chunk
+            if data.endswith(b"\n"):
+                return int(data)
+        return None
+
+    def stop(self):
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                self._process.terminate()
+                try:
+                    self._process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self._process.kill()
+            self._process = None
+            self.display = None
+
+
+_virtual_display = VirtualDisplay()
+atexit.register(_virtual_display.stop)
+
+
+def _has_display() -> bool:
+    if not sys.platform.startswith("linux"):
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def resolve_launch_mode(platform: str = None, mode: str = None) -> str:
+    """确定实际使用的启动模式：指定模式 > 平台模式 > 全局模式，并按当前环境退回可用的模式"""
+    mode = mode or PLATFORM_LAUNCH_MODES.get(platform, LAUNCH_MODE)
+    if mode not in LAUNCH_MODES:
+        print(f"⚠️ 未知的启动模式 {mode}，使用 {LAUNCH_MODE_HEADED}")
+        mode = LAUNCH_MODE_HEADED
+    if mode == LAUNCH_MODE_HEADED and not _has_display():
+        mode = LAUNCH_MODE_XVFB
+    if mode == LAUNCH_MODE_XVFB:
+        if not sys.platform.startswith("linux"):
+            # Windows / macOS 总有桌面，Xvfb 不可用
+            return LAUNCH_MODE_HEADED
+        if shutil.which(XVFB_PATH) is None:
+            print(f"⚠️ 找不到 {XVFB_PATH}，[{platform or '默认'}] 改用无头模式启动浏览器")
+            return LAUNCH_MODE_HEADLESS
+    return mode
+
+
+def launch_options(platform: str = None, executable_path=None, browser_type: str = "chromium",
+                   mode: str = None, **extra) -> dict:
+    """
+    playwright 的 launch / launch_persistent_context 参数
+    extra 原样并入（proxy、args、viewport 等）
+    """
+    mode = resolve_launch_mode(platform, mode)
+    options = {"headless": mode == LAUNCH_MODE_HEADLESS}
+    if browser_type == "chromium":
+        if executable_path:
+            options["executable_path"] = executable_path
+        elif mode == LAUNCH_MODE_HEADLESS:
+            # 不指定 channel 时 Playwright 使用 chromium-headless-shell（旧无头实现），页面行为与有头模式差异更大
+            options["channel"] = "chromium"
+    if mode == LAUNCH_MODE_XVFB:
+        try:
+            options["env"] = {**os.environ, "DISPLAY": _virtual_display.start()}
+        except (OSError, RuntimeError) as e:
+            print(f"⚠️ 虚拟显示启动失败，改用无头模式: {e}")
+            return launch_options(platform, executable_path, browser_type, LAUNCH_MODE_HEADLESS, **extra)
+    options.update({key: value for key, value in extra.items() if value is not None})
+    return options
+
+
+async def launch_browser(playwright, platform: str = None, executable_path=None, browser_type: str = "chromium",
+                         mode: str = None, **extra):
+    """按启动配置启动浏览器（browser_type 为 chromium / firefox）"""
+    launcher = getattr(playwright, browser_type)
+    return await launcher.launch(**launch_options(platform, executable_path, browser_type, mode, **extra))
+
+
+async def launch_persistent_context(playwright, user_data_dir, platform: str = None, executable_path=None,
+                                    mode: str = None, **extra):
+    """按启动配置启动使用持久化配置目录的 Chromium 上下文"""
+    return await playwright.chromium.launch_persistent_context(
+        str(user_data_dir), **launch_options(platform, executable_path, "chromium", mode, **extra))
+
+
+def _browser_rss() -> int:
+    """当前进程所有子进程（Playwright 驱动和浏览器）的常驻内存之和（字节）；没有 psutil 时返回 0"""
+    if psutil is None:
+        return 0
+    total = 0
+    for child in psutil.Process().children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except psutil.Error:
+            pass
+    return total
+
+
+async def benchmark_launch_mode(playwright, platform: str, account_file, mode: str, executable_path=None,
+                                browser_type: str = "chromium", url: str = None,
+                                timeout: float = BENCHMARK_READY_TIMEOUT) -> dict:
+    """
+    用指定模式打开平台发布页一次：返回实际模式、启动耗时、发布页可用耗时、浏览器内存增量，
+    以及发布页是否可用（accepted 为 False 通常是被跳转到登录页 / 风控页，说明平台不接受该模式）
+    """
+    from utils.route_policy import apply_route_policy
+
+    url = url or BENCHMARK_TARGETS[platform]
+    result = {"platform": platform, "mode": resolve_launch_mode(platform, mode), "accepted": False}
+    baseline = _browser_rss()
+    started = time.monotonic()
+    browser = await launch_browser(playwright, platform, executable_path, browser_type, mode)
+    result["launch_seconds"] = round(time.monotonic() - started, 2)
+    try:
+        context = await browser.new_context(storage_state=str(account_file))
+        context = await set_init_script(context)
+        context = await apply_route_policy(context, platform)
+        page = await context.new_page()
+        started = time.monotonic()
+        try:
+            await page.goto(url)
+            await page.locator(BENCHMARK_READY_SELECTOR).first.wait_for(state="attached", timeout=timeout * 1000)
+            result["accepted"] = True
+        except Exception as e:
+            result["error"] = str(e).splitlines()[0]
+        result["ready_seconds"] = round(time.monotonic() - started, 2)
+        result["final_url"] = page.url
+        result["user_agent"] = await page.evaluate("navigator.userAgent")
+        result["rss_mb"] = round(max(_browser_rss() - baseline, 0) / 1024 / 1024, 1) if psutil else None
+    finally:
+        await browser.close()
+    return result
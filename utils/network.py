@@ -21,6 +21,10 @@ def async_retry(timeout=60, max_retries=None):
                         print(f"Function timeout after {timeout} seconds.")
                         raise TimeoutError(f"Function execution exceeded {timeout} seconds timeout.") from e
                     print(f"Attempt {attempts} failed: {e}. Retrying...")
+                    # 上传器方法的重试计入上传进度（self.progress）
+                    progress = getattr(args[0], "progress", None) if args else None
+                    if progress is not None:
+                        progress.retry(f"{func.__name__}: {e}")
                     await asyncio.sleep(1)  # Sleep to avoid tight loop or provide backoff logic here
 
         return wrapper
@@ -0,0 +1,138 @@
+# utils/page_waits.py
+"""
+上传器页面等待工具 - 用 Playwright 的事件等待替代 while True + sleep 轮询
+- on_selector / on_locator / on_url 返回等待协程：元素状态变化、页面跳转发生时立即结束，不按固定间隔检查
+- wait_first 同时等待多个条件，返回最先满足的条件名，其余等待自动取消；超过截止时间抛出 PageWaitTimeout
+- click_until 点击按钮后等待完成条件，在重试间隔内未完成才再次点击（按钮可能暂时不可点）
+等待期间不再截图，只按 PROGRESS_LOG_INTERVAL 打印进度
+"""
+import asyncio
+
+# 进入发布页面的等待上限（秒）
+PAGE_READY_TIMEOUT = 60
+# 视频上传 / 平台处理的等待上限（秒），大文件在慢网络下也足够
+VIDEO_UPLOAD_TIMEOUT = 3600
+# 点击发布到确认发布成功的等待上限（秒）
+PUBLISH_TIMEOUT = 300
+# 发布按钮点击后多久仍未完成则再次点击（秒）
+PUBLISH_RETRY_INTERVAL = 5
+# 长时间等待时打印进度的间隔（秒）
+PROGRESS_LOG_INTERVAL = 30
+
+
+class PageWaitTimeout(TimeoutError):
+    """在截止时间内没有等到任何条件"""
+
+
+class Deadline:
+    """一组等待共用的截止时间；timeout 为 None 时不限时"""
+
+    def __init__(self, timeout: float = None):
+        self._loop = asyncio.get_running_loop()
+        self._end = None if timeout is None else self._loop.time() + timeout
+
+    def remaining(self):
+        if self._end is None:
+            return None
+        return max(self._end - self._loop.time(), 0)
+
+    @property
+    def expired(self) -> bool:
+        return self._end is not None and self._loop.time() >= self._end
+
+
+def on_selector(target, selector: str, state: str = "visible"):
+    """元素达到指定状态（attached / detached / visible / hidden）；target 可以是 Page、Frame、Locator 或 FrameLocator"""
+    return target.locator(selector).first.wait_for(state=state, timeout=0)
+
+
+def on_locator(locator, state: str = "visible"):
+    return locator.first.wait_for(state=state, timeout=0)
+
+
+def on_url(page, url):
+    """页面地址匹配（glob / 正则 / 函数），已经匹配时立即结束"""
+    return page.wait_for_url(url, timeout=0)
+
+
+async def _race(tasks: dict, timeout, progress=None):
+    """
+    等待 tasks（Task -> 条件名）中第一个成功结束的任务，返回条件名；timeout 内没有则返回 None
+    出错的任务从 tasks 中移除，全部出错时抛出 PageWaitTimeout
+    """
+    loop = asyncio.get_running_loop()
+    deadline = Deadline(timeout)
+    started = loop.time()
+    last_error = None
+    while tasks:
+        remaining = deadline.remaining()
+        if remaining == 0:
+            return None
+        limits = [x for x in (remaining, PROGRESS_LOG_INTERVAL if progress else None) if x is not None]
+        done, _ = await asyncio.wait(tasks, timeout=min(limits) if limits else None,
+                                     return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None:
+                return tasks[task]
+            last_error = task.exception()
+            tasks.pop(task)
+        if not done and progress:
+            progress(loop.time() - started)
+    raise PageWaitTimeout(f"等待失败: {last_error}")
+
+
+async def _cancel(tasks: dict):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def wait_first(waits: dict, timeout: float = None, progress=None) -> str:
+    """
+    同时等待 waits 中的所有条件（名称 -> 等待协程），返回最先满足的条件名，其余等待取消
+    某个等待本身出错（元素所在的页面被关闭等）时忽略它，全部出错或超时抛出 PageWaitTimeout
+    progress(elapsed) 每隔 PROGRESS_LOG_INTERVAL 秒调用一次
+    """
+    tasks = {asyncio.ensure_future(coro): name for name, coro in waits.items()}
+    try:
+        name = await _race(tasks, timeout, progress)
+    finally:
+        await _cancel(tasks)
+    if name is None:
+        raise PageWaitTimeout(f"等待超时（{timeout}s）: {', '.join(waits)}")
+    return name
+
+
+async def click_if_present(locator):
+    """按钮存在时点击一次（不等待按钮出现）"""
+    if await locator.count():
+        await locator.first.click(timeout=PUBLISH_RETRY_INTERVAL * 1000)
+
+
+async def click_until(action, waits: dict, timeout: float = PUBLISH_TIMEOUT,
+                      retry_interval: float = PUBLISH_RETRY_INTERVAL, on_retry=None) -> str:
+    """
+    执行 action()（通常是点击发布按钮），同时等待 waits 中的完成条件；
+    retry_interval 内没有完成就再执行一次 action，直到 timeout。完成条件只创建一次，跨重试持续监听
+    每次重新执行 action 前调用 on_retry()（上报重试次数）；返回满足的条件名
+    """
+    deadline = Deadline(timeout)
+    tasks = {asyncio.ensure_future(coro): name for name, coro in waits.items()}
+    attempt = 0
+    try:
+        while True:
+            if attempt and on_retry:
+                on_retry()
+            attempt += 1
+            try:
+                await action()
+            except Exception:
+                # 按钮暂时不可点 / 已消失：以完成条件为准，下一轮再试
+                pass
+            name = await _race(tasks, min(retry_interval, deadline.remaining()))
+            if name is not None:
+                return name
+            if deadline.expired:
+                raise PageWaitTimeout(f"等待超时（{timeout}s）: {', '.join(waits)}")
+    finally:
+        await _cancel(tasks)
@@ -1,4 +1,6 @@
 # utils/playwright_compat.py - 最小化实现
+import asyncio
+
 from utils.browser_adapter import MultiAccountBrowserAdapter
 from utils.common import get_account_info_from_db
 
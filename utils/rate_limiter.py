@@ -0,0 +1,160 @@
+# utils/rate_limiter.py
+"""
+发布限流 - 按平台、按账号的令牌桶 + 账号每日配额
+状态保存在 SQLite 中（rate_limit_buckets / publish_quota），sau_backend 和多个 worker 进程共享同一份限额；
+并发发布可以全速运行，单个账号不会在短时间内突发超过平台限制
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from utils import database
+
+# 平台级令牌桶：整个平台（所有账号合计）每小时可发布数量和允许的突发数量
+PLATFORM_RATE_LIMITS = {
+    "douyin": {"per_hour": 60, "burst": 6},
+    "kuaishou": {"per_hour": 60, "burst": 6},
+    "tencent": {"per_hour": 40, "burst": 4},
+    "xiaohongshu": {"per_hour": 30, "burst": 3},
+    "tiktok": {"per_hour": 30, "burst": 3},
+    "baijiahao": {"per_hour": 30, "burst": 3},
+    "bilibili": {"per_hour": 30, "burst": 3},
+}
+# 账号级令牌桶和每日配额
+ACCOUNT_RATE_LIMITS = {
+    "douyin": {"per_hour": 6, "burst": 2, "daily_quota": 30},
+    "kuaishou": {"per_hour": 6, "burst": 2, "daily_quota": 30},
+    "tencent": {"per_hour": 4, "burst": 2, "daily_quota": 20},
+    "xiaohongshu": {"per_hour": 3, "burst": 1, "daily_quota": 15},
+    "tiktok": {"per_hour": 3, "burst": 1, "daily_quota": 15},
+    "baijiahao": {"per_hour": 4, "burst": 2, "daily_quota": 20},
+    "bilibili": {"per_hour": 4, "burst": 2, "daily_quota": 20},
+}
+DEFAULT_PLATFORM_RATE_LIMIT = {"per_hour": 30, "burst": 3}
+DEFAULT_ACCOUNT_RATE_LIMIT = {"per_hour": 4, "burst": 1, "daily_quota": 20}
+# 限流时原地等待的最长时间（秒），超过则交给调用方延后重新调度
+THROTTLE_MAX_WAIT = 600
+
+# conf.py 中可以用 PUBLISH_PLATFORM_RATE_LIMITS / PUBLISH_ACCOUNT_RATE_LIMITS 覆盖上面的默认值
+try:
+    import conf
+    PLATFORM_RATE_LIMITS.update(getattr(conf, "PUBLISH_PLATFORM_RATE_LIMITS", {}))
+    ACCOUNT_RATE_LIMITS.update(getattr(conf, "PUBLISH_ACCOUNT_RATE_LIMITS", {}))
+except ImportError:
+    pass
+
+RATE_LIMIT_TABLE_SQL = [
+    '''
+    CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+        key TEXT PRIMARY KEY,
+        tokens REAL NOT NULL,
+        updated_at REAL NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS publish_quota (
+        key TEXT NOT NULL,
+        day TEXT NOT NULL,
+        count INTEGER DEFAULT 0,
+        PRIMARY KEY (key, day)
+    )
+    ''',
+]
+
+_table_ready = False
+
+
+class RateLimited(Exception):
+    """超过限额，retry_after 秒后再试"""
+
+    def __init__(self, retry_after: float, reason: str):
+        super().__init__(f"{reason}，{retry_after:.0f} 秒后重试")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+def _init_tables():
+    global _table_ready
+    if not _table_ready:
+        with database.transaction() as conn:
+            for sql in RATE_LIMIT_TABLE_SQL:
+                conn.execute(sql)
+        _table_ready = True
+
+
+def _seconds_until_tomorrow(now: datetime) -> float:
+    tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (tomorrow - now).total_seconds()
+
+
+def _bucket_wait(conn, key: str, limit: dict, now: float):
+    """返回 (当前令牌数, 需要等待的秒数)"""
+    rate = limit["per_hour"] / 3600
+    row = conn.execute("SELECT tokens, updated_at FROM rate_limit_buckets WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        tokens = float(limit["burst"])
+    else:
+        tokens = min(float(limit["burst"]), row["tokens"] + (now - row["updated_at"]) * rate)
+    if tokens >= 1:
+        return tokens, 0.0
+    return tokens, (1 - tokens) / rate if rate > 0 else float("inf")
+
+
+def try_acquire(platform: str, account: str) -> float:
+    """
+    尝试为一次发布获取额度：平台令牌、账号令牌、账号当日配额都满足时一起扣减并返回 0，
+    否则不扣减任何额度，抛出 RateLimited（含需要等待的秒数）
+    """
+    _init_tables()
+    platform_limit = PLATFORM_RATE_LIMITS.get(platform, DEFAULT_PLATFORM_RATE_LIMIT)
+    account_limit = ACCOUNT_RATE_LIMITS.get(platform, DEFAULT_ACCOUNT_RATE_LIMIT)
+    platform_key = f"platform:{platform}"
+    account_key = f"account:{platform}:{account}"
+    now = time.time()
+    today = datetime.now()
+
+    with database.transaction() as conn:
+        quota = account_limit.get("daily_quota")
+        if quota:
+            row = conn.execute("SELECT count FROM publish_quota WHERE key = ? AND day = ?",
+                               (account_key, today.date().isoformat())).fetchone()
+            if row and row["count"] >= quota:
+                raise RateLimited(_seconds_until_tomorrow(today), f"账号今日发布已达上限 {quota}")
+
+        platform_tokens, platform_wait = _bucket_wait(conn, platform_key, platform_limit, now)
+        account_tokens, account_wait = _bucket_wait(conn, account_key, account_limit, now)
+        if platform_wait or account_wait:
+            reason = "账号发布过于频繁" if account_wait >= platform_wait else "平台发布过于频繁"
+            raise RateLimited(max(platform_wait, account_wait), reason)
+
+        conn.executemany('''
+            INSERT INTO rate_limit_buckets (key, tokens, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at
+        ''', [(platform_key, platform_tokens - 1, now), (account_key, account_tokens - 1, now)])
+        conn.execute('''
+            INSERT INTO publish_quota (key, day, count) VALUES (?, ?, 1)
+            ON CONFLICT(key, day) DO UPDATE SET count = count + 1
+        ''', (account_key, today.date().isoformat()))
+    return 0.0
+
+
+async def acquire(platform: str, account: str, max_wait: float = None):
+    """等待直到获取到发布额度；需要等待的时间超过 max_wait 时抛出 RateLimited"""
+    while True:
+        try:
+            return await asyncio.to_thread(try_acquire, platform, account)
+        except RateLimited as e:
+            if max_wait is not None and e.retry_after > max_wait:
+                raise
+            print(f"⏳ 限流 [{platform}] {account}: {e}")
+            await asyncio.sleep(e.retry_after)
+
+
+def get_quota_usage(platform: str, account: str) -> dict:
+    """查询账号当日已用配额"""
+    _init_tables()
+    account_key = f"account:{platform}:{account}"
+    row = database.query_one("SELECT count FROM publish_quota WHERE key = ? AND day = ?",
+                             (account_key, datetime.now().date().isoformat()))
+    quota = ACCOUNT_RATE_LIMITS.get(platform, DEFAULT_ACCOUNT_RATE_LIMIT).get("daily_quota")
+    return {"used": row["count"] if row else 0, "quota": quota}
@@ -0,0 +1,117 @@
+# utils/route_policy.py
+"""
+上传页面精简模式 - 创建浏览器上下文时按平台安装请求拦截策略
+- 统计 / 广告 / 监控上报域名（TRACKER_HOSTS）的请求一律拦截
+- 不在平台白名单（allow_hosts，上传流程需要的主站、静态资源和图片 CDN）中的图片、字体、音视频请求拦截
+- block_patterns 中的正则匹配的地址拦截（平台内的推荐流等接口，可在 conf.py 的 ROUTE_POLICIES 中补充）
+- 接口请求（xhr / fetch）、脚本、样式、文档不按类型拦截，上传分片请求不受影响
+减少每个并发浏览器的页面加载时间、流量和渲染进程内存；context.route 会关闭该上下文的 HTTP 缓存，
+所以只用于按次创建的上下文。常驻的持久化上下文（账号会话）改用 block_page_requests()：
+通过 CDP Network.setBlockedURLs 在页面上拦截统计上报域名，保留 HTTP 缓存（不按资源类型 / 正则拦截，非 Chromium 浏览器跳过）
+在 conf.py 中设置 LEAN_PAGES = False 可整体关闭
+"""
+import re
+from urllib.parse import urlsplit
+
+import conf
+from utils.base_social_media import SOCIAL_MEDIA_DOUYIN, SOCIAL_MEDIA_TENCENT, SOCIAL_MEDIA_KUAISHOU, \
+    SOCIAL_MEDIA_XIAOHONGSHU, SOCIAL_MEDIA_TIKTOK, SOCIAL_MEDIA_BAIJIAHAO
+
+LEAN_PAGES = getattr(conf, "LEAN_PAGES", True)
+
+# 白名单之外拦截的资源类型
+BLOCKED_RESOURCE_TYPES = ["image", "media", "font"]
+
+# 统计 / 广告 / 监控上报域名（含子域名），任何平台、任何资源类型都拦截
+TRACKER_HOSTS = [
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "googlesyndication.com",
+    "bat.bing.com", "sentry.io", "hm.baidu.com",
+    "mcs.snssdk.com", "mon.snssdk.com", "mcs.zijieapi.com", "mon.zijieapi.com",
+    "mcs.tiktokv.com", "mon.tiktokv.com", "analytics.tiktok.com",
+    "aegis.qq.com", "beacon.qq.com", "report.url.cn",
+]
+
+# 平台白名单：上传流程需要的主站和资源域名（含子域名），这些域名的请求不按类型拦截
+ROUTE_POLICIES = {
+    SOCIAL_MEDIA_DOUYIN: {"allow_hosts": ["douyin.com", "douyinpic.com", "byteimg.com", "bytescm.com"]},
+    SOCIAL_MEDIA_KUAISHOU: {"allow_hosts": ["kuaishou.com", "yximgs.com", "kwaicdn.com"]},
+    SOCIAL_MEDIA_XIAOHONGSHU: {"allow_hosts": ["xiaohongshu.com", "xhscdn.com"]},
+    SOCIAL_MEDIA_TENCENT: {"allow_hosts": ["channels.weixin.qq.com", "res.wx.qq.com", "qpic.cn"]},
+    SOCIAL_MEDIA_TIKTOK: {"allow_hosts": ["tiktok.com", "tiktokcdn.com", "tiktokcdn-us.com", "ttwstatic.com"]},
+    SOCIAL_MEDIA_BAIJIAHAO: {"allow_hosts": ["baijiahao.baidu.com", "bdstatic.com", "bcebos.com"]},
+}
+for _platform, _policy in getattr(conf, "ROUTE_POLICIES", {}).items():
+    ROUTE_POLICIES[_platform] = {**ROUTE_POLICIES.get(_platform, {}), **_policy}
+
+
+def _host_matches(host: str, suffixes) -> bool:
+    return any(host == suffix or host.endswith("." + suffix) for suffix in suffixes)
+
+
+class RoutePolicy:
+    def __init__(self, platform: str, allow_hosts=(), block_patterns=(), block_types=BLOCKED_RESOURCE_TYPES):
+        self.platform = platform
+        self.allow_hosts = list(allow_hosts)
+        self.block_patterns = [re.compile(pattern) for pattern in block_patterns]
+        self.block_types = set(block_types)
+        self.blocked = 0
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        host = urlsplit(url).hostname or ""
+        if _host_matches(host, TRACKER_HOSTS):
+            return True
+        if any(pattern.search(url) for pattern in self.block_patterns):
+            return True
+        return resource_type in self.block_types and not _host_matches(host, self.allow_hosts)
+
+    async def handle(self, route, request):
+        try:
+            if self.should_block(request.url, request.resource_type):
+                self.blocked += 1
+                await route.abort("blockedbyclient")
+            else:
+                await route.continue_()
+        except Exception:
+            # 页面已关闭 / 请求已被取消
+            pass
+
+
+def get_route_policy(platform: str):
+    policy = ROUTE_POLICIES.get(platform)
+    return RoutePolicy(platform, **policy) if policy is not None else None
+
+
+async def apply_route_policy(context, platform: str):
+    """
+    在按次创建的上下文上安装平台的拦截策略（页面创建之前调用）；未开启精简模式、没有策略或不支持拦截时原样返回
+    会关闭该上下文的 HTTP 缓存，常驻的持久化上下文使用 block_page_requests()
+    """
+    policy = get_route_policy(platform) if LEAN_PAGES else None
+    if policy is None:
+        return context
+    try:
+        await context.route("**/*", policy.handle)
+    except Exception as e:
+        print(f"⚠️ 无法安装请求拦截策略 [{platform}]: {e}")
+    return context
+
+
+def blocked_url_patterns() -> list:
+    """统计上报域名（含子域名）对应的 Network.setBlockedURLs 通配符"""
+    patterns = []
+    for host in TRACKER_HOSTS:
+        patterns += [f"*://{host}/*", f"*://*.{host}/*"]
+    return patterns
+
+
+async def block_page_requests(context, page, platform: str):
+    """在页面上通过 CDP 拦截统计上报请求（持久化上下文使用，导航之前调用）；未开启精简模式或不支持 CDP 时跳过"""
+    if not LEAN_PAGES:
+        return page
+    try:
+        cdp = await context.new_cdp_session(page)
+        await cdp.send("Network.enable")
+        await cdp.send("Network.setBlockedURLs", {"urls": blocked_url_patterns()})
+    except Exception as e:
+        print(f"⚠️ 无法安装请求拦截 [{platform}]: {e}")
+    return page
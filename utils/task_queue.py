@@ -0,0 +1,483 @@
+# utils/task_queue.py
+"""
+持久化任务队列 - 基于 SQLite tasks 表
+- 任务状态: pending -> running -> completed / failed
+- worker 领取任务时写入 worker_id 和租约到期时间，执行期间定期续约
+- 进程崩溃或重启后，租约过期的 running 任务自动回到 pending（超过最大尝试次数则标记失败）
+- 处理函数抛出 RescheduleTask 时任务延后重新排队（如触发发布限流），不计入尝试次数
+- 固定大小的 worker 线程池按任务类型拉取任务，不再为每个任务单独起线程
+- task_events 表按顺序记录任务执行过程中的结构化事件（上传阶段、百分比、字节数、重试），供 SSE 推送
+"""
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+
+from utils import database
+
+TASK_PENDING = "pending"
+TASK_RUNNING = "running"
+TASK_COMPLETED = "completed"
+TASK_FAILED = "failed"
+
+# worker 租约时长（秒），执行期间每 1/3 租约续约一次
+TASK_LEASE_SECONDS = 60
+# 默认 worker 数量
+TASK_WORKER_COUNT = 2
+# 队列空闲时的轮询间隔（秒），同进程内入队会立即唤醒 worker
+TASK_POLL_INTERVAL = 2
+# 默认最大尝试次数（含租约过期后的重新执行）
+TASK_MAX_ATTEMPTS = 3
+# 已结束任务的保留天数
+TASK_RETENTION_DAYS = 7
+
+TASK_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    progress REAL DEFAULT 0,
+    message TEXT DEFAULT '',
+    result TEXT,
+    error TEXT,
+    worker_id TEXT,
+    lease_expires_at REAL,
+    attempts INTEGER DEFAULT 0,
+    max_attempts INTEGER DEFAULT 3,
+    available_at REAL DEFAULT 0,
+    parent_id TEXT,
+    created_at TEXT,
+    started_at TEXT,
+    completed_at TEXT,
+    updated_at TEXT
+)
+'''
+TASK_INDEX_SQL = [
+    'CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks(status, kind, available_at)',
+    'CREATE INDEX IF NOT EXISTS idx_tasks_lease ON tasks(status, lease_expires_at)',
+    'CREATE INDEX IF NOT EXISTS idx_tasks_kind_created ON tasks(kind, created_at)',
+    'CREATE INDEX IF NOT EXISTS idx_tasks_parent ON tasks(parent_id)',
+]
+TASK_EVENT_TABLE_SQL = '''
+CREATE TABLE IF NOT EXISTS task_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    data TEXT,
+    created_at REAL NOT NULL
+)
+'''
+# 单次读取的事件数上限
+TASK_EVENT_BATCH = 500
+
+_table_ready = False
+_table_lock = threading.Lock()
+
+
+def init_task_table():
+    """创建 tasks 表和索引（幂等）"""
+    global _table_ready
+    if _table_ready:
+        return
+    with _table_lock:
+        if _table_ready:
+            return
+        with database.transaction() as conn:
+            conn.execute(TASK_TABLE_SQL)
+            conn.execute(TASK_EVENT_TABLE_SQL)
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_task_events_task ON task_events(task_id, id)')
+        # 兼容没有 parent_id 列的旧表
+        database.ensure_columns('tasks', {'parent_id': 'TEXT'})
+        with database.transaction() as conn:
+            for sql in TASK_INDEX_SQL:
+                conn.execute(sql)
+        _table_ready = True
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+def _row_to_task(row) -> dict:
+    if row is None:
+        return None
+    task = dict(row)
+    task["payload"] = json.loads(task["payload"]) if task["payload"] else None
+    task["result"] = json.loads(task["result"]) if task["result"] else None
+    return task
+
+
+def enqueue(kind: str, payload, task_id: str = None, result=None, max_attempts: int = TASK_MAX_ATTEMPTS,
+            delay: float = 0) -> str:
+    """新建任务并返回任务ID；同进程内的 worker 池会被立即唤醒"""
+    init_task_table()
+    task_id = task_id or uuid.uuid4().hex
+    now = _now()
+    database.execute('''
+        INSERT INTO tasks (id, kind, payload, status, result, max_attempts, available_at, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (task_id, kind, json.dumps(payload, ensure_ascii=False),
+          TASK_PENDING, json.dumps(result, ensure_ascii=False) if result is not None else None,
+          max_attempts, time.time() + delay, now, now))
+    _notify_pools()
+    return task_id
+
+
+def enqueue_group(kind: str, payload, children: list, task_id: str = None, result=None,
+                  max_attempts: int = TASK_MAX_ATTEMPTS) -> str:
+    """
+    在一个事务中创建父任务和子任务，children 为 (kind, payload) 列表
+    父任务只用来汇总子任务状态，不会被 worker 领取（直接处于 running 且没有租约）
+    """
+    init_task_table()
+    task_id = task_id or uuid.uuid4().hex
+    now = _now()
+    with database.transaction() as conn:
+        conn.execute('''
+            INSERT INTO tasks (id, kind, payload, status, result, max_attempts, available_at, created_at, started_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (task_id, kind, json.dumps(payload, ensure_ascii=False), TASK_RUNNING,
+              json.dumps(result, ensure_ascii=False) if result is not None else None,
+              max_attempts, time.time(), now, now, now))
+        conn.executemany('''
+            INSERT INTO tasks (id, kind, payload, status, max_attempts, available_at, parent_id, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(uuid.uuid4().hex, child_kind, json.dumps(child_payload, ensure_ascii=False), TASK_PENDING,
+               max_attempts, time.time(), task_id, now, now) for child_kind, child_payload in children])
+    _notify_pools()
+    return task_id
+
+
+def list_children(parent_id: str) -> list:
+    return [_row_to_task(row) for row in database.query(
+        "SELECT * FROM tasks WHERE parent_id = ? ORDER BY created_at, rowid", (parent_id,))]
+
+
+def list_children_of(parent_ids: list) -> dict:
+    """一次查询多个父任务的子任务，返回 父任务ID -> 子任务列表"""
+    children = {parent_id: [] for parent_id in parent_ids}
+    if not parent_ids:
+        return children
+    placeholders = ", ".join("?" for _ in parent_ids)
+    rows = database.query(f'''
+        SELECT * FROM tasks WHERE parent_id IN ({placeholders}) ORDER BY created_at, rowid
+    ''', tuple(parent_ids))
+    for row in rows:
+        children[row["parent_id"]].append(_row_to_task(row))
+    return children
+
+
+def list_settled_parents(kind: str) -> list:
+    """子任务已全部结束、自身仍处于 running 的父任务ID（enqueue_group 创建的父任务没有租约）"""
+    init_task_table()
+    rows = database.query('''
+        SELECT id FROM tasks AS parent
+        WHERE kind = ? AND status = ? AND lease_expires_at IS NULL
+          AND EXISTS (SELECT 1 FROM tasks WHERE parent_id = parent.id)
+          AND NOT EXISTS (SELECT 1 FROM tasks WHERE parent_id = parent.id AND status IN (?, ?))
+    ''', (kind, TASK_RUNNING, TASK_PENDING, TASK_RUNNING))
+    return [row["id"] for row in rows]
+
+
+def claim(kinds: list, worker_id: str, lease_seconds: float = TASK_LEASE_SECONDS) -> dict:
+    """原子地领取一个到期的 pending 任务（BEGIN IMMEDIATE 保证多进程下不会重复领取）"""
+    init_task_table()
+    placeholders = ", ".join("?" for _ in kinds)
+    now = time.time()
+    with database.transaction() as conn:
+        row = conn.execute(f'''
+            SELECT id FROM tasks
+            WHERE status = ? AND kind IN ({placeholders}) AND available_at <= ?
+            ORDER BY available_at, created_at
+            LIMIT 1
+        ''', (TASK_PENDING, *kinds, now)).fetchone()
+        if row is None:
+            return None
+        conn.execute('''
+            UPDATE tasks
+            SET status = ?, worker_id = ?, lease_expires_at = ?, attempts = attempts + 1,
+                started_at = COALESCE(started_at, ?), updated_at = ?
+            WHERE id = ?
+        ''', (TASK_RUNNING, worker_id, now + lease_seconds, _now(), _now(), row["id"]))
+        return _row_to_task(conn.execute("SELECT * FROM tasks WHERE id = ?", (row["id"],)).fetchone())
+
+
+def heartbeat(task_id: str, worker_id: str, lease_seconds: float = TASK_LEASE_SECONDS) -> bool:
+    """续约，返回当前 worker 是否仍持有该任务"""
+    cursor = database.execute('''
+        UPDATE tasks SET lease_expires_at = ?
+        WHERE id = ? AND worker_id = ? AND status = ?
+    ''', (time.time() + lease_seconds, task_id, worker_id, TASK_RUNNING))
+    return cursor.rowcount > 0
+
+
+def update_progress(task_id: str, progress: float = None, message: str = None, result=None):
+    """更新任务进度 / 提示信息 / 中间结果（None 表示不修改）"""
+    database.execute('''
+        UPDATE tasks
+        SET progress = COALESCE(?, progress),
+            message = COALESCE(?, message),
+            result = COALESCE(?, result),
+            updated_at = ?
+        WHERE id = ?
+    ''', (progress, message, json.dumps(result, ensure_ascii=False) if result is not None else None, _now(), task_id))
+
+
+def add_event(task_id: str, event: dict):
+    """追加一条任务事件，event["type"] 为事件类型"""
+    init_task_table()
+    database.execute('''
+        INSERT INTO task_events (task_id, type, data, created_at) VALUES (?, ?, ?, ?)
+    ''', (task_id, event["type"], json.dumps(event, ensure_ascii=False), time.time()))
+
+
+def list_events(task_ids: list, after_id: int = 0, limit: int = TASK_EVENT_BATCH) -> list:
+    """按写入顺序返回这些任务中 id > after_id 的事件，每条为 {id, task_id, ...事件字段}"""
+    init_task_table()
+    if not task_ids:
+        return []
+    placeholders = ", ".join("?" for _ in task_ids)
+    rows = database.query(f'''
+        SELECT id, task_id, data FROM task_events
+        WHERE task_id IN ({placeholders}) AND id > ?
+        ORDER BY id LIMIT ?
+    ''', (*task_ids, after_id, limit))
+    return [{"id": row["id"], "task_id": row["task_id"], **json.loads(row["data"])} for row in rows]
+
+
+def complete(task_id: str, result=None, message: str = None):
+    database.execute('''
+        UPDATE tasks
+        SET status = ?, progress = 100, result = COALESCE(?, result), message = COALESCE(?, message),
+            error = NULL, worker_id = NULL, lease_expires_at = NULL, completed_at = ?, updated_at = ?
+        WHERE id = ?
+    ''', (TASK_COMPLETED, json.dumps(result, ensure_ascii=False) if result is not None else None,
+          message, _now(), _now(), task_id))
+
+
+def fail(task_id: str, error: str, retry: bool = False, delay: float = 0, message: str = None):
+    """标记任务失败；retry=True 且还有剩余尝试次数时重新排队"""
+    with database.transaction() as conn:
+        row = conn.execute("SELECT attempts, max_attempts FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        if row is None:
+            return
+        if retry and row["attempts"] < row["max_attempts"]:
+            conn.execute('''
+                UPDATE tasks
+                SET status = ?, error = ?, message = COALESCE(?, message), worker_id = NULL,
+                    lease_expires_at = NULL, available_at = ?, updated_at = ?
+                WHERE id = ?
+            ''', (TASK_PENDING, error, message, time.time() + delay, _now(), task_id))
+        else:
+            conn.execute('''
+                UPDATE tasks
+                SET status = ?, error = ?, message = COALESCE(?, message), worker_id = NULL,
+                    lease_expires_at = NULL, completed_at = ?, updated_at = ?
+                WHERE id = ?
+            ''', (TASK_FAILED, error, message, _now(), _now(), task_id))
+
+
+def reschedule(task_id: str, delay: float, message: str = None):
+    """任务暂时无法执行（如触发限流）：回到 pending，delay 秒后再被领取，不计入尝试次数"""
+    database.execute('''
+        UPDATE tasks
+        SET status = ?, message = COALESCE(?, message), worker_id = NULL, lease_expires_at = NULL,
+            attempts = MAX(attempts - 1, 0), available_at = ?, updated_at = ?
+        WHERE id = ?
+    ''', (TASK_PENDING, message, time.time() + delay, _now(), task_id))
+
+
+def recover_expired_tasks() -> int:
+    """回收租约过期的 running 任务（worker 崩溃 / 进程重启），返回回收数量"""
+    init_task_table()
+    now = time.time()
+    with database.transaction() as conn:
+        requeued = conn.execute('''
+            UPDATE tasks
+            SET status = ?, worker_id = NULL, lease_expires_at = NULL, message = '任务中断，等待重新执行', updated_at = ?
+            WHERE status = ? AND lease_expires_at < ? AND attempts < max_attempts
+        ''', (TASK_PENDING, _now(), TASK_RUNNING, now)).rowcount
+        failed = conn.execute('''
+            UPDATE tasks
+            SET status = ?, worker_id = NULL, lease_expires_at = NULL, error = '任务中断且超过最大尝试次数',
+                completed_at = ?, updated_at = ?
+            WHERE status = ? AND lease_expires_at < ?
+        ''', (TASK_FAILED, _now(), _now(), TASK_RUNNING, now)).rowcount
+    if requeued or failed:
+        print(f"♻️ 任务队列: 回收 {requeued} 个中断任务，{failed} 个标记失败")
+    return requeued + failed
+
+
+def purge_finished_tasks(retention_days: int = TASK_RETENTION_DAYS) -> int:
+    """删除超过保留期的已结束任务"""
+    cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat()
+    with database.transaction() as conn:
+        deleted = conn.execute('''
+            DELETE FROM tasks WHERE status IN (?, ?) AND completed_at < ?
+        ''', (TASK_COMPLETED, TASK_FAILED, cutoff)).rowcount
+        conn.execute("DELETE FROM task_events WHERE task_id NOT IN (SELECT id FROM tasks)")
+    return deleted
+
+
+def get_task(task_id: str, kind: str = None) -> dict:
+    init_task_table()
+    if kind:
+        row = database.query_one("SELECT * FROM tasks WHERE id = ? AND kind = ?", (task_id, kind))
+    else:
+        row = database.query_one("SELECT * FROM tasks WHERE id = ?", (task_id,))
+    return _row_to_task(row)
+
+
+def list_tasks(kind: str = None, status: str = None, limit: int = 100) -> list:
+    """按创建时间倒序列出任务"""
+    init_task_table()
+    conditions, params = [], []
+    if kind:
+        conditions.append("kind = ?")
+        params.append(kind)
+    if status:
+        conditions.append("status = ?")
+        params.append(status)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    rows = database.query(f"SELECT * FROM tasks {where} ORDER BY created_at DESC LIMIT ?", (*params, limit))
+    return [_row_to_task(row) for row in rows]
+
+
+class RescheduleTask(Exception):
+    """任务处理函数抛出此异常表示稍后重试（不是失败），delay 秒后重新执行"""
+
+    def __init__(self, delay: float, message: str = None):
+        super().__init__(message or f"{delay:.0f} 秒后重试")
+        self.delay = delay
+        self.message = message
+
+
+class TaskContext:
+    """传给任务处理函数：上报进度、读取任务信息"""
+
+    def __init__(self, task: dict, worker_id: str):
+        self.task = task
+        self.task_id = task["id"]
+        self.worker_id = worker_id
+
+    @property
+    def final_attempt(self) -> bool:
+        return self.task["attempts"] >= self.task["max_attempts"]
+
+    def update(self, progress: float = None, message: str = None, result=None):
+        update_progress(self.task_id, progress, message, result)
+
+    def event(self, event: dict):
+        add_event(self.task_id, event)
+
+
+_pools = []
+
+
+def _notify_pools():
+    for pool in list(_pools):
+        pool.notify()
+
+
+class TaskWorkerPool:
+    """
+    固定大小的 worker 线程池
+    handlers: 任务类型 -> 处理函数 handler(task: dict, ctx: TaskContext)，返回值作为任务结果
+    """
+
+    def __init__(self, handlers: dict, size: int = TASK_WORKER_COUNT, lease_seconds: float = TASK_LEASE_SECONDS,
+                 poll_interval: float = TASK_POLL_INTERVAL, name: str = "tasks"):
+        self.handlers = handlers
+        self.size = size
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.name = name
+        self._prefix = f"{socket.gethostname()}-{os.getpid()}-{name}"
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._running = {}
+        self._running_lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        """启动 worker 线程和维护线程（重复调用无副作用）"""
+        if self._threads:
+            return self
+        init_task_table()
+        recover_expired_tasks()
+        for index in range(self.size):
+            thread = threading.Thread(target=self._worker_loop, args=(f"{self._prefix}-{index}",),
+                                      name=f"sau-worker-{self.name}-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        maintenance = threading.Thread(target=self._maintenance_loop, name=f"sau-worker-{self.name}-lease", daemon=True)
+        maintenance.start()
+        self._threads.append(maintenance)
+        _pools.append(self)
+        print(f"🧵 任务池 {self.name} 已启动: {self.size} 个 worker，任务类型 {', '.join(self.handlers)}")
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+        if self in _pools:
+            _pools.remove(self)
+
+    def notify(self):
+        self._wakeup.set()
+
+    def _worker_loop(self, worker_id: str):
+        while not self._stopped.is_set():
+            try:
+                task = claim(list(self.handlers), worker_id, self.lease_seconds)
+            except Exception as e:
+                print(f"⚠️ 任务池 {self.name}: 领取任务失败: {e}")
+                task = None
+            if task is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._execute(task, worker_id)
+
+    def _execute(self, task: dict, worker_id: str):
+        task_id = task["id"]
+        with self._running_lock:
+            self._running[task_id] = worker_id
+        ctx = TaskContext(task, worker_id)
+        try:
+            result = self.handlers[task["kind"]](task, ctx)
+            complete(task_id, result)
+        except RescheduleTask as e:
+            print(f"⏳ 任务 {task_id} ({task['kind']}) 延后 {e.delay:.0f} 秒执行: {e}")
+            reschedule(task_id, e.delay, str(e))
+        except Exception as e:
+            print(f"❌ 任务 {task_id} ({task['kind']}) 执行失败: {e}")
+            traceback.print_exc()
+            fail(task_id, str(e))
+        finally:
+            with self._running_lock:
+                self._running.pop(task_id, None)
+
+    def _maintenance_loop(self):
+        """续约本进程正在执行的任务，回收过期任务，清理历史任务"""
+        last_purge = 0
+        while not self._stopped.wait(self.lease_seconds / 3):
+            with self._running_lock:
+                running = list(self._running.items())
+            for task_id, worker_id in running:
+                try:
+                    heartbeat(task_id, worker_id, self.lease_seconds)
+                except Exception as e:
+                    print(f"⚠️ 任务 {task_id} 续约失败: {e}")
+            try:
+                recover_expired_tasks()
+                if time.time() - last_purge > 3600:
+                    purge_finished_tasks()
+                    last_purge = time.time()
+            except Exception as e:
+                print(f"⚠️ 任务池 {self.name}: 维护失败: {e}")
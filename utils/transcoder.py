@@ -0,0 +1,198 @@
+# utils/transcoder.py
+"""
+发布前转码 - 按平台规格检查视频（体积、码率、分辨率、画面比例、编码、容器），不符合时用 ffmpeg 转码
+- 转码结果按 (源文件 digest, 规格) 缓存在 videoFile/.transcoded/ 下，同一个源文件发到多个平台时每种规格最多转码一次
+- 同时进行的 ffmpeg 数量按 CPU 核数限制，同一缓存键的并发请求共用一次转码
+- 默认关闭，在 conf.py 中设置 ENABLE_TRANSCODE = True 开启；规格可以用 TRANSCODE_PROFILES 覆盖
+"""
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, Future
+from pathlib import Path
+
+import conf
+from conf import BASE_DIR
+from utils import content_store
+from utils.base_social_media import SOCIAL_MEDIA_DOUYIN, SOCIAL_MEDIA_TENCENT, SOCIAL_MEDIA_KUAISHOU, \
+    SOCIAL_MEDIA_XIAOHONGSHU, SOCIAL_MEDIA_TIKTOK
+
+VIDEO_DIR = Path(BASE_DIR / "videoFile")
+TRANSCODE_DIR = VIDEO_DIR / ".transcoded"
+FFMPEG_PATH = getattr(conf, "FFMPEG_PATH", None) or "ffmpeg"
+ENABLE_TRANSCODE = getattr(conf, "ENABLE_TRANSCODE", False)
+# 同时运行的 ffmpeg 进程数（每个 ffmpeg 自己是多线程的，按核数的一半限制）
+TRANSCODE_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+# 单个文件转码超时（秒）
+TRANSCODE_TIMEOUT = 3600
+
+# 平台规格：最大体积（字节）、最大码率（bps）、最长边、允许的画面比例范围（宽/高）、编码和容器
+PLATFORM_PROFILES = {
+    SOCIAL_MEDIA_DOUYIN: {
+        "max_size": 4 * 1024 ** 3, "max_bitrate": 20_000_000, "max_long_side": 3840,
+        "aspect_range": None, "video_codecs": ["h264", "hevc"], "containers": ["mp4", "mov"],
+    },
+    SOCIAL_MEDIA_KUAISHOU: {
+        "max_size": 4 * 1024 ** 3, "max_bitrate": 15_000_000, "max_long_side": 3840,
+        "aspect_range": None, "video_codecs": ["h264", "hevc"], "containers": ["mp4", "mov"],
+    },
+    SOCIAL_MEDIA_XIAOHONGSHU: {
+        "max_size": 5 * 1024 ** 3, "max_bitrate": 20_000_000, "max_long_side": 3840,
+        "aspect_range": [9 / 16, 16 / 9], "video_codecs": ["h264", "hevc"], "containers": ["mp4", "mov"],
+    },
+    SOCIAL_MEDIA_TENCENT: {
+        "max_size": 4 * 1024 ** 3, "max_bitrate": 15_000_000, "max_long_side": 3840,
+        "aspect_range": None, "video_codecs": ["h264"], "containers": ["mp4"],
+    },
+    SOCIAL_MEDIA_TIKTOK: {
+        "max_size": 4 * 1024 ** 3, "max_bitrate": 15_000_000, "max_long_side": 1920,
+        "aspect_range": [9 / 16, 16 / 9], "video_codecs": ["h264", "hevc"], "containers": ["mp4", "mov"],
+    },
+    "bilibili": {
+        "max_size": 8 * 1024 ** 3, "max_bitrate": 20_000_000, "max_long_side": 3840,
+        "aspect_range": None, "video_codecs": ["h264", "hevc"], "containers": ["mp4", "mov", "flv"],
+    },
+}
+PLATFORM_PROFILES.update(getattr(conf, "TRANSCODE_PROFILES", {}))
+
+# 源文件的 blob 删除时清理对应的转码缓存
+content_store.register_derived_dir(TRANSCODE_DIR)
+
+
+class TranscodeError(Exception):
+    """ffmpeg 转码失败"""
+
+
+def profile_key(profile: dict) -> str:
+    """规格内容的短哈希：规格相同的平台共用转码结果，规格调整后旧缓存自动失效"""
+    return hashlib.sha1(json.dumps(profile, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def conformance_issues(metadata: dict, size: int, profile: dict) -> list:
+    """返回不符合平台规格的原因列表，空列表表示可以直接上传"""
+    issues = []
+    if size > profile["max_size"]:
+        issues.append(f"文件大小 {size} 超过 {profile['max_size']}")
+    if metadata.get("bitrate") and metadata["bitrate"] > profile["max_bitrate"]:
+        issues.append(f"码率 {metadata['bitrate']} 超过 {profile['max_bitrate']}")
+    if metadata.get("video_codec") not in profile["video_codecs"]:
+        issues.append(f"视频编码 {metadata.get('video_codec')} 不支持")
+    containers = set((metadata.get("container") or "").split(","))
+    if not containers & set(profile["containers"]):
+        issues.append(f"容器 {metadata.get('container')} 不支持")
+    width, height = metadata.get("width"), metadata.get("height")
+    if width and height:
+        if max(width, height) > profile["max_long_side"]:
+            issues.append(f"分辨率 {width}x{height} 超过 {profile['max_long_side']}")
+        if profile["aspect_range"]:
+            if metadata.get("rotation") in (90, 270):
+                width, height = height, width
+            low, high = profile["aspect_range"]
+            if not low <= width / height <= high:
+                issues.append(f"画面比例 {width}:{height} 超出范围")
+    return issues
+
+
+def _build_command(source: Path, target: Path, metadata: dict, profile: dict, threads: int) -> list:
+    long_side = profile["max_long_side"]
+    # 保持比例缩放到最长边以内（偶数尺寸），超出比例范围时补黑边
+    filters = [f"scale='if(gt(iw,ih),min(iw,{long_side}),-2)':'if(gt(iw,ih),-2,min(ih,{long_side}))'"]
+    if profile["aspect_range"]:
+        low, high = profile["aspect_range"]
+        filters.append(f"pad='max(iw,ceil(ih*{low}/2)*2)':'max(ih,ceil(iw/{high}/2)*2)':(ow-iw)/2:(oh-ih)/2")
+    # 目标码率：不超过平台上限，也不高于源码率，避免无谓放大
+    bitrate = min(profile["max_bitrate"], metadata.get("bitrate") or profile["max_bitrate"])
+    video_bitrate = int(bitrate * 0.9)
+    # 体积上限按时长折算码率
+    if metadata.get("duration"):
+        video_bitrate = min(video_bitrate, int(profile["max_size"] * 8 * 0.95 / metadata["duration"]) - 128_000)
+    return [
+        FFMPEG_PATH, "-hide_banner", "-loglevel", "error", "-y", "-i", str(source),
+        "-vf", ",".join(filters),
+        "-c:v", "libx264", "-preset", "veryfast", "-profile:v", "high", "-pix_fmt", "yuv420p",
+        "-b:v", str(video_bitrate), "-maxrate", str(video_bitrate), "-bufsize", str(video_bitrate * 2),
+        "-c:a", "aac", "-b:a", "128k",
+        "-movflags", "+faststart", "-threads", str(threads),
+        str(target),
+    ]
+
+
+class Transcoder:
+    def __init__(self, workers: int = TRANSCODE_WORKERS):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sau-transcode")
+        self._inflight = {}
+        # 可重入：转码很快结束时 done 回调会在 submit 所在线程里立即执行
+        self._lock = threading.RLock()
+
+    def transcode_for_platform(self, source, platform: str, metadata: dict) -> Future:
+        """
+        返回 Future，结果为可以直接上传的文件路径：
+        符合规格时就是源文件；否则为缓存中的转码结果（不存在时转码）
+        可能需要计算源文件 digest，异步调用方应放到线程中执行
+        """
+        future = Future()
+        source = Path(source)
+        profile = PLATFORM_PROFILES.get(platform)
+        if profile is None or not metadata:
+            future.set_result(source)
+            return future
+        issues = conformance_issues(metadata, os.path.getsize(source), profile)
+        if not issues:
+            future.set_result(source)
+            return future
+
+        target = TRANSCODE_DIR / content_store.path_digest(source) / f"{profile_key(profile)}.mp4"
+        if target.exists():
+            print(f"♻️ 使用已转码文件 [{platform}] {source.name}")
+            future.set_result(target)
+            return future
+        with self._lock:
+            inflight = self._inflight.get(target)
+            if inflight is None:
+                print(f"🎞️ 转码 [{platform}] {source.name}: {'；'.join(issues)}")
+                inflight = self._executor.submit(self._transcode, source, target, metadata, profile)
+                self._inflight[target] = inflight
+                inflight.add_done_callback(lambda _: self._forget(target))
+        return inflight
+
+    def _forget(self, target: Path):
+        with self._lock:
+            self._inflight.pop(target, None)
+
+    def _transcode(self, source: Path, target: Path, metadata: dict, profile: dict) -> Path:
+        if shutil.which(FFMPEG_PATH) is None:
+            raise TranscodeError(f"未找到 ffmpeg（{FFMPEG_PATH}）")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再改名，其他进程不会读到半个文件
+        tmp = target.with_name(f".{uuid.uuid4().hex}.mp4")
+        threads = max(1, (os.cpu_count() or 2) // self.workers)
+        try:
+            completed = subprocess.run(_build_command(source, tmp, metadata, profile, threads),
+                                       capture_output=True, timeout=TRANSCODE_TIMEOUT)
+            if completed.returncode != 0:
+                message = completed.stderr.decode("utf-8", errors="replace").strip().splitlines()
+                raise TranscodeError(message[-1] if message else f"ffmpeg 退出码 {completed.returncode}")
+            os.replace(tmp, target)
+        except subprocess.TimeoutExpired:
+            raise TranscodeError("转码超时")
+        finally:
+            tmp.unlink(missing_ok=True)
+        print(f"✅ 转码完成: {target.relative_to(VIDEO_DIR)}")
+        return target
+
+
+_transcoder = None
+_transcoder_lock = threading.Lock()
+
+
+def get_transcoder() -> Transcoder:
+    global _transcoder
+    with _transcoder_lock:
+        if _transcoder is None:
+            _transcoder = Transcoder()
+    return _transcoder
@@ -0,0 +1,208 @@
+# utils/upload_progress.py
+"""
+上传进度上报 - 上传器通过 self.progress 发出结构化事件，由调用方写入任务库并通过 SSE 推送
+- phase：阶段开始 / 结束及耗时（启动浏览器、上传视频、填写信息、发布等），进入下一阶段时上一阶段自动结束
+- percent：页面上显示的上传百分比（MutationObserver 监听进度条，不轮询）
+- bytes：浏览器实际发出的上传请求体字节数和平均吞吐量
+- retry：上传失败重传、发布按钮重复点击等重试
+percent / bytes 事件按 EVENT_MIN_INTERVAL 节流；没有设置 sink 时只在本地汇总，summary() 写入发布结果
+"""
+import json
+import threading
+import time
+
+from utils import task_queue
+
+# 同一任务 percent / bytes 事件的最小间隔（秒），100% 总是上报
+EVENT_MIN_INTERVAL = 1.0
+# 计入上传字节数的最小请求体（字节），忽略普通接口请求
+UPLOAD_REQUEST_MIN_BYTES = 64 * 1024
+# 页面上的进度元素（class 含 progress 或 role=progressbar），读取其中的 "NN%" 或 aria-valuenow
+DEFAULT_PERCENT_SELECTOR = '[class*="progress"], [role="progressbar"]'
+# SSE 没有新事件时的轮询间隔（秒），事件可能由其他进程（sau_worker）写入
+SSE_POLL_INTERVAL = 1.0
+
+# 页面内的进度监听脚本：DOM 变化时（最多每 250ms 一次）扫描进度元素，数值变化时回调 Python
+PERCENT_OBSERVER_JS = '''
+(selector) => {
+    const install = () => {
+        if (window.__sauPercentObserver || !document.body) return;
+        let last = null, scheduled = false;
+        const read = (el) => {
+            const value = el.getAttribute('aria-valuenow');
+            if (value !== null && value !== '') return parseFloat(value);
+            const match = (el.textContent || '').match(/(\\d{1,3}(?:\\.\\d+)?)\\s*%/);
+            return match ? parseFloat(match[1]) : null;
+        };
+        const scan = () => {
+            scheduled = false;
+            for (const el of document.querySelectorAll(selector)) {
+                const value = read(el);
+                if (value === null || isNaN(value) || value > 100) continue;
+                if (value !== last) {
+                    last = value;
+                    window.__sauUploadPercent(value);
+                }
+                return;
+            }
+        };
+        window.__sauPercentObserver = new MutationObserver(() => {
+            if (!scheduled) {
+                scheduled = true;
+                setTimeout(scan, 250);
+            }
+        });
+        window.__sauPercentObserver.observe(document.body, {subtree: true, childList: true, characterData: true, attributes: true});
+    };
+    if (document.body) install();
+    else document.addEventListener('DOMContentLoaded', install);
+}
+'''
+
+
+class UploadProgress:
+    """
+    上传器的进度钩子：uploader.progress = UploadProgress(platform, account, file, sink)
+    sink(event: dict) 在事件循环线程中同步调用，出错只打印不影响上传
+    """
+
+    def __init__(self, platform: str = None, account: str = None, file: str = None, sink=None, **context):
+        self.context = {"platform": platform, "account": account, "file": file, **context}
+        self.sink = sink
+        self.phases = {}
+        self.retries = 0
+        self.percent_value = None
+        self.bytes_sent = 0
+        self.bytes_total = None
+        self._phase = None
+        self._phase_started = None
+        self._bytes_started = None
+        self._last_emit = {}
+        self._lock = threading.Lock()
+
+    def emit(self, event_type: str, **data):
+        event = {"type": event_type, "at": round(time.time(), 3), **self.context, **data}
+        if self.sink is None:
+            return
+        try:
+            self.sink(event)
+        except Exception as e:
+            print(f"⚠️ 上传进度上报失败: {e}")
+
+    def _throttled(self, event_type: str, final: bool) -> bool:
+        now = time.monotonic()
+        if not final and now - self._last_emit.get(event_type, 0) < EVENT_MIN_INTERVAL:
+            return True
+        self._last_emit[event_type] = now
+        return False
+
+    def phase(self, name: str):
+        """进入新阶段（上一阶段随之结束并记录耗时）"""
+        self._end_phase("end")
+        self._phase = name
+        self._phase_started = time.monotonic()
+        self.emit("phase", phase=name, status="start")
+
+    def _end_phase(self, status: str, error: str = None):
+        if self._phase is None:
+            return
+        elapsed = round(time.monotonic() - self._phase_started, 2)
+        self.phases[self._phase] = round(self.phases.get(self._phase, 0) + elapsed, 2)
+        self.emit("phase", phase=self._phase, status=status, elapsed=elapsed, **({"error": error} if error else {}))
+        self._phase = None
+
+    def finish(self, error: str = None):
+        """上传结束（调用方在 main() 返回或抛出异常后调用）"""
+        self._end_phase("error" if error else "end", error)
+        self.emit("finish", success=error is None, **self.summary())
+
+    def percent(self, value: float):
+        """页面显示的上传百分比"""
+        value = round(min(max(float(value), 0), 100), 1)
+        if value == self.percent_value:
+            return
+        self.percent_value = value
+        if not self._throttled("percent", value >= 100):
+            self.emit("percent", percent=value)
+
+    def add_bytes(self, sent: int, total: int = None):
+        """累计浏览器（或 SDK）发出的上传字节数"""
+        with self._lock:
+            if self._bytes_started is None:
+                self._bytes_started = time.monotonic()
+            self.bytes_sent += sent
+            if total:
+                self.bytes_total = total
+            final = self.bytes_total is not None and self.bytes_sent >= self.bytes_total
+        if not self._throttled("bytes", final):
+            self.emit("bytes", sent=self.bytes_sent, total=self.bytes_total, throughput=self.throughput())
+
+    def throughput(self):
+        """平均上传速度（字节/秒）"""
+        if not self.bytes_sent or self._bytes_started is None:
+            return None
+        return round(self.bytes_sent / max(time.monotonic() - self._bytes_started, 0.001))
+
+    def retry(self, reason: str):
+        self.retries += 1
+        self.emit("retry", reason=reason, retries=self.retries, phase=self._phase)
+
+    def summary(self) -> dict:
+        return {
+            "phases": dict(self.phases),
+            "retries": self.retries,
+            "percent": self.percent_value,
+            "bytes_sent": self.bytes_sent,
+            "throughput": self.throughput(),
+        }
+
+
+async def watch_page(page, progress: UploadProgress, percent_selector: str = DEFAULT_PERCENT_SELECTOR):
+    """
+    在打开发布页之前调用：监听页面进度条百分比和上传请求体大小
+    监听脚本随每次导航重新注入；页面不支持时（兼容模式页面等）静默跳过
+    """
+    async def on_request_finished(request):
+        if request.method not in ("POST", "PUT", "PATCH"):
+            return
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        if sizes["requestBodySize"] >= UPLOAD_REQUEST_MIN_BYTES:
+            progress.add_bytes(sizes["requestBodySize"])
+
+    try:
+        await page.expose_function("__sauUploadPercent", progress.percent)
+        await page.add_init_script(f"({PERCENT_OBSERVER_JS})({json.dumps(percent_selector)})")
+        page.on("requestfinished", on_request_finished)
+    except Exception as e:
+        print(f"⚠️ 无法监听上传进度: {e}")
+
+
+def task_event_sink(task_id: str, on_percent=None):
+    """把事件写入任务事件表的 sink；on_percent(job, percent) 用于同时更新任务整体进度"""
+    def sink(event: dict):
+        task_queue.add_event(task_id, event)
+        if on_percent and event["type"] == "percent":
+            on_percent(event.get("job"), event["percent"])
+    return sink
+
+
+def sse_events(task_ids, after_id: int = 0, is_finished=None, poll_interval: float = SSE_POLL_INTERVAL):
+    """
+    SSE 生成器：推送任务事件表中 id > after_id 的事件（带 id 字段，断线后按 Last-Event-ID 续传）
+    task_ids() 返回要推送的任务ID列表（批量任务包含子任务），is_finished() 为真且事件推送完毕时结束
+    """
+    while True:
+        # 先判断是否结束再读取，避免漏掉任务结束前最后写入的事件
+        finished = is_finished is None or is_finished()
+        events = task_queue.list_events(task_ids(), after_id)
+        for event in events:
+            after_id = event["id"]
+            yield f"id: {after_id}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        if not events:
+            if finished:
+                yield f"event: end\ndata: {json.dumps({'last_id': after_id})}\n\n"
+                return
+            time.sleep(poll_interval)
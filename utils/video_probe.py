@@ -0,0 +1,240 @@
+# utils/video_probe.py
+"""
+视频探测 - 上传完成后立即用 ffprobe 读取容器、编码、时长、分辨率、码率、旋转角度，写入 file_records
+- 探测在有上限的 ffprobe 子进程池中执行，不阻塞上传请求
+- 相同内容（digest）已经探测过的直接复用结果
+- 发布前检查探测结果，损坏 / 不支持的文件在启动浏览器之前就失败
+未安装 ffprobe 时跳过探测（只打印一次警告），不影响上传和发布
+"""
+import json
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import conf
+from conf import BASE_DIR
+from utils import database
+
+VIDEO_DIR = Path(BASE_DIR / "videoFile")
+# 可以在 conf.py 中用 FFPROBE_PATH 指定 ffprobe 路径
+FFPROBE_PATH = getattr(conf, "FFPROBE_PATH", None) or "ffprobe"
+# 同时运行的 ffprobe 进程数
+PROBE_WORKERS = 2
+# 单个文件探测超时（秒）
+PROBE_TIMEOUT = 60
+
+PROBE_PENDING = "pending"
+PROBE_OK = "ok"
+PROBE_FAILED = "failed"
+
+# file_records 中保存的元数据列
+PROBE_COLUMNS = {
+    'probe_status': 'TEXT',
+    'probe_error': 'TEXT',
+    'container': 'TEXT',
+    'video_codec': 'TEXT',
+    'audio_codec': 'TEXT',
+    'duration': 'REAL',
+    'width': 'INTEGER',
+    'height': 'INTEGER',
+    'bitrate': 'INTEGER',
+    'fps': 'REAL',
+    'rotation': 'INTEGER',
+}
+METADATA_FIELDS = [name for name in PROBE_COLUMNS if name not in ('probe_status', 'probe_error')]
+
+
+class ProbeError(Exception):
+    """文件无法解析，或不包含视频流"""
+
+
+_columns_ready = False
+_columns_lock = threading.Lock()
+_warned_missing = False
+
+
+def init_probe_columns():
+    global _columns_ready
+    if _columns_ready:
+        return
+    with _columns_lock:
+        if not _columns_ready:
+            database.ensure_columns('file_records', PROBE_COLUMNS)
+            _columns_ready = True
+
+
+def ffprobe_available() -> bool:
+    global _warned_missing
+    if shutil.which(FFPROBE_PATH):
+        return True
+    if not _warned_missing:
+        print(f"⚠️ 未找到 ffprobe（{FFPROBE_PATH}），跳过视频探测")
+        _warned_missing = True
+    return False
+
+
+def _parse_fps(rate: str):
+    try:
+        num, den = rate.split('/')
+        return round(int(num) / int(den), 3) if int(den) else None
+    except (ValueError, AttributeError):
+        return None
+
+
+def _rotation(stream: dict) -> int:
+    rotate = stream.get("tags", {}).get("rotate")
+    if rotate is None:
+        for side_data in stream.get("side_data_list", []):
+            if "rotation" in side_data:
+                rotate = side_data["rotation"]
+                break
+    try:
+        return int(float(rotate)) % 360 if rotate is not None else 0
+    except ValueError:
+        return 0
+
+
+def probe_video(path) -> dict:
+    """调用 ffprobe 读取视频元数据，解析失败或没有视频流时抛出 ProbeError"""
+    try:
+        completed = subprocess.run(
+            [FFPROBE_PATH, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", str(path)],
+            capture_output=True, timeout=PROBE_TIMEOUT
+        )
+    except subprocess.TimeoutExpired:
+        raise ProbeError("视频探测超时")
+    if completed.returncode != 0:
+        message = completed.stderr.decode("utf-8", errors="replace").strip().splitlines()
+        raise ProbeError(message[-1] if message else f"ffprobe 退出码 {completed.returncode}")
+
+    info = json.loads(completed.stdout or b"{}")
+    streams = info.get("streams", [])
+    fmt = info.get("format", {})
+    video = next((s for s in streams if s.get("codec_type") == "video"
+                  and not s.get("disposition", {}).get("attached_pic")), None)
+    if video is None:
+        raise ProbeError("文件中没有视频流")
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+
+    duration = fmt.get("duration") or video.get("duration")
+    bitrate = fmt.get("bit_rate") or video.get("bit_rate")
+    return {
+        "container": fmt.get("format_name"),
+        "video_codec": video.get("codec_name"),
+        "audio_codec": audio.get("codec_name") if audio else None,
+        "duration": round(float(duration), 3) if duration else None,
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "bitrate": int(bitrate) if bitrate else None,
+        "fps": _parse_fps(video.get("avg_frame_rate")),
+        "rotation": _rotation(video),
+    }
+
+
+def _save_result(file_id, status: str, metadata: dict = None, error: str = None):
+    metadata = metadata or {}
+    assignments = ", ".join(f"{name} = ?" for name in METADATA_FIELDS)
+    database.execute(f'''
+        UPDATE file_records SET probe_status = ?, probe_error = ?, {assignments} WHERE id = ?
+    ''', (status, error, *(metadata.get(name) for name in METADATA_FIELDS), file_id))
+
+
+def _known_result(record: dict):
+    """同一内容已经探测过的记录"""
+    if not record.get("digest"):
+        return None
+    row = database.query_one('''
+        SELECT * FROM file_records WHERE digest = ? AND id != ? AND probe_status IN (?, ?) LIMIT 1
+    ''', (record["digest"], record["id"], PROBE_OK, PROBE_FAILED))
+    return dict(row) if row else None
+
+
+def probe_record(file_id) -> dict:
+    """探测一条素材库记录并保存结果，返回更新后的记录"""
+    init_probe_columns()
+    row = database.get_file(file_id)
+    if row is None:
+        return None
+    record = dict(row)
+    known = _known_result(record)
+    if known:
+        _save_result(file_id, known["probe_status"], known, known["probe_error"])
+    elif ffprobe_available():
+        try:
+            metadata = probe_video(VIDEO_DIR / record["file_path"])
+            _save_result(file_id, PROBE_OK, metadata)
+            print(f"🔎 视频探测完成 {record['filename']}: {metadata['video_codec']} "
+                  f"{metadata['width']}x{metadata['height']} {metadata['duration']}s")
+        except (ProbeError, OSError, ValueError) as e:
+            _save_result(file_id, PROBE_FAILED, error=str(e))
+            print(f"❌ 视频探测失败 {record['filename']}: {e}")
+    return dict(database.get_file(file_id))
+
+
+class ProbePool:
+    """有上限的探测池：每个 worker 驱动一个 ffprobe 子进程"""
+
+    def __init__(self, size: int = PROBE_WORKERS):
+        self.size = size
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, file_id):
+        init_probe_columns()
+        database.execute("UPDATE file_records SET probe_status = ? WHERE id = ?", (PROBE_PENDING, file_id))
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="sau-probe")
+        return self._executor.submit(self._run, file_id)
+
+    @staticmethod
+    def _run(file_id):
+        try:
+            return probe_record(file_id)
+        except Exception as e:
+            print(f"⚠️ 视频探测异常 {file_id}: {e}")
+
+    def resume_pending(self) -> int:
+        """服务启动时补探测未完成（或升级前上传）的记录"""
+        init_probe_columns()
+        rows = database.query("SELECT id FROM file_records WHERE probe_status IS NULL OR probe_status = ?",
+                              (PROBE_PENDING,))
+        for row in rows:
+            self.submit(row["id"])
+        return len(rows)
+
+
+_pool = None
+
+
+def get_probe_pool() -> ProbePool:
+    global _pool
+    if _pool is None:
+        _pool = ProbePool()
+    return _pool
+
+
+def get_video_metadata(path) -> dict:
+    """
+    发布前获取视频元数据：素材库中已有探测结果直接返回，探测失败抛出 ProbeError；
+    不在素材库中的文件现场探测一次。未安装 ffprobe 时返回 None
+    """
+    path = Path(path)
+    try:
+        relpath = path.resolve().relative_to(VIDEO_DIR.resolve()).as_posix()
+    except ValueError:
+        relpath = None
+    if relpath:
+        init_probe_columns()
+        row = database.query_one("SELECT * FROM file_records WHERE file_path = ? ORDER BY id DESC LIMIT 1",
+                                 (relpath,))
+        if row is not None:
+            if row["probe_status"] == PROBE_FAILED:
+                raise ProbeError(row["probe_error"] or "视频探测失败")
+            if row["probe_status"] == PROBE_OK:
+                return {name: row[name] for name in METADATA_FIELDS}
+    if not ffprobe_available():
+        return None
+    return probe_video(path)